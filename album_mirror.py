@@ -0,0 +1,97 @@
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from config import ConfigManager
+from lychee_client import AlbumCache, LycheeClient
+from photoprism_client import PhotoPrismClient, primary_file_hash
+from transfer import PhotoTransfer, TransferResult
+from transfer_scheduler import TransferPriority, TransferScheduler
+
+
+@dataclass
+class MirrorPlan:
+    missing: List[Dict[str, Any]] = field(default_factory=list)
+    present: int = 0
+    # Photos in the Lychee album that aren't in the PhotoPrism album, reported but never deleted
+    extra: Set[str] = field(default_factory=set)
+
+
+def plan_mirror(photos: Iterable[Dict[str, Any]], lychee_checksums: Set[str]) -> MirrorPlan:
+    # One pass with set lookups, so planning stays linear in the album size
+    plan = MirrorPlan()
+    source_hashes: Set[str] = set()
+    
+    for photo in photos:
+        file_hash = primary_file_hash(photo).lower()
+        if not file_hash or file_hash in source_hashes:
+            continue
+        source_hashes.add(file_hash)
+        
+        if file_hash in lychee_checksums:
+            plan.present += 1
+        else:
+            plan.missing.append(photo)
+    
+    plan.extra = lychee_checksums - source_hashes
+    return plan
+
+
+class AlbumMirror:
+    def __init__(self, photoprism_client: PhotoPrismClient, lychee_client: LycheeClient,
+                 photo_transfer: PhotoTransfer, batch_size: int = 200):
+        self.photoprism_client = photoprism_client
+        self.lychee_client = lychee_client
+        self.photo_transfer = photo_transfer
+        self.batch_size = batch_size
+    
+    def plan(self, photoprism_album_uid: str, lychee_album_id: str) -> MirrorPlan:
+        lychee_checksums = self.lychee_client.get_album_checksums(lychee_album_id)
+        return plan_mirror(self.photoprism_client.iter_album_photos(photoprism_album_uid), lychee_checksums)
+    
+    def run(self, plan: MirrorPlan, lychee_album_id: str,
+            on_progress: Optional[Callable[[str], None]] = None) -> List[TransferResult]:
+        # Bounded batches keep each zip export and its temp file a manageable size
+        results: List[TransferResult] = []
+        for start in range(0, len(plan.missing), self.batch_size):
+            batch = plan.missing[start:start + self.batch_size]
+            if on_progress:
+                on_progress(f"Mirroring photos {start + 1}-{start + len(batch)} of {len(plan.missing)}")
+            results.extend(self.photo_transfer.transfer_batch(batch, lychee_album_id, TransferPriority.BATCH_SYNC))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror a PhotoPrism album into a Lychee album")
+    parser.add_argument("photoprism_album", help="PhotoPrism album UID")
+    parser.add_argument("lychee_album", help="Lychee album ID")
+    parser.add_argument("--config", default="photo_sync_config.json", help="Configuration file")
+    parser.add_argument("--batch-size", type=int, default=200, help="Photos per zip export")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be transferred")
+    args = parser.parse_args()
+    
+    config = ConfigManager(args.config).load_config()
+    scheduler = TransferScheduler.from_config(config.transfer)
+    photoprism_client = PhotoPrismClient(config.photoprism, scheduler)
+    photoprism_client.connect()
+    lychee_client = LycheeClient(config.lychee, scheduler, AlbumCache())
+    lychee_client.connect()
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client, server_side=config.transfer.server_side_import)
+    
+    mirror = AlbumMirror(photoprism_client, lychee_client, photo_transfer, args.batch_size)
+    plan = mirror.plan(args.photoprism_album, args.lychee_album)
+    print(f"{plan.present} photos already mirrored, {len(plan.missing)} missing, "
+          f"{len(plan.extra)} only in Lychee")
+    if args.dry_run or not plan.missing:
+        return
+    
+    results = mirror.run(plan, args.lychee_album, on_progress=print)
+    failed = [result for result in results if result.error]
+    mismatched = sum(1 for result in results if result.verified is False)
+    for result in failed:
+        print(f"Failed {result.photo.get('UID', '')}: {result.error}")
+    print(f"Mirrored {len(results) - len(failed)} of {len(plan.missing)} photos, {mismatched} checksum mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+from typing import Callable, List, Optional, Tuple
+
+from lychee_client import AlbumIndex, LycheeAlbum
+
+
+ROOT_ALBUM_ID = "__root__"
+ROOT_ALBUM_TITLE = "Root Album (No specific album)"
+LOADING_SUFFIX = "::loading"
+
+
+class AlbumPicker:
+    def __init__(self, parent: tk.Widget, children_loader: Callable[[LycheeAlbum], List[LycheeAlbum]],
+                 max_results: int = 500, tree_workers: int = 4):
+        self.parent = parent
+        self.children_loader = children_loader
+        self.max_results = max_results
+        self.tree_workers = tree_workers
+        self.index = AlbumIndex([])
+        self.last_query = ""
+        self.last_results: Optional[List[LycheeAlbum]] = None
+        self.pending_filter: Optional[str] = None
+        self.tree_loading = False
+        
+        self.setup_ui()
+    
+    def setup_ui(self):
+        self.frame = ttk.Frame(self.parent)
+        
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.schedule_filter())
+        ttk.Label(self.frame, text="Filter:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(self.frame, textvariable=self.filter_var, width=40).grid(row=0, column=1, sticky="we")
+        
+        self.tree = ttk.Treeview(self.frame, show="tree", height=6, selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+        self.tree.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+        self.scrollbar.grid(row=1, column=2, sticky="ns", pady=(5, 0))
+        
+        self.frame.columnconfigure(1, weight=1)
+        self.show_tree()
+    
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+    
+    def set_index(self, index: AlbumIndex):
+        self.index = index
+        self.last_query = ""
+        self.last_results = None
+        self.tree_loading = False
+        self.apply_filter()
+    
+    def get_selected_album_id(self) -> str:
+        selection = self.tree.selection()
+        if not selection or selection[0] == ROOT_ALBUM_ID or selection[0].endswith(LOADING_SUFFIX):
+            return ""
+        return selection[0]
+    
+    def get_selected_title(self) -> str:
+        album = self.index.get(self.get_selected_album_id())
+        return album.title if album else ROOT_ALBUM_TITLE
+    
+    def select(self, album_id: str):
+        self.tree.see(album_id)
+        self.tree.selection_set(album_id)
+    
+    def schedule_filter(self):
+        # Debounce so fast typing only filters once per pause
+        if self.pending_filter:
+            self.parent.after_cancel(self.pending_filter)
+        self.pending_filter = self.parent.after(150, self.apply_filter)
+    
+    def apply_filter(self):
+        self.pending_filter = None
+        query = self.filter_var.get().strip()
+        
+        if not query:
+            self.last_query = ""
+            self.last_results = None
+            self.show_tree()
+            return
+        
+        if not self.tree_loading:
+            # Only a filter needs the albums below unopened nodes
+            self.tree_loading = True
+            self.load_tree_async(self.index)
+        
+        # Typing more characters can only narrow the previous matches
+        within = self.last_results if self.last_query and query.startswith(self.last_query) else None
+        self.last_results = self.index.search(query, within)
+        self.last_query = query
+        self.show_matches(self.last_results)
+    
+    def show_tree(self):
+        selected_id = self.clear()
+        self.insert_children(None, "")
+        self.restore_selection(selected_id)
+    
+    def insert_children(self, parent_id: Optional[str], parent_iid: str):
+        for album in self.index.get_children(parent_id):
+            if self.tree.exists(album.id):
+                continue
+            self.tree.insert(parent_iid, "end", iid=album.id, text=album.title)
+            
+            if self.index.is_loaded(album.id):
+                self.insert_children(album.id, album.id)
+            else:
+                # Placeholder child so the node can be opened before its subtree is fetched
+                self.tree.insert(album.id, "end", iid=album.id + LOADING_SUFFIX, text="Loading...")
+    
+    def on_tree_open(self, event=None):
+        album_id = self.tree.focus()
+        album = self.index.get(album_id)
+        if not album or self.index.is_loaded(album_id):
+            return
+        
+        index = self.index
+        
+        def load_worker():
+            try:
+                children = self.children_loader(album)
+                self.parent.after(0, lambda: self.on_children_loaded(index, album, children))
+            except Exception:
+                self.parent.after(0, lambda: self.on_children_failed(album))
+        
+        threading.Thread(target=load_worker, daemon=True).start()
+    
+    def load_tree_async(self, index: AlbumIndex):
+        # Sub-albums are fetched lazily, so the filter would only find albums below
+        # expanded nodes. Once a filter is typed, the rest of the tree is loaded level
+        # by level in the background.
+        pending = [album for album in index if album.has_children and not index.is_loaded(album.id)]
+        if not pending:
+            return
+        
+        def load_worker():
+            nonlocal pending
+            with ThreadPoolExecutor(max_workers=self.tree_workers) as executor:
+                while pending and index is self.index:
+                    futures = [(album, executor.submit(self.children_loader, album)) for album in pending]
+                    level = []
+                    for album, future in futures:
+                        try:
+                            level.append((album, future.result()))
+                        except Exception:
+                            # Left unloaded, opening the node tries again
+                            continue
+                    self.parent.after(0, lambda loaded=level: self.on_tree_level_loaded(index, loaded))
+                    pending = [child for _, children in level for child in children if child.has_children]
+        
+        threading.Thread(target=load_worker, daemon=True).start()
+    
+    def on_tree_level_loaded(self, index: AlbumIndex, level: List[Tuple[LycheeAlbum, List[LycheeAlbum]]]):
+        if index is not self.index:
+            return
+        
+        filtering = bool(self.last_query)
+        for album, children in level:
+            if not filtering:
+                self.on_children_loaded(index, album, children)
+            elif not index.is_loaded(album.id):
+                index.add_children(album.id, children)
+        
+        if filtering:
+            # The new albums may match, so search the whole index again instead of the last matches
+            self.last_query = ""
+            self.apply_filter()
+    
+    def on_children_loaded(self, index: AlbumIndex, album: LycheeAlbum, children: List[LycheeAlbum]):
+        # Drop results that arrive after the album list has been replaced, or that
+        # the background tree load or an earlier open already added
+        if index is not self.index or index.is_loaded(album.id):
+            return
+        
+        self.index.add_children(album.id, children)
+        if not self.tree.exists(album.id):
+            return
+        
+        loading_iid = album.id + LOADING_SUFFIX
+        if self.tree.exists(loading_iid):
+            self.tree.delete(loading_iid)
+        self.insert_children(album.id, album.id)
+    
+    def on_children_failed(self, album: LycheeAlbum):
+        loading_iid = album.id + LOADING_SUFFIX
+        if self.tree.exists(loading_iid):
+            self.tree.item(loading_iid, text="Failed to load, reopen to retry")
+            self.tree.item(album.id, open=False)
+    
+    def show_matches(self, albums: List[LycheeAlbum]):
+        selected_id = self.clear()
+        for album in albums[:self.max_results]:
+            if self.tree.exists(album.id):
+                continue
+            self.tree.insert("", "end", iid=album.id, text=self.format_path(album))
+        self.restore_selection(selected_id)
+    
+    def format_path(self, album: LycheeAlbum) -> str:
+        titles = [album.title]
+        parent = self.index.get(album.parent_id) if album.parent_id else None
+        while parent:
+            titles.append(parent.title)
+            parent = self.index.get(parent.parent_id) if parent.parent_id else None
+        return " / ".join(reversed(titles))
+    
+    def clear(self) -> str:
+        selected_id = self.get_selected_album_id()
+        self.tree.delete(*self.tree.get_children())
+        self.tree.insert("", "end", iid=ROOT_ALBUM_ID, text=ROOT_ALBUM_TITLE)
+        return selected_id
+    
+    def restore_selection(self, album_id: str):
+        if album_id and self.tree.exists(album_id):
+            self.select(album_id)
+        else:
+            self.tree.selection_set(ROOT_ALBUM_ID)
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from config import LycheeConfig, PhotoPrismConfig
+from fetch_pool import AdaptiveFetchPool
+from lychee_client import AlbumCache, LycheeClient
+from photoprism_client import PhotoPrismClient
+from transfer import PhotoTransfer
+
+from benchmarks.mock_servers import MockLychee, MockPhotoPrism, MockServerConfig
+
+
+def measure(name: str, scenario: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = scenario()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    
+    result.update({"scenario": name, "seconds": elapsed, "peak_memory_mb": peak / (1024 * 1024)})
+    return result
+
+
+def connect_clients(photoprism: MockPhotoPrism, lychee: MockLychee):
+    photoprism_client = PhotoPrismClient(PhotoPrismConfig(photoprism.url, "admin", "secret"))
+    photoprism_client.connect()
+    
+    cache_file = os.path.join(tempfile.mkdtemp(), "album_cache.json")
+    lychee_client = LycheeClient(LycheeConfig(lychee.url, "admin", "secret"),
+                                 album_cache=AlbumCache(cache_file=cache_file, ttl=0))
+    lychee_client.connect()
+    return photoprism_client, lychee_client
+
+
+def bench_search(client: PhotoPrismClient, dates: List[str], repeat: int) -> Dict[str, Any]:
+    latencies = []
+    photos = 0
+    for _ in range(repeat):
+        for date in dates:
+            start = time.perf_counter()
+            photos += len(client.search_photos(date))
+            latencies.append(time.perf_counter() - start)
+    
+    latencies.sort()
+    return {
+        "searches": len(latencies),
+        "photos": photos,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000
+    }
+
+
+def bench_grid_fill(client: PhotoPrismClient, date: str) -> Dict[str, Any]:
+    # Same fetch path PhotoGrid uses, minus the Tk widgets
+    pool = AdaptiveFetchPool()
+    start = time.perf_counter()
+    photos = client.search_photos(date)
+    search_done = time.perf_counter()
+    
+    futures = [pool.submit(client.get_thumbnail, photo) for photo in photos]
+    first_thumbnail = None
+    loaded = 0
+    thumbnail_bytes = 0
+    for future in futures:
+        try:
+            data = future.result()
+        except Exception:
+            continue
+        if data:
+            loaded += 1
+            thumbnail_bytes += len(data)
+            if first_thumbnail is None:
+                first_thumbnail = time.perf_counter()
+    
+    done = time.perf_counter()
+    pool.shutdown()
+    return {
+        "thumbnails": loaded,
+        "search_ms": (search_done - start) * 1000,
+        "first_thumbnail_ms": ((first_thumbnail or done) - start) * 1000,
+        "grid_fill_ms": (done - start) * 1000,
+        "final_concurrency": pool.limit,
+        "thumbnail_mb": thumbnail_bytes / (1024 * 1024)
+    }
+
+
+def bench_album_tree(client: LycheeClient) -> Dict[str, Any]:
+    start = time.perf_counter()
+    index = client.get_albums(force_refresh=True)
+    top_level = time.perf_counter()
+    
+    # Expand every node, the worst case for the lazy album picker
+    pending = list(index)
+    while pending:
+        album = pending.pop()
+        if album.has_children:
+            children = client.get_album_children(album)
+            index.add_children(album.id, children)
+            pending.extend(children)
+    
+    full_expand = time.perf_counter()
+    
+    # The picker's background load once a filter is typed over a cached album list,
+    # which carries no inline sub-albums: one level at a time, each level in parallel
+    cached_client = LycheeClient(client.config, album_cache=client.album_cache)
+    cached_client.connect()
+    background_start = time.perf_counter()
+    cached_index = cached_client.get_albums()
+    pending = [album for album in cached_index if album.has_children]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        while pending:
+            level = list(zip(pending, executor.map(cached_client.get_album_children, pending)))
+            for album, children in level:
+                cached_index.add_children(album.id, children)
+            pending = [child for _, children in level for child in children if child.has_children]
+    
+    return {
+        "top_level_ms": (top_level - start) * 1000,
+        "albums": len(index),
+        "full_expand_ms": (full_expand - start) * 1000,
+        "cached_background_load_ms": (time.perf_counter() - background_start) * 1000,
+        "cached_albums": len(cached_index)
+    }
+
+
+def transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient, photo: Dict[str, Any]) -> int:
+    photo_data, filename = photoprism_client.download_photo(photo)
+    lychee_client.upload_photo(photo_data, filename)
+    return len(photo_data)
+
+
+def bench_single_transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient,
+                          photo: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    photo_data, filename = photoprism_client.download_photo(photo)
+    downloaded = time.perf_counter()
+    lychee_client.upload_photo(photo_data, filename)
+    uploaded = time.perf_counter()
+    
+    size_mb = len(photo_data) / (1024 * 1024)
+    return {
+        "size_mb": size_mb,
+        "download_mb_s": size_mb / (downloaded - start),
+        "upload_mb_s": size_mb / (uploaded - downloaded)
+    }
+
+
+def bench_batch_transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient,
+                         photos: List[Dict[str, Any]], workers: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda photo: _try_transfer(photoprism_client, lychee_client, photo), photos))
+    elapsed = time.perf_counter() - start
+    
+    transferred = [size for size in results if size]
+    total_mb = sum(transferred) / (1024 * 1024)
+    return {
+        "photos": len(photos),
+        "failed": len(photos) - len(transferred),
+        "workers": workers,
+        "total_mb": total_mb,
+        "mb_s": total_mb / elapsed,
+        "photos_per_s": len(transferred) / elapsed
+    }
+
+
+def bench_server_side_transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient,
+                               photos: List[Dict[str, Any]], workers: int) -> Dict[str, Any]:
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client, server_side=True)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(photo_transfer.transfer, photos))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        "photos": len(photos),
+        "imported": sum(1 for result in results if result.server_side),
+        "relayed": sum(1 for result in results if not result.server_side),
+        "workers": workers,
+        "photos_per_s": len(results) / elapsed
+    }
+
+
+def bench_zip_transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient,
+                       photos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    results = PhotoTransfer(photoprism_client, lychee_client).transfer_batch(photos)
+    elapsed = time.perf_counter() - start
+    
+    transferred = [result for result in results if not result.error]
+    total_mb = sum(result.photo["Files"][0].get("Size", 0) for result in transferred) / (1024 * 1024)
+    return {
+        "photos": len(photos),
+        "failed": len(photos) - len(transferred),
+        "total_mb": total_mb,
+        "mb_s": total_mb / elapsed,
+        "photos_per_s": len(transferred) / elapsed
+    }
+
+
+def _try_transfer(photoprism_client: PhotoPrismClient, lychee_client: LycheeClient, photo: Dict[str, Any]) -> int:
+    try:
+        return transfer(photoprism_client, lychee_client, photo)
+    except Exception:
+        return 0
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    server_config = MockServerConfig(latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate)
+    photoprism = MockPhotoPrism(server_config, photos_per_day=args.photos, days=args.days, file_size=args.file_size)
+    lychee = MockLychee(server_config)
+    
+    with photoprism, lychee:
+        photoprism_client, lychee_client = connect_clients(photoprism, lychee)
+        dates = sorted({photo["TakenAtLocal"][:10] for photo in photoprism.photos})
+        photos = photoprism_client.search_photos(dates[0])
+        
+        results = [
+            measure("search", lambda: bench_search(photoprism_client, dates, args.repeat)),
+            measure("grid_fill", lambda: bench_grid_fill(photoprism_client, dates[0])),
+            measure("album_tree", lambda: bench_album_tree(lychee_client)),
+            measure("single_transfer", lambda: bench_single_transfer(photoprism_client, lychee_client, photos[0])),
+            measure("batch_transfer", lambda: bench_batch_transfer(
+                photoprism_client, lychee_client, photos[:args.batch], args.workers
+            )),
+            measure("zip_transfer", lambda: bench_zip_transfer(
+                photoprism_client, lychee_client, photos[:args.batch]
+            )),
+            measure("server_side_transfer", lambda: bench_server_side_transfer(
+                photoprism_client, lychee_client, photos[:args.batch], args.workers
+            )),
+        ]
+        
+        for result in results:
+            result["server_requests"] = {"photoprism": dict(photoprism.requests), "lychee": dict(lychee.requests)}
+        return results
+
+
+def print_results(results: List[Dict[str, Any]]):
+    for result in results:
+        print(f"{result['scenario']}: {result['seconds']:.3f}s, peak {result['peak_memory_mb']:.1f} MiB")
+        for key, value in result.items():
+            if key in ("scenario", "seconds", "peak_memory_mb", "server_requests"):
+                continue
+            print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PhotoPrism and Lychee clients against local mock servers")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds of latency per response")
+    parser.add_argument("--bandwidth", type=int, default=0, help="Bytes per second per response, 0 for unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected 500")
+    parser.add_argument("--photos", type=int, default=60, help="Photos per day in the mock library")
+    parser.add_argument("--days", type=int, default=3, help="Days in the mock library")
+    parser.add_argument("--file-size", type=int, default=4 * 1024 * 1024, help="Original size in bytes")
+    parser.add_argument("--repeat", type=int, default=5, help="Search repetitions per date")
+    parser.add_argument("--batch", type=int, default=20, help="Photos in the batch transfer scenario")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel transfers in the batch scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
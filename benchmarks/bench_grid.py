@@ -0,0 +1,201 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import time
+import tkinter as tk
+import tracemalloc
+from tkinter import ttk
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from photo_grid import PhotoGrid
+
+
+def start_virtual_display() -> Optional[subprocess.Popen]:
+    if os.environ.get("DISPLAY"):
+        return None
+    
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        raise SystemExit("No DISPLAY and Xvfb not found, install Xvfb or run under xvfb-run")
+    
+    display = ":99"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1920x1080x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(0.5)
+    return process
+
+
+def make_thumbnails(variants: int = 8) -> List[bytes]:
+    thumbnails = []
+    for i in range(variants):
+        image = Image.effect_noise((500, 500), 32 + i * 8).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=80)
+        thumbnails.append(buffer.getvalue())
+    return thumbnails
+
+
+def make_photos(count: int) -> List[Dict[str, Any]]:
+    palette = "0123456789ABCDEF"
+    return [
+        {
+            "UID": f"p{i:07d}",
+            "Title": f"Synthetic photo {i}",
+            "TakenAtLocal": f"2024-06-01T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z",
+            "Type": "image",
+            "Files": [{
+                "Hash": f"{i:040x}",
+                "Colors": "".join(palette[(i + j) % 16] for j in range(9))
+            }]
+        }
+        for i in range(count)
+    ]
+
+
+def resident_memory() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class StallMonitor:
+    def __init__(self, root: tk.Tk, interval_ms: int = 10):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.stalls: List[float] = []
+        self.last_tick: Optional[float] = None
+        self.running = False
+    
+    def start(self):
+        self.running = True
+        self.last_tick = time.perf_counter()
+        self.root.after(int(self.interval * 1000), self.tick)
+    
+    def tick(self):
+        if not self.running:
+            return
+        now = time.perf_counter()
+        assert self.last_tick is not None
+        self.stalls.append(max(0.0, now - self.last_tick - self.interval))
+        self.last_tick = now
+        self.root.after(int(self.interval * 1000), self.tick)
+    
+    def stop(self):
+        self.running = False
+
+
+def pump_until(root: tk.Tk, condition, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        root.update()
+        if condition():
+            return True
+    return False
+
+
+def bench_grid(root: tk.Tk, count: int, thumbnails: List[bytes], fetch_latency: float,
+               timeout: float) -> Dict[str, Any]:
+    frame = ttk.Frame(root)
+    frame.pack(fill="both", expand=True)
+    grid = PhotoGrid(frame, lambda photo, index: None)
+    root.update()
+    
+    photos = make_photos(count)
+    
+    def loader(photo: Dict[str, Any]) -> bytes:
+        if fetch_latency:
+            time.sleep(fetch_latency)
+        return thumbnails[int(photo["UID"][1:]) % len(thumbnails)]
+    
+    monitor = StallMonitor(root)
+    rss_before = resident_memory()
+    tracemalloc.start()
+    
+    start = time.perf_counter()
+    grid.set_photos(photos)
+    tiles_created = time.perf_counter()
+    root.update()
+    first_paint = time.perf_counter()
+    
+    monitor.start()
+    grid.load_thumbnails_async(loader)
+    full = pump_until(root, lambda: len(grid.thumbnail_cache) >= count, timeout)
+    full_grid = time.perf_counter()
+    monitor.stop()
+    
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resident_memory()
+    
+    # Force a column change to time a full relayout
+    relayout_start = time.perf_counter()
+    grid.update_photo_layout(grid.current_columns * 520 + 520 if grid.current_columns < 6 else 520)
+    root.update()
+    relayout = time.perf_counter() - relayout_start
+    
+    grid.cancel_pending_thumbnails()
+    grid.fetch_pool.shutdown()
+    frame.destroy()
+    root.update()
+    
+    return {
+        "photos": count,
+        "completed": full,
+        "create_tiles_ms": (tiles_created - start) * 1000,
+        "first_paint_ms": (first_paint - start) * 1000,
+        "full_grid_ms": (full_grid - start) * 1000,
+        "relayout_ms": relayout * 1000,
+        "stall_p50_ms": percentile(monitor.stalls, 0.5) * 1000,
+        "stall_p95_ms": percentile(monitor.stalls, 0.95) * 1000,
+        "stall_p99_ms": percentile(monitor.stalls, 0.99) * 1000,
+        "stall_max_ms": max(monitor.stalls, default=0.0) * 1000,
+        "rss_per_tile_kb": (rss_after - rss_before) / count / 1024,
+        "python_heap_per_tile_kb": traced_peak / count / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PhotoGrid rendering under a (virtual) X display")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Photo counts to render")
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="Simulated seconds per thumbnail fetch")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for a full grid")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    display = start_virtual_display()
+    try:
+        root = tk.Tk()
+        root.geometry("1400x1000")
+        thumbnails = make_thumbnails()
+        
+        results = [bench_grid(root, size, thumbnails, args.fetch_latency, args.timeout) for size in args.sizes]
+        root.destroy()
+    finally:
+        if display:
+            display.terminate()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    for result in results:
+        print(f"{result['photos']} photos:")
+        for key, value in result.items():
+            if key != "photos":
+                print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
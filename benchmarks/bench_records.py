@@ -0,0 +1,92 @@
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import photo_record
+from photo_record import PhotoRecord
+
+
+def make_search_result(i: int) -> Dict[str, Any]:
+    # Shaped like a merged /api/v1/photos result, which carries far more than the app uses
+    taken_at = f"2024-06-{1 + (i // 86400) % 28:02d}T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z"
+    return {
+        "ID": f"{i}", "UID": f"p{i:015d}", "Type": "image", "TypeSrc": "", "TakenAt": taken_at,
+        "TakenAtLocal": taken_at, "TakenSrc": "meta", "TimeZone": "Europe/Berlin", "Path": "2024/06",
+        "Name": f"20240601_{i:06d}_ABCDEF12", "OriginalName": f"IMG_{i:05d}", "Title": f"Seaside / 2024 #{i}",
+        "Description": "", "Year": 2024, "Month": 6, "Day": 1, "Country": "de", "Stack": 0, "Favorite": i % 5 == 0,
+        "Private": False, "Iso": 100, "FocalLength": 26, "FNumber": 1.8, "Exposure": "1/120", "Faces": 0,
+        "Quality": 3, "Resolution": 12, "Color": i % 16, "Scan": False, "Panorama": False,
+        "CameraID": 2, "CameraSrc": "meta", "CameraSerial": "", "CameraMake": "Apple", "CameraModel": "iPhone 13",
+        "LensID": 3, "LensMake": "Apple", "LensModel": "iPhone 13 back dual wide camera 5.1mm f/1.6",
+        "Lat": 54.1, "Lng": 10.2, "CellID": "s2:47b1", "PlaceID": "de:Kiel", "PlaceSrc": "meta",
+        "PlaceLabel": "Kiel, Schleswig-Holstein, Germany", "PlaceCity": "Kiel", "PlaceState": "Schleswig-Holstein",
+        "PlaceCountry": "de", "InstanceID": "", "FileUID": f"f{i:015d}", "FileRoot": "/", "FileName":
+        f"2024/06/20240601_{i:06d}_ABCDEF12.jpg", "Hash": f"{i:040x}", "Width": 4032, "Height": 3024,
+        "Portrait": False, "Merged": True, "CreatedAt": taken_at, "UpdatedAt": taken_at, "EditedAt": None,
+        "CheckedAt": taken_at, "DeletedAt": None,
+        "Files": [{
+            "UID": f"f{i:015d}", "PhotoUID": f"p{i:015d}", "Name": f"2024/06/20240601_{i:06d}_ABCDEF12.jpg",
+            "Root": "/", "Hash": f"{i:040x}", "Size": 3145728, "Primary": True, "Codec": "jpeg", "FileType": "jpg",
+            "MediaType": "image", "Mime": "image/jpeg", "Width": 4032, "Height": 3024, "Orientation": 1,
+            "AspectRatio": 1.33, "Colors": "226611CCC", "Luminance": "9ABBCB98A", "Diff": 963, "Chroma": 12,
+            "MainColor": "grey", "CreatedAt": taken_at, "UpdatedAt": taken_at, "Markers": []
+        }]
+    }
+
+
+def measure(parse: Callable[[bytes], List[Any]], content: bytes) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    parsed = parse(content)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    count = len(parsed)
+    del parsed
+    return {
+        "parse_s": elapsed,
+        "retained_mib": retained / 1024 / 1024,
+        "peak_mib": peak / 1024 / 1024,
+        "bytes_per_record": retained / count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of raw search results and PhotoRecord")
+    parser.add_argument("--records", type=int, default=100000, help="Search results to parse")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    content = json.dumps([make_search_result(i) for i in range(args.records)]).encode()
+    decoder = "orjson" if photo_record._loads is not json.loads else "json"
+    
+    results = {
+        "records": args.records,
+        "payload_mib": len(content) / 1024 / 1024,
+        "decoder": decoder,
+        "raw_dicts": measure(json.loads, content),
+        "photo_records": measure(photo_record.parse_photo_records, content),
+    }
+    if decoder != "json":
+        results["photo_records_stdlib_json"] = measure(
+            lambda data: [PhotoRecord.from_json(photo) for photo in json.loads(data)], content
+        )
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{results['records']} records, {results['payload_mib']:.1f} MiB of JSON, decoder {decoder}")
+    for name, result in results.items():
+        if isinstance(result, dict):
+            print(f"{name}: {result['retained_mib']:.1f} MiB retained, {result['peak_mib']:.1f} MiB peak, "
+                  f"{result['bytes_per_record']:.0f} B/record, parsed in {result['parse_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+
+@dataclass
+class MockServerConfig:
+    latency: float = 0.0       # Seconds added before every response
+    bandwidth: int = 0         # Bytes per second per response body, 0 means unlimited
+    error_rate: float = 0.0    # Probability of answering with a 500
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: 'MockHTTPServer'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        self.dispatch("GET")
+    
+    def do_POST(self):
+        self.dispatch("POST")
+    
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+    
+    def dispatch(self, method: str):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        config = self.server.config
+        
+        if config.latency:
+            time.sleep(config.latency)
+        
+        if config.error_rate and random.random() < config.error_rate:
+            self.send_body(500, b'{"error": "injected failure"}', "application/json")
+            return
+        
+        url = urlparse(self.path)
+        self.server.mock.handle(self, method, url.path, parse_qs(url.query), body)
+    
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        
+        bandwidth = self.server.config.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        
+        chunk_size = max(1024, bandwidth // 20)
+        for offset in range(0, len(body), chunk_size):
+            self.wfile.write(body[offset:offset + chunk_size])
+            time.sleep(min(chunk_size, len(body) - offset) / bandwidth)
+    
+    def send_json(self, data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.send_body(status, json.dumps(data).encode(), "application/json", headers)
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, mock: 'MockServer', config: MockServerConfig):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.mock = mock
+        self.config = config
+
+
+class MockServer:
+    def __init__(self, config: Optional[MockServerConfig] = None):
+        self.server = MockHTTPServer(self, config or MockServerConfig())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'MockServer':
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def count_request(self, name: str):
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+    
+    def handle(self, handler: MockHandler, method: str, path: str, query: Dict[str, List[str]], body: bytes):
+        raise NotImplementedError
+
+
+class MockPhotoPrism(MockServer):
+    PREVIEW_TOKEN = "preview-token"
+    DOWNLOAD_TOKEN = "download-token"
+    
+    def __init__(self, config: Optional[MockServerConfig] = None, photos_per_day: int = 50,
+                 days: int = 7, file_size: int = 2 * 1024 * 1024, start_date: str = "2024-06-01",
+                 stacked_every: int = 0):
+        super().__init__(config)
+        self.file_size = file_size
+        # Every nth photo gets a second, non-primary file such as a RAW next to the JPEG
+        self.stacked_every = stacked_every
+        self.block = random.Random(0).randbytes(64 * 1024)
+        self.photos: List[Dict[str, Any]] = []
+        self.by_uid: Dict[str, Dict[str, Any]] = {}
+        self.by_hash: Dict[str, Dict[str, Any]] = {}
+        self.thumbnail = self._make_thumbnail()
+        self.zips: Dict[str, bytes] = {}
+        self.album_photos: Dict[str, List[str]] = {}
+        self.label_photos: Dict[str, List[str]] = {"cat": [], "beach": []}
+        
+        first_day = datetime.strptime(start_date, "%Y-%m-%d")
+        for day in range(days):
+            for i in range(photos_per_day):
+                self._add_photo(first_day + timedelta(days=day, seconds=i * 60))
+    
+    def add_photo(self, taken_at: datetime) -> Dict[str, Any]:
+        self._add_photo(taken_at)
+        return self.photos[-1]
+    
+    def _add_photo(self, taken_at: datetime):
+        uid = f"p{len(self.photos):07d}"
+        sha1 = hashlib.sha1()
+        for chunk in self.iter_original(uid, self.file_size):
+            sha1.update(chunk)
+        
+        palette = "0123456789ABCDEF"
+        colors = "".join(palette[(len(self.photos) + i) % 16] for i in range(9))
+        photo = {
+            "UID": uid,
+            "Title": f"Synthetic photo {len(self.photos)}",
+            "TakenAtLocal": taken_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "CreatedAt": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "UpdatedAt": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "Type": "image",
+            "Favorite": len(self.photos) % 5 == 0,
+            "Quality": 3,
+            "Files": [{
+                "UID": f"f{len(self.photos):07d}",
+                "Hash": sha1.hexdigest(),
+                "Name": f"{taken_at:%Y/%m}/IMG_{len(self.photos):05d}.jpg",
+                "Size": self.file_size,
+                "Primary": True,
+                "Mime": "image/jpeg",
+                "Colors": colors
+            }]
+        }
+        if self.stacked_every and len(self.photos) % self.stacked_every == 0:
+            photo["Files"].append({
+                "UID": f"f{len(self.photos):07d}r",
+                "Hash": hashlib.sha1(uid.encode()).hexdigest(),
+                "Name": f"{taken_at:%Y/%m}/IMG_{len(self.photos):05d}.dng",
+                "Size": self.file_size,
+                "Primary": False,
+                "Mime": "image/dng"
+            })
+        self.photos.append(photo)
+        self.by_uid[uid] = photo
+        for slug, every in (("cat", 3), ("beach", 7)):
+            if len(self.photos) % every == 0:
+                self.label_photos[slug].append(uid)
+        self.by_hash[photo["Files"][0]["Hash"]] = photo
+    
+    def iter_original(self, uid: str, size: int):
+        header = uid.encode().ljust(64, b"\0")
+        yield header[:size]
+        remaining = size - len(header)
+        while remaining > 0:
+            chunk = self.block[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+    
+    def original_bytes(self, photo: Dict[str, Any]) -> bytes:
+        return b"".join(self.iter_original(photo["UID"], photo["Files"][0]["Size"]))
+    
+    def _make_thumbnail(self) -> bytes:
+        image = Image.effect_noise((500, 500), 64).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=80)
+        return buffer.getvalue()
+    
+    def handle(self, handler: MockHandler, method: str, path: str, query: Dict[str, List[str]], body: bytes):
+        parts = path.strip("/").split("/")
+        
+        if method == "POST" and path == "/api/v1/session":
+            self.count_request("session")
+            handler.send_json({
+                "access_token": uuid.uuid4().hex,
+                "config": {"previewToken": self.PREVIEW_TOKEN, "downloadToken": self.DOWNLOAD_TOKEN}
+            })
+        elif method == "GET" and path == "/api/v1/photos":
+            self.count_request("search")
+            photos, rows = self.search(query)
+            handler.send_json(photos, headers={"X-Count": str(rows), "X-Offset": query.get("offset", ["0"])[0]})
+        elif method == "GET" and path == "/api/v1/labels":
+            self.count_request("labels")
+            labels = [
+                {"Slug": slug, "Name": slug.title(), "PhotoCount": len(uids)}
+                for slug, uids in sorted(self.label_photos.items())
+            ]
+            offset = int(query.get("offset", ["0"])[0])
+            handler.send_json(labels[offset:offset + int(query.get("count", ["100"])[0])])
+        elif method == "GET" and len(parts) == 4 and parts[:3] == ["api", "v1", "photos"]:
+            self.count_request("details")
+            photo = self.by_uid.get(parts[3])
+            if photo:
+                labels = [{"Uncertainty": 0, "Label": {"Slug": slug}}
+                          for slug, uids in sorted(self.label_photos.items()) if photo["UID"] in uids]
+                handler.send_json({**photo, "Labels": labels})
+            else:
+                handler.send_json({"error": "not found"}, 404)
+        elif method == "GET" and len(parts) == 6 and parts[:3] == ["api", "v1", "t"]:
+            self.count_request("thumbnail")
+            if parts[3] in self.by_hash and parts[4] == self.PREVIEW_TOKEN:
+                handler.send_body(200, self.thumbnail, "image/jpeg")
+            else:
+                handler.send_body(404, b"", "image/svg+xml")
+        elif method == "GET" and len(parts) == 4 and parts[:3] == ["api", "v1", "dl"]:
+            self.count_request("download")
+            photo = self.by_hash.get(parts[3])
+            if photo and query.get("t", [""])[0] == self.DOWNLOAD_TOKEN:
+                self.send_original(handler, photo)
+            else:
+                handler.send_json({"error": "not found"}, 404)
+        elif method == "POST" and path == "/api/v1/zip":
+            self.count_request("zip_create")
+            uids = json.loads(body or b"{}").get("photos", [])
+            name = f"photoprism-download-{uuid.uuid4().hex[:8]}.zip"
+            self.zips[name] = self.make_zip([self.by_uid[uid] for uid in uids if uid in self.by_uid])
+            handler.send_json({"code": 200, "message": "Zip created", "filename": name})
+        elif method == "GET" and len(parts) == 4 and parts[:3] == ["api", "v1", "zip"]:
+            self.count_request("zip_download")
+            archive = self.zips.pop(parts[3], None)
+            if archive is not None and query.get("t", [""])[0] == self.DOWNLOAD_TOKEN:
+                handler.send_body(200, archive, "application/zip")
+            else:
+                handler.send_json({"error": "not found"}, 404)
+        else:
+            handler.send_json({"error": f"unknown route {method} {path}"}, 404)
+    
+    def send_original(self, handler: MockHandler, photo: Dict[str, Any]):
+        data = self.original_bytes(photo)
+        requested = handler.headers.get("Range", "")
+        if not requested.startswith("bytes="):
+            handler.send_body(200, data, "image/jpeg", {"Accept-Ranges": "bytes"})
+            return
+        
+        first, _, last = requested[len("bytes="):].partition("-")
+        start, end = int(first), min(int(last or len(data) - 1), len(data) - 1)
+        self.count_request("download_range")
+        handler.send_body(206, data[start:end + 1], "image/jpeg",
+                          {"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"})
+    
+    def make_zip(self, photos: List[Dict[str, Any]]) -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for photo in photos:
+                archive.writestr(photo["Files"][0]["Name"].rsplit("/", 1)[-1], self.original_bytes(photo))
+        return buffer.getvalue()
+    
+    def search(self, query: Dict[str, List[str]]) -> Tuple[List[Dict[str, Any]], int]:
+        count = int(query.get("count", ["100"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        q = query.get("q", [""])[0]
+        added = query.get("added", [""])[0]
+        updated = query.get("updated", [""])[0]
+        album = query.get("s", [""])[0]
+        label = query.get("label", [""])[0]
+        
+        photos = self.photos
+        if album:
+            photos = [self.by_uid[uid] for uid in self.album_photos.get(album, [])]
+        if label:
+            uids = set(self.label_photos.get(label, []))
+            photos = [p for p in photos if p["UID"] in uids]
+        if added:
+            photos = [p for p in photos if p["CreatedAt"] >= added]
+        if updated:
+            photos = [p for p in photos if p["UpdatedAt"] >= updated]
+        if query.get("after"):
+            photos = [p for p in photos if p["TakenAtLocal"] >= query["after"][0]]
+        if query.get("before"):
+            photos = [p for p in photos if p["TakenAtLocal"] <= query["before"][0]]
+        for term in q.split():
+            if term.startswith("taken:"):
+                date = term[len("taken:"):]
+                photos = [p for p in photos if p["TakenAtLocal"].startswith(date)]
+        if query.get("favorite", [""])[0] == "True":
+            photos = [p for p in photos if p["Favorite"]]
+        if query.get("type"):
+            photos = [p for p in photos if p["Type"] == query["type"][0]]
+        
+        # Like PhotoPrism, count and offset apply to file rows, merged results join
+        # the rows of each photo again, so a stacked photo can span two pages
+        rows = [(photo, file_info) for photo in photos for file_info in photo["Files"]][offset:offset + count]
+        merged = query.get("merged", [""])[0] == "True"
+        page: List[Dict[str, Any]] = []
+        for photo, file_info in rows:
+            if merged and page and page[-1]["UID"] == photo["UID"]:
+                page[-1]["Files"].append(file_info)
+            else:
+                page.append({**photo, "Files": [file_info]})
+        return page, len(rows)
+
+
+class MockLychee(MockServer):
+    XSRF_TOKEN = "mock-xsrf-token"
+    
+    def __init__(self, config: Optional[MockServerConfig] = None, albums: int = 20, depth: int = 2, fanout: int = 3):
+        super().__init__(config)
+        self.albums: List[Dict[str, Any]] = [self._make_album(f"a{i}", depth, fanout) for i in range(albums)]
+        self.albums_by_id: Dict[str, Dict[str, Any]] = {}
+        self._index_albums(self.albums)
+        # Photo IDs are "photo<index>" into uploads, deleted ones stay in the list
+        self.uploads: List[Tuple[str, str, str]] = []
+        self.deleted: Set[str] = set()
+        # The next n uploads are stored with a wrong checksum, as if corrupted on the way
+        self.corrupt_uploads = 0
+    
+    def _make_album(self, album_id: str, depth: int, fanout: int) -> Dict[str, Any]:
+        children = [self._make_album(f"{album_id}-{i}", depth - 1, fanout) for i in range(fanout)] if depth else []
+        return {"id": album_id, "title": f"Album {album_id}", "owner_name": "admin", "albums": children}
+    
+    def _index_albums(self, albums: List[Dict[str, Any]]):
+        for album in albums:
+            self.albums_by_id[album["id"]] = album
+            self._index_albums(album["albums"])
+    
+    def handle(self, handler: MockHandler, method: str, path: str, query: Dict[str, List[str]], body: bytes):
+        xsrf_cookie = {"Set-Cookie": f"XSRF-TOKEN={self.XSRF_TOKEN}; Path=/"}
+        
+        if method == "GET" and path in ("", "/"):
+            self.count_request("home")
+            handler.send_body(200, b"<html></html>", "text/html", xsrf_cookie)
+        elif method == "POST" and path == "/api/v2/Auth::login":
+            self.count_request("login")
+            handler.send_body(204, b"", "application/json", xsrf_cookie)
+        elif method == "GET" and path == "/api/v2/Albums":
+            self.count_request("albums")
+            body = json.dumps({"albums": [self._summary(album) for album in self.albums]}).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if handler.headers.get("If-None-Match") == etag:
+                handler.send_body(304, b"", "application/json", {"ETag": etag})
+            else:
+                handler.send_body(200, body, "application/json", {"ETag": etag})
+        elif method == "GET" and path == "/api/v2/Album":
+            self.count_request("album")
+            album_id = query.get("album_id", [""])[0]
+            # Photos uploaded without an album are listed in the "unsorted" smart album
+            album = {"id": "", "albums": []} if album_id == "unsorted" else self.albums_by_id.get(album_id)
+            if album:
+                handler.send_json({"resource": {
+                    "albums": [self._summary(child) for child in album["albums"]],
+                    "photos": [
+                        {"id": f"photo{i}", "title": os.path.splitext(os.path.basename(filename))[0],
+                         "checksum": checksum}
+                        for i, (filename, upload_album_id, checksum) in enumerate(self.uploads)
+                        if upload_album_id == album["id"] and f"photo{i}" not in self.deleted
+                    ]
+                }})
+            else:
+                handler.send_json({"message": "not found"}, 404)
+        elif method == "POST" and path == "/api/v2/Photo":
+            self.count_request("upload")
+            filename, album_id, data = self._parse_upload(handler.headers.get("Content-Type", ""), body)
+            if self.corrupt_uploads:
+                self.corrupt_uploads -= 1
+                data = data[:-1]
+            checksum = hashlib.sha1(data).hexdigest()
+            self.uploads.append((filename, album_id, checksum))
+            # Like the real chunked upload, the answer describes the upload, not the stored photo
+            name, extension = os.path.splitext(filename)
+            handler.send_json({"file_name": name, "extension": extension, "uuid_name": f"{uuid.uuid4().hex}{extension}",
+                               "stage": "done", "chunk_number": 1, "total_chunks": 1}, 201)
+        elif method == "DELETE" and path == "/api/v2/Photo":
+            self.count_request("delete")
+            self.deleted.update(json.loads(body or b"{}").get("photo_ids", []))
+            handler.send_body(204, b"", "application/json")
+        elif method == "POST" and path == "/api/v2/Photo::fromUrl":
+            self.count_request("import")
+            request = json.loads(body or b"{}")
+            photos = []
+            for url in request.get("urls", []):
+                with urllib.request.urlopen(url) as response:
+                    checksum = hashlib.sha1(response.read()).hexdigest()
+                self.uploads.append((url, request.get("album_id") or "", checksum))
+                photos.append({"id": f"photo{len(self.uploads) - 1}", "checksum": checksum})
+            handler.send_json(photos, 201)
+        else:
+            handler.send_json({"message": f"unknown route {method} {path}"}, 404)
+    
+    def _summary(self, album: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": album["id"],
+            "title": album["title"],
+            "owner_name": album["owner_name"],
+            "num_subalbums": len(album["albums"])
+        }
+    
+    def _parse_upload(self, content_type: str, body: bytes) -> Tuple[str, str, bytes]:
+        boundary = content_type.split("boundary=")[-1].encode()
+        fields: Dict[str, bytes] = {}
+        filename = ""
+        
+        for part in body.split(b"--" + boundary):
+            head, _, value = part.partition(b"\r\n\r\n")
+            if b'name="' not in head:
+                continue
+            name = head.split(b'name="')[1].split(b'"')[0].decode()
+            if b'filename="' in head:
+                filename = head.split(b'filename="')[1].split(b'"')[0].decode()
+            fields[name] = value[:-2] if value.endswith(b"\r\n") else value
+        
+        return filename, fields.get("album_id", b"").decode(), fields.get("file", b"")
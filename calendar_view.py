@@ -0,0 +1,135 @@
+import calendar
+import threading
+import tkinter as tk
+from datetime import date
+from tkinter import ttk
+from typing import Callable, Dict, Optional
+
+# Counts per day for an inclusive start/end date range, called off the UI thread
+DayCountLoader = Callable[[str, str], Dict[str, int]]
+
+HEAT_COLORS = ("#ebedf0", "#c6e48b", "#7bc96f", "#239a3b", "#196127")
+CELL_SIZE = 16
+CELL_GAP = 2
+MONTH_GAP = 20
+
+
+def heat_level(count: int, max_count: int) -> int:
+    if count <= 0 or max_count <= 0:
+        return 0
+    return min(len(HEAT_COLORS) - 1, 1 + (count * (len(HEAT_COLORS) - 1) - 1) // max_count)
+
+
+class CalendarView:
+    def __init__(self, parent: tk.Misc, on_select: Callable[[str], None]):
+        self.parent = parent
+        self.on_select = on_select
+        self.window: Optional[tk.Toplevel] = None
+        self.year = date.today().year
+        self.load_counts: Optional[DayCountLoader] = None
+        self.counts: Dict[str, int] = {}
+        self.cells: Dict[int, str] = {}
+        self.generation = 0
+    
+    def show(self, year: int, load_counts: DayCountLoader):
+        self.year = year
+        self.load_counts = load_counts
+        
+        if not self.window or not self.window.winfo_exists():
+            self.build_window()
+        self.window.lift()
+        self.refresh()
+    
+    def build_window(self):
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Calendar")
+        
+        header = ttk.Frame(self.window, padding="5")
+        header.grid(row=0, column=0, sticky="we")
+        ttk.Button(header, text="Previous Year", command=lambda: self.change_year(-1)).grid(row=0, column=0, padx=(0, 10))
+        self.year_var = tk.StringVar()
+        ttk.Label(header, textvariable=self.year_var, font=("Arial", 12, "bold")).grid(row=0, column=1, padx=(0, 10))
+        ttk.Button(header, text="Next Year", command=lambda: self.change_year(1)).grid(row=0, column=2)
+        
+        month_width = 7 * (CELL_SIZE + CELL_GAP)
+        month_height = 7 * (CELL_SIZE + CELL_GAP) + 20
+        self.canvas = tk.Canvas(self.window, width=4 * (month_width + MONTH_GAP), height=3 * (month_height + MONTH_GAP),
+                                background="white", highlightthickness=0)
+        self.canvas.grid(row=1, column=0, padx=10)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<Button-1>", self.on_click)
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var, padding="5").grid(row=2, column=0, sticky="w")
+    
+    def change_year(self, delta: int):
+        self.year += delta
+        self.refresh()
+    
+    def refresh(self):
+        # One query covers the whole year, results of a year the user already left are dropped
+        self.generation += 1
+        generation = self.generation
+        year = self.year
+        self.year_var.set(str(year))
+        self.status_var.set("Counting photos...")
+        self.counts = {}
+        self.draw()
+        
+        def load_worker():
+            try:
+                counts = self.load_counts(f"{year}-01-01", f"{year}-12-31")
+                self.parent.after(0, lambda: self.show_counts(generation, counts))
+            except Exception as e:
+                self.parent.after(0, lambda error=str(e): self.status_var.set(f"Failed to count photos: {error}"))
+        
+        threading.Thread(target=load_worker, daemon=True).start()
+    
+    def show_counts(self, generation: int, counts: Dict[str, int]):
+        if generation != self.generation or not self.window.winfo_exists():
+            return
+        
+        self.counts = counts
+        self.draw()
+        days = sum(1 for count in counts.values() if count)
+        self.status_var.set(f"{sum(counts.values())} photos on {days} days in {self.year}")
+    
+    def draw(self):
+        self.canvas.delete("all")
+        self.cells = {}
+        max_count = max(self.counts.values(), default=0)
+        month_width = 7 * (CELL_SIZE + CELL_GAP)
+        month_height = 7 * (CELL_SIZE + CELL_GAP) + 20
+        
+        for month in range(1, 13):
+            left = ((month - 1) % 4) * (month_width + MONTH_GAP)
+            top = ((month - 1) // 4) * (month_height + MONTH_GAP)
+            self.canvas.create_text(left, top, text=calendar.month_name[month], anchor="nw", font=("Arial", 9, "bold"))
+            
+            for week, days in enumerate(calendar.monthcalendar(self.year, month)):
+                for weekday, day in enumerate(days):
+                    if not day:
+                        continue
+                    
+                    day_key = f"{self.year}-{month:02d}-{day:02d}"
+                    x = left + weekday * (CELL_SIZE + CELL_GAP)
+                    y = top + 20 + week * (CELL_SIZE + CELL_GAP)
+                    color = HEAT_COLORS[heat_level(self.counts.get(day_key, 0), max_count)]
+                    item = self.canvas.create_rectangle(x, y, x + CELL_SIZE, y + CELL_SIZE, fill=color, outline="")
+                    self.cells[item] = day_key
+    
+    def day_at(self, event: tk.Event) -> Optional[str]:
+        for item in self.canvas.find_overlapping(event.x, event.y, event.x, event.y):
+            if item in self.cells:
+                return self.cells[item]
+        return None
+    
+    def on_motion(self, event: tk.Event):
+        day_key = self.day_at(event)
+        if day_key:
+            self.status_var.set(f"{day_key}: {self.counts.get(day_key, 0)} photos")
+    
+    def on_click(self, event: tk.Event):
+        day_key = self.day_at(event)
+        if day_key:
+            self.on_select(day_key)
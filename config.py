@@ -1,7 +1,7 @@
 import json
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
@@ -9,9 +9,14 @@ class PhotoPrismConfig:
     url: str = ""
     username: str = ""
     password: str = ""
+    name: str = ""
     
     def is_complete(self) -> bool:
         return all([self.url, self.username, self.password])
+    
+    @property
+    def display_name(self) -> str:
+        return self.name or self.url
 
 
 @dataclass
@@ -19,15 +24,39 @@ class LycheeConfig:
     url: str = ""
     username: str = ""
     password: str = ""
+    # Only used by additional targets, which have no album picker of their own
+    name: str = ""
+    album_id: str = ""
     
     def is_complete(self) -> bool:
         return all([self.url, self.username, self.password])
+    
+    @property
+    def display_name(self) -> str:
+        return self.name or self.url
+
+
+@dataclass
+class TransferConfig:
+    # Per-direction bandwidth caps in KiB/s, 0 means unlimited
+    download_limit_kbps: int = 0
+    upload_limit_kbps: int = 0
+    # Have Lychee fetch originals from PhotoPrism itself instead of relaying them
+    server_side_import: bool = False
 
 
 @dataclass
 class AppConfig:
     photoprism: PhotoPrismConfig
     lychee: LycheeConfig
+    transfer: TransferConfig = field(default_factory=TransferConfig)
+    # Extra Lychee instances that receive every upload alongside the primary one
+    lychee_targets: List[LycheeConfig] = field(default_factory=list)
+    # Extra PhotoPrism libraries searched alongside the primary one
+    photoprism_sources: List[PhotoPrismConfig] = field(default_factory=list)
+    # Answer date and filter searches from a local SQLite copy of the library metadata
+    local_index: bool = False
+    local_index_path: str = "photo_index.sqlite3"
     
     @classmethod
     def from_dict(cls, data: dict) -> 'AppConfig':
@@ -41,7 +70,33 @@ class AppConfig:
                 url=data.get("lychee_url", ""),
                 username=data.get("lychee_user", ""),
                 password=data.get("lychee_pass", "")
-            )
+            ),
+            transfer=TransferConfig(
+                download_limit_kbps=int(data.get("download_limit_kbps", 0)),
+                upload_limit_kbps=int(data.get("upload_limit_kbps", 0)),
+                server_side_import=bool(data.get("server_side_import", False))
+            ),
+            lychee_targets=[
+                LycheeConfig(
+                    url=target.get("url", ""),
+                    username=target.get("username", ""),
+                    password=target.get("password", ""),
+                    name=target.get("name", ""),
+                    album_id=target.get("album_id", "")
+                )
+                for target in data.get("lychee_targets", [])
+            ],
+            photoprism_sources=[
+                PhotoPrismConfig(
+                    url=source.get("url", ""),
+                    username=source.get("username", ""),
+                    password=source.get("password", ""),
+                    name=source.get("name", "")
+                )
+                for source in data.get("photoprism_sources", [])
+            ],
+            local_index=bool(data.get("local_index", False)),
+            local_index_path=data.get("local_index_path", "photo_index.sqlite3")
         )
     
     def to_dict(self) -> dict:
@@ -51,7 +106,31 @@ class AppConfig:
             "photoprism_pass": self.photoprism.password,
             "lychee_url": self.lychee.url,
             "lychee_user": self.lychee.username,
-            "lychee_pass": self.lychee.password
+            "lychee_pass": self.lychee.password,
+            "download_limit_kbps": self.transfer.download_limit_kbps,
+            "upload_limit_kbps": self.transfer.upload_limit_kbps,
+            "server_side_import": self.transfer.server_side_import,
+            "lychee_targets": [
+                {
+                    "name": target.name,
+                    "url": target.url,
+                    "username": target.username,
+                    "password": target.password,
+                    "album_id": target.album_id
+                }
+                for target in self.lychee_targets
+            ],
+            "photoprism_sources": [
+                {
+                    "name": source.name,
+                    "url": source.url,
+                    "username": source.username,
+                    "password": source.password
+                }
+                for source in self.photoprism_sources
+            ],
+            "local_index": self.local_index,
+            "local_index_path": self.local_index_path
         }
 
 
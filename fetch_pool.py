@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional
+
+
+# Long-lived worker pool whose concurrency limit follows AIMD: successful
+# fetches grow the limit by about one slot per window, server errors halve it
+# and latency well above its own recent history shrinks it gently.
+class AdaptiveFetchPool:
+
+    def __init__(self, min_workers: int = 2, max_workers: int = 32, initial_workers: int = 8,
+                 latency_tolerance: float = 2.0, error_backoff: float = 0.5, latency_backoff: float = 0.9,
+                 latency_window: int = 100):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.latency_tolerance = latency_tolerance
+        self.error_backoff = error_backoff
+        self.latency_backoff = latency_backoff
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._condition = threading.Condition()
+        self._limit = float(max(min_workers, min(max_workers, initial_workers)))
+        self._in_flight = 0
+        self._latency: Optional[float] = None
+        self._latency_history: Deque[float] = deque(maxlen=latency_window)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        return self._executor.submit(self._run, fn, *args)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self._acquire()
+        start = time.monotonic()
+        try:
+            result = fn(*args)
+        except Exception:
+            self._release(time.monotonic() - start, failed=True)
+            raise
+
+        self._release(time.monotonic() - start, failed=False)
+        return result
+
+    def _acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def _release(self, elapsed: float, failed: bool):
+        with self._condition:
+            self._in_flight -= 1
+
+            if failed:
+                self._limit *= self.error_backoff
+            else:
+                baseline = self._record_latency(elapsed)
+
+                if self._latency is not None and self._latency > baseline * self.latency_tolerance:
+                    self._limit *= self.latency_backoff
+                else:
+                    self._limit += 1.0 / self._limit
+
+            self._limit = max(float(self.min_workers), min(float(self.max_workers), self._limit))
+            self._condition.notify_all()
+
+    def _record_latency(self, elapsed: float) -> float:
+        # The baseline is the median of the smoothed latency over the last window of
+        # fetches. A minimum would be pinned by a few fast (cached) responses and make
+        # every normal one look congested, while the median follows the usual mix.
+        baseline = statistics.median(self._latency_history) if self._latency_history else elapsed
+
+        if self._latency is None:
+            self._latency = elapsed
+        else:
+            self._latency += (elapsed - self._latency) * 0.2
+        self._latency_history.append(self._latency)
+        return baseline
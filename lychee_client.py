@@ -1,9 +1,18 @@
+import bisect
+import json
+import os
+import threading
+import time
 import requests
 import urllib.parse
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import uuid
+from typing import List, Dict, Any, BinaryIO, Callable, Iterator, Optional, Set, Tuple, Union
+from dataclasses import dataclass, asdict
+from urllib3 import encode_multipart_formdata
 
 from config import LycheeConfig
+from metrics import metrics
+from transfer_scheduler import UPLOAD, ThrottledReader, TransferPriority, TransferScheduler
 
 
 @dataclass
@@ -12,12 +21,182 @@ class LycheeAlbum:
     title: str
     owner: str
     indent: int = 0
+    parent_id: Optional[str] = None
+    has_children: bool = False
+
+
+class AlbumIndex:
+    def __init__(self, albums: List[LycheeAlbum]):
+        # A copy, add_children must not grow the cached top-level list
+        self.albums = list(albums)
+        self.by_id: Dict[str, LycheeAlbum] = {}
+        self.children: Dict[Optional[str], List[LycheeAlbum]] = {}
+        self._order: Dict[str, int] = {}
+        
+        # Sorted (word, id) pairs so a prefix lookup is a bisect plus a short scan
+        self._title_words: List[Tuple[str, str]] = []
+        
+        for album in albums:
+            self._add(album)
+        self._title_words.sort()
+    
+    def is_loaded(self, album_id: str) -> bool:
+        album = self.by_id.get(album_id)
+        return album is not None and (not album.has_children or album_id in self.children)
+    
+    def add_children(self, parent_id: str, albums: List[LycheeAlbum]):
+        self.children[parent_id] = []
+        for album in albums:
+            if album.id in self.by_id:
+                continue
+            self.albums.append(album)
+            self._add(album, keep_sorted=True)
+    
+    def _add(self, album: LycheeAlbum, keep_sorted: bool = False):
+        self.by_id[album.id] = album
+        self._order[album.id] = len(self._order)
+        self.children.setdefault(album.parent_id, []).append(album)
+        for word in album.title.lower().split():
+            if keep_sorted:
+                bisect.insort(self._title_words, (word, album.id))
+            else:
+                self._title_words.append((word, album.id))
+    
+    def __len__(self) -> int:
+        return len(self.albums)
+    
+    def __iter__(self) -> Iterator[LycheeAlbum]:
+        return iter(self.albums)
+    
+    def get(self, album_id: str) -> Optional[LycheeAlbum]:
+        return self.by_id.get(album_id)
+    
+    def get_children(self, parent_id: Optional[str] = None) -> List[LycheeAlbum]:
+        return self.children.get(parent_id, [])
+    
+    def search(self, query: str, within: Optional[List[LycheeAlbum]] = None) -> List[LycheeAlbum]:
+        words = query.lower().split()
+        if not words:
+            return list(within if within is not None else self.albums)
+        
+        # Narrowing an earlier result set is cheaper than going back to the index
+        if within is not None:
+            return [album for album in within if self._matches(album, words)]
+        
+        matching_ids: Optional[Set[str]] = None
+        for word in words:
+            ids = self._ids_with_word_prefix(word)
+            matching_ids = ids if matching_ids is None else matching_ids & ids
+            if not matching_ids:
+                return []
+        
+        assert matching_ids is not None
+        return [self.by_id[album_id] for album_id in sorted(matching_ids, key=self._order.__getitem__)]
+    
+    def _ids_with_word_prefix(self, prefix: str) -> Set[str]:
+        ids = set()
+        position = bisect.bisect_left(self._title_words, (prefix, ""))
+        while position < len(self._title_words) and self._title_words[position][0].startswith(prefix):
+            ids.add(self._title_words[position][1])
+            position += 1
+        return ids
+    
+    def _matches(self, album: LycheeAlbum, words: List[str]) -> bool:
+        title_words = album.title.lower().split()
+        return all(any(t.startswith(word) for t in title_words) for word in words)
+
+
+@dataclass
+class UploadResult:
+    photo_id: str = ""
+    checksum: str = ""
+
+
+@dataclass
+class LycheePhoto:
+    id: str
+    title: str = ""
+    checksum: str = ""
+
+
+@dataclass
+class CachedAlbums:
+    albums: List[LycheeAlbum]
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: float = 0.0
+    
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+class AlbumCache:
+    def __init__(self, cache_file: str = "lychee_album_cache.json", ttl: float = 300):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._entries: Optional[Dict[str, CachedAlbums]] = None
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[CachedAlbums]:
+        with self._lock:
+            return self._load_entries().get(key)
+    
+    def store(self, key: str, entry: CachedAlbums):
+        # Sub-albums are fetched on expansion, only the top level is kept across sessions
+        entry.albums = [album for album in entry.albums if album.parent_id is None]
+        with self._lock:
+            entries = self._load_entries()
+            entries[key] = entry
+            self._save_entries(entries)
+    
+    def _load_entries(self) -> Dict[str, CachedAlbums]:
+        if self._entries is not None:
+            return self._entries
+        
+        self._entries = {}
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r") as f:
+                    data = json.load(f)
+                for key, entry in data.items():
+                    self._entries[key] = CachedAlbums(
+                        albums=[LycheeAlbum(**album) for album in entry.get("albums", [])
+                                if album.get("parent_id") is None],
+                        etag=entry.get("etag", ""),
+                        last_modified=entry.get("last_modified", ""),
+                        fetched_at=entry.get("fetched_at", 0.0)
+                    )
+        except Exception as e:
+            print(f"Error loading album cache: {e}")
+        
+        return self._entries
+    
+    def _save_entries(self, entries: Dict[str, CachedAlbums]):
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump({key: asdict(entry) for key, entry in entries.items()}, f)
+        except Exception as e:
+            print(f"Error saving album cache: {e}")
 
 
 class LycheeClient:    
-    def __init__(self, config: LycheeConfig):
+    def __init__(self, config: LycheeConfig, scheduler: Optional[TransferScheduler] = None,
+                 album_cache: Optional[AlbumCache] = None):
         self.config = config
+        self.scheduler = scheduler or TransferScheduler()
+        self.album_cache = album_cache or AlbumCache()
         self.session: Optional[requests.Session] = None
+        self._children_cache: Dict[str, List[LycheeAlbum]] = {}
+        self._inline_children: Dict[str, List[Dict[str, Any]]] = {}
+        self._children_lock = threading.Lock()
+        self._xsrf_token: Optional[str] = None
+        self._json_headers: Dict[str, str] = {}
+        self._login_lock = threading.Lock()
+        self._login_generation = 0
+        # Cleared once Lychee rejects an import-from-URL request outright
+        self.url_import_supported = True
+        # Set once an upload response carries the stored photo, so it needn't be looked up
+        self.upload_reports_photo = False
     
     def connect(self) -> bool:
         if not self.config.is_complete():
@@ -25,120 +204,306 @@ class LycheeClient:
         
         try:
             self.session = requests.Session()
+            self._login()
+            return True
             
-            # Get CSRF token from home page
+        except Exception as e:
+            raise Exception(f"Lychee connection error: {str(e)}")
+    
+    def _login(self):
+        assert self.session is not None
+        self.session.cookies.clear()
+        
+        # Get CSRF token from home page
+        with metrics.track("lychee.home") as measurement:
             home_response = self.session.get(self.config.url.rstrip('/'))
-            
-            xsrf_token = self._extract_xsrf_token()
-            if not xsrf_token:
-                raise Exception("Could not get CSRF token from Lychee")
-            
-            # Login
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "X-Requested-With": "XMLHttpRequest",
-                "X-XSRF-TOKEN": xsrf_token
-            }
-            
-            login_data = {
-                "username": self.config.username,
-                "password": self.config.password
-            }
-            
+            measurement.record_response(home_response)
+        
+        xsrf_token = self._extract_xsrf_token()
+        if not xsrf_token:
+            raise Exception("Could not get CSRF token from Lychee")
+        self._set_xsrf_token(xsrf_token)
+        
+        login_data = {
+            "username": self.config.username,
+            "password": self.config.password
+        }
+        
+        with metrics.track("lychee.login") as measurement:
             response = self.session.post(
                 f"{self.config.url.rstrip('/')}/api/v2/Auth::login",
                 json=login_data,
-                headers=headers
+                headers=self._get_json_headers()
             )
+            measurement.record_response(response)
+        
+        if response.status_code not in [200, 204]:
+            error_msg = f"Login failed with status {response.status_code}"
+            if response.text:
+                try:
+                    error_data = response.json()
+                    if 'message' in error_data:
+                        error_msg += f": {error_data['message']}"
+                except:
+                    error_msg += f": {response.text[:200]}"
+            raise Exception(error_msg)
+        
+        self._update_xsrf_token(response)
+        self._login_generation += 1
+    
+    def _relogin(self, generation: int):
+        with self._login_lock:
+            # Another thread already logged in again after this request was sent
+            if self._login_generation != generation:
+                return
+            metrics.increment("lychee.relogin")
+            self._login()
+    
+    def _request(self, method: str, url: str, headers: Dict[str, str],
+                 body: Optional[Callable[[], Any]] = None, **kwargs) -> requests.Response:
+        session = self.session
+        assert session is not None
+        
+        def send() -> requests.Response:
+            if self._xsrf_token:
+                headers['X-XSRF-TOKEN'] = self._xsrf_token
+            # Bodies are rebuilt per attempt since a streamed reader can only be sent once
+            response = session.request(method, url, headers=headers, data=body() if body else None, **kwargs)
+            self._update_xsrf_token(response)
+            return response
+        
+        generation = self._login_generation
+        response = send()
+        
+        # 419 is Laravel's expired CSRF token, 401 an expired session
+        if response.status_code in (401, 419):
+            response.close()
+            self._relogin(generation)
+            response = send()
+        
+        return response
+    
+    def get_albums(self, force_refresh: bool = False) -> AlbumIndex:
+        if not self.session:
+            raise Exception("Not connected to Lychee")
+        
+        try:
+            cache_key = self._album_cache_key()
+            cached = self.album_cache.get(cache_key)
+            if cached and not force_refresh and cached.is_fresh(self.album_cache.ttl):
+                return AlbumIndex(cached.albums)
             
-            if response.status_code not in [200, 204]:
-                error_msg = f"Login failed with status {response.status_code}"
-                if response.text:
-                    try:
-                        error_data = response.json()
-                        if 'message' in error_data:
-                            error_msg += f": {error_data['message']}"
-                    except:
-                        error_msg += f": {response.text[:200]}"
-                raise Exception(error_msg)
+            if force_refresh:
+                # A 304 only covers the top level, sub-albums are fetched again as well
+                with self._children_lock:
+                    self._children_cache.clear()
             
-            return True
+            headers = self._get_json_headers()
+            
+            # Revalidate instead of re-downloading the whole tree when possible
+            if cached:
+                if cached.etag:
+                    headers['If-None-Match'] = cached.etag
+                if cached.last_modified:
+                    headers['If-Modified-Since'] = cached.last_modified
+            
+            with metrics.track("lychee.albums") as measurement:
+                response = self._request(
+                    "GET",
+                    f"{self.config.url.rstrip('/')}/api/v2/Albums",
+                    headers
+                )
+                measurement.record_response(response)
+            
+            if response.status_code == 304 and cached:
+                cached.fetched_at = time.time()
+                self.album_cache.store(cache_key, cached)
+                return AlbumIndex(cached.albums)
+            
+            if response.status_code != 200:
+                raise Exception(f"Failed to get albums: {response.status_code}")
+            
+            with self._children_lock:
+                self._children_cache.clear()
+                self._inline_children.clear()
+            
+            albums = self._parse_albums(response.json())
+            self.album_cache.store(cache_key, CachedAlbums(
+                albums=albums,
+                etag=response.headers.get('ETag', ''),
+                last_modified=response.headers.get('Last-Modified', ''),
+                fetched_at=time.time()
+            ))
+            return AlbumIndex(albums)
             
         except Exception as e:
-            raise Exception(f"Lychee connection error: {str(e)}")
+            raise Exception(f"Error loading albums: {str(e)}")
+    
+    def get_cached_albums(self) -> AlbumIndex:
+        cached = self.album_cache.get(self._album_cache_key())
+        return AlbumIndex(cached.albums if cached else [])
     
-    def get_albums(self) -> List[LycheeAlbum]:
+    def get_album_children(self, album: LycheeAlbum) -> List[LycheeAlbum]:
         if not self.session:
             raise Exception("Not connected to Lychee")
         
+        with self._children_lock:
+            if album.id in self._children_cache:
+                return self._children_cache[album.id]
+            inline_children = self._inline_children.pop(album.id, None)
+        
         try:
-            xsrf_token = self._extract_xsrf_token()
-            
-            headers = {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'X-Requested-With': 'XMLHttpRequest'
-            }
+            if inline_children is not None:
+                children = self._parse_albums(inline_children, album.indent + 1, album.id)
+            else:
+                with metrics.track("lychee.album") as measurement:
+                    response = self._request(
+                        "GET",
+                        f"{self.config.url.rstrip('/')}/api/v2/Album",
+                        self._get_json_headers(),
+                        params={'album_id': album.id}
+                    )
+                    measurement.record_response(response)
+                
+                if response.status_code != 200:
+                    raise Exception(f"Failed to get album {album.id}: {response.status_code}")
+                
+                album_data = response.json()
+                album_data = album_data.get('resource', album_data)
+                children = self._parse_albums(album_data.get('albums', []), album.indent + 1, album.id)
             
-            if xsrf_token:
-                headers['X-XSRF-TOKEN'] = xsrf_token
+            with self._children_lock:
+                self._children_cache[album.id] = children
+            return children
             
-            response = self.session.get(
-                f"{self.config.url.rstrip('/')}/api/v2/Albums",
-                headers=headers
-            )
+        except Exception as e:
+            raise Exception(f"Error loading sub-albums: {str(e)}")
+    
+    def get_album_checksums(self, album_id: str) -> Set[str]:
+        return {photo.checksum for photo in self.get_album_photos(album_id) if photo.checksum}
+    
+    def get_album_photos(self, album_id: str) -> List[LycheePhoto]:
+        if not self.session:
+            raise Exception("Not connected to Lychee")
+        
+        try:
+            with metrics.track("lychee.album") as measurement:
+                response = self._request(
+                    "GET",
+                    f"{self.config.url.rstrip('/')}/api/v2/Album",
+                    self._get_json_headers(),
+                    # Photos uploaded without an album land in the "unsorted" smart album
+                    params={'album_id': album_id or 'unsorted'}
+                )
+                measurement.record_response(response)
             
             if response.status_code != 200:
-                raise Exception(f"Failed to get albums: {response.status_code}")
+                raise Exception(f"Failed to get album {album_id}: {response.status_code}")
             
-            albums_data = response.json()
-            return self._parse_albums(albums_data)
+            album_data = response.json()
+            album_data = album_data.get('resource', album_data)
+            return [
+                LycheePhoto(
+                    id=str(photo.get('id', '')),
+                    title=str(photo.get('title', '') or ''),
+                    checksum=str(photo.get('checksum', '') or '').lower()
+                )
+                for photo in album_data.get('photos') or []
+                if isinstance(photo, dict)
+            ]
             
         except Exception as e:
-            raise Exception(f"Error loading albums: {str(e)}")
+            raise Exception(f"Error loading album photos: {str(e)}")
+    
+    def upload_photo(self, photo_data: Union[bytes, BinaryIO], filename: str, album_id: str = "",
+                     priority: TransferPriority = TransferPriority.USER_TRANSFER, sha1: str = "") -> UploadResult:
+        # Lychee's chunked upload answers with upload metadata only. The stored photo is
+        # then found among the album's photos that weren't there before the upload.
+        known_ids = None
+        if not self.upload_reports_photo:
+            try:
+                known_ids = {photo.id for photo in self.get_album_photos(album_id)}
+            except Exception:
+                metrics.increment("lychee.upload_lookup_failed")
+        
+        result = self._send_upload(photo_data, filename, album_id, priority)
+        if result.photo_id:
+            self.upload_reports_photo = True
+            return result
+        if known_ids is None:
+            return result
+        
+        try:
+            return self._find_upload(album_id, known_ids, filename, sha1)
+        except Exception:
+            # The photo is stored, it just can't be verified
+            metrics.increment("lychee.upload_lookup_failed")
+            return result
+    
+    def _find_upload(self, album_id: str, known_ids: Set[str], filename: str, sha1: str) -> UploadResult:
+        # Lychee titles photos after the file name without its extension
+        title = os.path.splitext(os.path.basename(filename))[0]
+        new_photos = [photo for photo in self.get_album_photos(album_id) if photo.id not in known_ids]
+        
+        # Concurrent uploads into the same album are told apart by checksum first
+        for photo in new_photos:
+            if sha1 and photo.checksum == sha1.lower():
+                return UploadResult(photo_id=photo.id, checksum=photo.checksum)
+        for photo in new_photos:
+            if photo.title == title:
+                return UploadResult(photo_id=photo.id, checksum=photo.checksum)
+        return UploadResult()
     
-    def upload_photo(self, photo_data: bytes, filename: str, album_id: str = "") -> bool:
+    def _send_upload(self, photo_data: Union[bytes, BinaryIO], filename: str, album_id: str,
+                     priority: TransferPriority) -> UploadResult:
         if not self.session:
             raise Exception("Not connected to Lychee")
         
         try:
-            xsrf_token = self._extract_xsrf_token()
             content_type = self._get_content_type(filename)
             
-            # Standard multipart upload
-            files = {
-                'file': (filename, photo_data, content_type)
-            }
+            if not isinstance(photo_data, (bytes, bytearray)):
+                # Large originals arrive as open files and are streamed from disk
+                try:
+                    from requests_toolbelt.multipart.encoder import MultipartEncoder
+                except ImportError:
+                    photo_data = photo_data.read()
+                else:
+                    return self._upload_file(photo_data, filename, content_type, album_id, priority, MultipartEncoder)
             
-            data = {
+            # Standard multipart upload, encoded up front so the body can be
+            # streamed through the transfer scheduler
+            body, multipart_content_type = encode_multipart_formdata({
                 'file_name': filename,
                 'uuid_name': '',
                 'extension': '',
-                'chunk_number': 1,
-                'total_chunks': 1,
+                'chunk_number': '1',
+                'total_chunks': '1',
                 'album_id': album_id,
-            }
+                'file': (filename, photo_data, content_type),
+            })
             
             headers = {
+                'Content-Type': multipart_content_type,
                 'Accept': 'application/json',
                 'X-Requested-With': 'XMLHttpRequest'
             }
             
-            if xsrf_token:
-                headers['X-XSRF-TOKEN'] = xsrf_token
-            
             upload_url = f"{self.config.url.rstrip('/')}/api/v2/Photo"
             
-            response = self.session.post(
-                upload_url,
-                files=files,
-                data=data,
-                headers=headers
-            )
+            with self.scheduler.transfer(UPLOAD, priority) as transfer, \
+                    metrics.track("lychee.upload") as measurement:
+                response = self._request(
+                    "POST",
+                    upload_url,
+                    headers,
+                    lambda: ThrottledReader(body, transfer)
+                )
+                measurement.record_response(response, count_body=False)
+                measurement.add_bytes(len(body))
             
             if response.status_code in [200, 201]:
-                return True
+                return self._parse_upload_result(response)
             
             # Try with multipart encoder if available
             try:
@@ -162,36 +527,182 @@ class LycheeClient:
                     'X-Requested-With': 'XMLHttpRequest'
                 }
                 
-                if xsrf_token:
-                    headers2['X-XSRF-TOKEN'] = xsrf_token
-                
-                response2 = self.session.post(
-                    upload_url,
-                    data=multipart_data,
-                    headers=headers2
-                )
+                multipart_body = multipart_data.to_string()
+                with self.scheduler.transfer(UPLOAD, priority) as transfer, \
+                        metrics.track("lychee.upload") as measurement:
+                    response2 = self._request(
+                        "POST",
+                        upload_url,
+                        headers2,
+                        lambda: ThrottledReader(multipart_body, transfer)
+                    )
+                    measurement.record_response(response2, count_body=False)
+                    measurement.add_bytes(len(multipart_body))
                 
                 if response2.status_code in [200, 201]:
-                    return True
+                    return self._parse_upload_result(response2)
                     
             except ImportError:
                 pass
             
-            # Handle upload failure
-            error_msg = f"Upload failed with status {response.status_code}"
+            raise Exception(self._upload_error(response))
+            
+        except Exception as e:
+            raise Exception(f"Upload error: {str(e)}")
+    
+    def _upload_file(self, photo_file: BinaryIO, filename: str, content_type: str, album_id: str,
+                     priority: TransferPriority, encoder_class: Any) -> UploadResult:
+        # One boundary for every attempt, the Content-Type header is built only once
+        boundary = uuid.uuid4().hex
+        
+        def encode():
+            # A retry after a re-login sends the file again from the start
+            photo_file.seek(0)
+            return encoder_class(
+                fields={
+                    'file_name': filename,
+                    'uuid_name': '',
+                    'extension': '',
+                    'chunk_number': '1',
+                    'total_chunks': '1',
+                    'album_id': album_id,
+                    'file': (filename, photo_file, content_type),
+                },
+                boundary=boundary
+            )
+        
+        multipart_data = encode()
+        headers = {
+            'Content-Type': multipart_data.content_type,
+            'Accept': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+        
+        with self.scheduler.transfer(UPLOAD, priority) as transfer, \
+                metrics.track("lychee.upload") as measurement:
+            response = self._request(
+                "POST",
+                f"{self.config.url.rstrip('/')}/api/v2/Photo",
+                headers,
+                lambda: ThrottledReader(encode(), transfer)
+            )
+            measurement.record_response(response, count_body=False)
+            measurement.add_bytes(multipart_data.len)
+        
+        if response.status_code in [200, 201]:
+            return self._parse_upload_result(response)
+        raise Exception(self._upload_error(response))
+    
+    def _upload_error(self, response: requests.Response) -> str:
+        error_msg = f"Upload failed with status {response.status_code}"
+        try:
+            error_data = response.json()
+            if 'message' in error_data:
+                error_msg += f": {error_data['message']}"
+            elif 'errors' in error_data:
+                error_msg += f": {error_data['errors']}"
+        except:
+            error_msg += f": {response.text[:200]}"
+        return error_msg
+    
+    def import_from_url(self, url: str, album_id: str = "") -> UploadResult:
+        if not self.session:
+            raise Exception("Not connected to Lychee")
+        
+        try:
+            # Lychee fetches the file itself, so no photo data passes through this client
+            with metrics.track("lychee.import") as measurement:
+                response = self._request(
+                    "POST",
+                    f"{self.config.url.rstrip('/')}/api/v2/Photo::fromUrl",
+                    self._get_json_headers(),
+                    lambda: json.dumps({'urls': [url], 'album_id': album_id or None})
+                )
+                measurement.record_response(response)
+            
+            if response.status_code in [200, 201]:
+                return self._parse_upload_result(response)
+            
+            # A missing endpoint won't appear on retry. 422 only rejects this URL or
+            # file, the caller relays that photo and keeps importing the others.
+            if response.status_code in [404, 405]:
+                self.url_import_supported = False
+            
+            error_msg = f"Import failed with status {response.status_code}"
             try:
                 error_data = response.json()
                 if 'message' in error_data:
                     error_msg += f": {error_data['message']}"
-                elif 'errors' in error_data:
-                    error_msg += f": {error_data['errors']}"
             except:
                 error_msg += f": {response.text[:200]}"
-            
             raise Exception(error_msg)
             
         except Exception as e:
-            raise Exception(f"Upload error: {str(e)}")
+            raise Exception(f"Import error: {str(e)}")
+    
+    def delete_photo(self, photo_id: str, album_id: str = ""):
+        if not self.session:
+            raise Exception("Not connected to Lychee")
+        
+        try:
+            with metrics.track("lychee.delete") as measurement:
+                response = self._request(
+                    "DELETE",
+                    f"{self.config.url.rstrip('/')}/api/v2/Photo",
+                    self._get_json_headers(),
+                    lambda: json.dumps({'photo_ids': [photo_id], 'from_id': album_id or None})
+                )
+                measurement.record_response(response)
+            
+            if response.status_code not in [200, 204]:
+                raise Exception(f"Failed to delete photo {photo_id}: {response.status_code}")
+            
+        except Exception as e:
+            raise Exception(f"Delete error: {str(e)}")
+    
+    def _parse_upload_result(self, response: requests.Response) -> UploadResult:
+        try:
+            data = response.json()
+        except ValueError:
+            return UploadResult()
+        
+        # Imports answer with a list of photos, one per URL
+        if isinstance(data, list):
+            data = data[0] if data else {}
+        
+        # The photo may be at the top level or wrapped, depending on the Lychee version
+        for photo in (data, data.get('photo'), data.get('resource')) if isinstance(data, dict) else ():
+            if isinstance(photo, dict) and (photo.get('checksum') or photo.get('id')):
+                return UploadResult(
+                    photo_id=str(photo.get('id', '')),
+                    checksum=str(photo.get('checksum', '') or '').lower()
+                )
+        
+        return UploadResult()
+    
+    def _album_cache_key(self) -> str:
+        return f"{self.config.url.rstrip('/')}|{self.config.username}"
+    
+    def _get_json_headers(self) -> Dict[str, str]:
+        # Callers add per-request headers, so hand out a copy of the cached set
+        return dict(self._json_headers)
+    
+    def _set_xsrf_token(self, xsrf_token: str):
+        self._xsrf_token = xsrf_token
+        self._json_headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest',
+            'X-XSRF-TOKEN': xsrf_token
+        }
+    
+    def _update_xsrf_token(self, response: requests.Response):
+        # Lychee may rotate the token on any response; only this response's cookies are checked
+        cookie = response.cookies.get("XSRF-TOKEN")
+        if cookie:
+            xsrf_token = urllib.parse.unquote(cookie)
+            if xsrf_token != self._xsrf_token:
+                self._set_xsrf_token(xsrf_token)
     
     def _extract_xsrf_token(self) -> Optional[str]:
         if not self.session:
@@ -203,40 +714,39 @@ class LycheeClient:
         
         return None
     
-    def _parse_albums(self, albums_data: Dict[str, Any]) -> List[LycheeAlbum]:
-        albums = []
-        
-        def parse_albums_recursive(albums_list, indent=0):
-            if isinstance(albums_list, dict):
+    def _parse_albums(self, albums_data: Any, indent: int = 0, parent_id: Optional[str] = None) -> List[LycheeAlbum]:
+        albums_list = albums_data
+        if isinstance(albums_list, dict):
+            albums_list = (
+                albums_list.get('albums', []) or 
+                albums_list.get('data', [])
+            )
+            if not albums_list and 'smart_albums' in albums_list:
                 albums_list = (
-                    albums_list.get('albums', []) or 
-                    albums_list.get('data', [])
+                    albums_list.get('smart_albums', []) + 
+                    albums_list.get('tag_albums', []) + 
+                    albums_list.get('albums', [])
                 )
-                if not albums_list and 'smart_albums' in albums_list:
-                    albums_list = (
-                        albums_list.get('smart_albums', []) + 
-                        albums_list.get('tag_albums', []) + 
-                        albums_list.get('albums', [])
-                    )
-            
-            for album in albums_list:
-                if isinstance(album, dict):
-                    album_id = album.get('id', '')
-                    album_title = album.get('title', 'Untitled')
-                    album_owner = album.get('owner_name', 'Unknown')
-                    
-                    albums.append(LycheeAlbum(
-                        id=album_id,
-                        title=album_title,
-                        owner=album_owner,
-                        indent=indent
-                    ))
-                    
-                    # Parse nested albums
-                    if 'albums' in album and album['albums']:
-                        parse_albums_recursive(album['albums'], indent + 1)
         
-        parse_albums_recursive(albums_data)
+        # Only one level is parsed, nested albums are resolved on expansion
+        albums = []
+        for album in albums_list:
+            if isinstance(album, dict):
+                album_id = album.get('id', '')
+                nested = album.get('albums') or []
+                if nested:
+                    with self._children_lock:
+                        self._inline_children[album_id] = nested
+                
+                albums.append(LycheeAlbum(
+                    id=album_id,
+                    title=album.get('title', 'Untitled'),
+                    owner=album.get('owner_name', 'Unknown'),
+                    indent=indent,
+                    parent_id=parent_id,
+                    has_children=bool(nested or album.get('has_subalbum') or album.get('num_subalbums'))
+                ))
+        
         return albums
     
     def _get_content_type(self, filename: str) -> str:
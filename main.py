@@ -1,12 +1,22 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from config import AppConfig, ConfigManager
-from photoprism_client import PhotoPrismClient
-from lychee_client import LycheeClient, LycheeAlbum
+from photoprism_client import PHOTO_TYPES, PhotoFilters
+from photoprism_sources import PhotoPrismSources
+from lychee_client import AlbumCache, AlbumIndex, LycheeClient, LycheeAlbum
 from photo_grid import PhotoGrid
+from photo_index import PhotoIndex
+from search_cache import SearchCache
+from album_picker import AlbumPicker
+from calendar_view import CalendarView
+from metrics import metrics
+from metrics_panel import MetricsPanel
+from transfer import IntegrityRetryQueue, PhotoTransfer, UploadTarget
+from transfer_scheduler import TransferScheduler
 
 class PhotoSyncApp:
     
@@ -18,16 +28,24 @@ class PhotoSyncApp:
         # Configuration and clients
         self.config_manager = ConfigManager()
         self.config = self.config_manager.load_config()
-        self.photoprism_client = PhotoPrismClient(self.config.photoprism)
-        self.lychee_client = LycheeClient(self.config.lychee)
+        self.transfer_scheduler = TransferScheduler.from_config(self.config.transfer)
+        self.photoprism_client = self.create_photoprism_sources()
+        self.album_cache = AlbumCache()
+        self.integrity_retry_queue = IntegrityRetryQueue()
+        self.lychee_client = LycheeClient(self.config.lychee, self.transfer_scheduler, self.album_cache)
+        self.extra_lychee_clients = self.create_extra_lychee_clients()
+        self.photo_index = PhotoIndex(self.config.local_index_path) if self.config.local_index else None
+        self.search_cache = SearchCache()
         
         # State
         self.selected_photo: Optional[Dict[str, Any]] = None
         self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.albums: list[LycheeAlbum] = []
+        self.albums = AlbumIndex([])
+        self.search_generation = 0
         
         self.setup_ui()
         self.load_ui_from_config()
+        self.load_cached_albums_async()
     
     def setup_ui(self):
         # Main frame
@@ -100,7 +118,36 @@ class PhotoSyncApp:
         
         ttk.Button(date_frame, text="Search Photos", command=self.search_photos).grid(row=0, column=2, padx=(0, 10))
         ttk.Button(date_frame, text="Previous Day", command=self.previous_day).grid(row=0, column=3, padx=(0, 5))
-        ttk.Button(date_frame, text="Next Day", command=self.next_day).grid(row=0, column=4)
+        ttk.Button(date_frame, text="Next Day", command=self.next_day).grid(row=0, column=4, padx=(0, 5))
+        
+        self.calendar_view = CalendarView(self.root, self.select_date)
+        ttk.Button(date_frame, text="Calendar", command=self.show_calendar).grid(row=0, column=5)
+        
+        # Filters are applied by PhotoPrism, so only matching photos are transferred
+        filter_frame = ttk.Frame(date_frame)
+        filter_frame.grid(row=1, column=0, columnspan=6, sticky=tk.W, pady=(5, 0))
+        
+        self.favorite_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Favorites", variable=self.favorite_var).grid(row=0, column=0, padx=(0, 10))
+        self.public_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Hide Private", variable=self.public_var).grid(row=0, column=1, padx=(0, 10))
+        
+        ttk.Label(filter_frame, text="Type:").grid(row=0, column=2, padx=(0, 5))
+        self.type_var = tk.StringVar(value="")
+        ttk.Combobox(filter_frame, textvariable=self.type_var, values=("",) + PHOTO_TYPES,
+                     state="readonly", width=10).grid(row=0, column=3, padx=(0, 10))
+        
+        ttk.Label(filter_frame, text="Label:").grid(row=0, column=4, padx=(0, 5))
+        self.label_var = tk.StringVar(value="")
+        ttk.Entry(filter_frame, textvariable=self.label_var, width=15).grid(row=0, column=5, padx=(0, 10))
+        
+        ttk.Label(filter_frame, text="Camera:").grid(row=0, column=6, padx=(0, 5))
+        self.camera_var = tk.StringVar(value="")
+        ttk.Entry(filter_frame, textvariable=self.camera_var, width=15).grid(row=0, column=7, padx=(0, 10))
+        
+        ttk.Label(filter_frame, text="Min Quality:").grid(row=0, column=8, padx=(0, 5))
+        self.quality_var = tk.IntVar(value=1)
+        ttk.Spinbox(filter_frame, from_=0, to=7, textvariable=self.quality_var, width=4).grid(row=0, column=9)
     
     def setup_photo_section(self, parent: ttk.Frame):
         photo_frame = ttk.LabelFrame(parent, text="Photo Selection", padding="10")
@@ -117,20 +164,20 @@ class PhotoSyncApp:
         action_frame = ttk.Frame(parent)
         action_frame.grid(row=3, column=0, columnspan=2, sticky="we", pady=10)
         
-        # Album selection dropdown
-        ttk.Label(action_frame, text="Lychee Album:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
-        self.album_var = tk.StringVar()
-        self.album_dropdown = ttk.Combobox(action_frame, textvariable=self.album_var, width=40, state="readonly")
-        self.album_dropdown.grid(row=0, column=1, padx=(0, 10))
-        
-        # Initially populate with root album option
-        self.album_dropdown['values'] = ["Root Album (No specific album)"]
-        self.album_dropdown.set("Root Album (No specific album)")
+        # Album picker with filter-as-you-type
+        ttk.Label(action_frame, text="Lychee Album:").grid(row=0, column=0, sticky=tk.NW, padx=(0, 5))
+        self.album_picker = AlbumPicker(action_frame, self.load_album_children)
+        self.album_picker.grid(row=0, column=1, columnspan=2, sticky="we", padx=(0, 10))
         
         # Action buttons
         ttk.Button(action_frame, text="Upload Selected to Lychee", command=self.upload_to_lychee).grid(row=1, column=0, pady=(5, 0), padx=(0, 10))
-        ttk.Button(action_frame, text="Load Albums", command=self.load_lychee_albums).grid(row=1, column=1, pady=(5, 0), padx=(0, 10))
-        ttk.Button(action_frame, text="Save Config", command=self.save_config).grid(row=1, column=2, pady=(5, 0))
+        ttk.Button(action_frame, text="Upload All Shown", command=self.upload_all_to_lychee).grid(row=1, column=1, pady=(5, 0), padx=(0, 10))
+        ttk.Button(action_frame, text="Load Albums", command=self.load_lychee_albums).grid(row=1, column=2, pady=(5, 0), padx=(0, 10))
+        ttk.Button(action_frame, text="Save Config", command=self.save_config).grid(row=1, column=3, pady=(5, 0), padx=(0, 10))
+        
+        self.metrics_panel = MetricsPanel(self.root, metrics)
+        ttk.Button(action_frame, text="Retry Failed", command=self.retry_failed_uploads).grid(row=1, column=4, pady=(5, 0), padx=(0, 10))
+        ttk.Button(action_frame, text="Metrics", command=self.metrics_panel.show).grid(row=1, column=5, pady=(5, 0))
     
     def load_ui_from_config(self):
         self.photoprism_url_var.set(self.config.photoprism.url)
@@ -154,46 +201,165 @@ class PhotoSyncApp:
             self.config_manager.save_config(self.config, silent=True)
             
             # Update client with new config
-            self.photoprism_client = PhotoPrismClient(self.config.photoprism)
-            self.photoprism_client.connect()
+            self.photoprism_client = self.create_photoprism_sources()
+            self.search_cache.clear()
+            failed = self.photoprism_client.connect()
             
-            self.status_var.set("Connected to PhotoPrism successfully!")
-            messagebox.showinfo("Success", "Connected to PhotoPrism!")
+            connected = len(self.photoprism_client.clients) - len(failed)
+            self.status_var.set(f"Connected to {connected} PhotoPrism source(s) successfully!")
+            if failed:
+                messagebox.showwarning("Partially Connected", "Connected to PhotoPrism, but some additional sources failed:\n"
+                                       + "\n".join(failed))
+            else:
+                messagebox.showinfo("Success", "Connected to PhotoPrism!")
+            
+            self.sync_index_async()
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
+    def sync_index_async(self):
+        if not self.photo_index:
+            return
+        
+        sources = self.photoprism_client
+        
+        def sync_worker():
+            try:
+                changed = self.photo_index.sync(sources, lambda message: self.root.after(0, self.status_var.set, message))
+                self.root.after(0, self.status_var.set, f"Local index up to date, {changed} photos updated")
+            except Exception as e:
+                self.root.after(0, self.status_var.set, f"Local index sync failed: {str(e)}")
+        
+        threading.Thread(target=sync_worker, daemon=True).start()
+    
+    def create_photoprism_sources(self) -> PhotoPrismSources:
+        return PhotoPrismSources.from_configs([self.config.photoprism] + self.config.photoprism_sources,
+                                              self.transfer_scheduler)
+    
     def connect_lychee(self):
         try:
             self.update_config_from_ui()
             self.config_manager.save_config(self.config, silent=True)
             
             # Update client with new config
-            self.lychee_client = LycheeClient(self.config.lychee)
+            self.lychee_client = LycheeClient(self.config.lychee, self.transfer_scheduler, self.album_cache)
             self.lychee_client.connect()
             
-            self.status_var.set("Connected to Lychee successfully!")
-            messagebox.showinfo("Success", "Connected to Lychee!")
+            # Additional targets are optional, a failing one shouldn't block the primary
+            self.extra_lychee_clients = self.create_extra_lychee_clients()
+            failed = []
+            for client in self.extra_lychee_clients:
+                try:
+                    client.connect()
+                except Exception as e:
+                    failed.append(f"{client.config.display_name}: {str(e)}")
+            
+            connected = 1 + len(self.extra_lychee_clients) - len(failed)
+            self.status_var.set(f"Connected to {connected} Lychee target(s) successfully!")
+            if failed:
+                messagebox.showwarning("Partially Connected", "Connected to Lychee, but some additional targets failed:\n"
+                                       + "\n".join(failed))
+            else:
+                messagebox.showinfo("Success", "Connected to Lychee!")
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
+    def create_extra_lychee_clients(self) -> List[LycheeClient]:
+        return [LycheeClient(target, self.transfer_scheduler, self.album_cache) for target in self.config.lychee_targets]
+    
     def search_photos(self):
-        try:
-            if not self.photoprism_client.tokens:
-                messagebox.showerror("Error", "Please connect to PhotoPrism first")
+        if not self.photoprism_client.tokens:
+            messagebox.showerror("Error", "Please connect to PhotoPrism first")
+            return
+        
+        search_date = self.date_var.get()
+        filters = self.get_search_filters()
+        self.search_generation += 1
+        generation = self.search_generation
+        self.status_var.set(f"Searching photos for {search_date}...")
+        
+        # Once synced, the local index answers without a round-trip to PhotoPrism
+        if self.photo_index and self.photo_index.is_synced(self.photoprism_client):
+            try:
+                photos = self.photo_index.search(self.photoprism_client, search_date, filters)
+                self.show_search_results(generation, search_date, photos, True, [])
                 return
-            
-            search_date = self.date_var.get()
-            photos = self.photoprism_client.search_photos(search_date)
-            
-            self.photo_grid.set_photos(photos)
-            self.photo_grid.load_thumbnails_async(self.photoprism_client.get_thumbnail)
-            
-            self.status_var.set(f"Found {len(photos)} photos for {search_date}")
-            
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            except Exception as e:
+                self.status_var.set(f"Local index unavailable, searching PhotoPrism: {str(e)}")
+        
+        # Cached results are shown at once and, unless still fresh, revalidated in the background
+        cached = self.search_cache.get(search_date, filters)
+        if cached:
+            self.show_search_results(generation, search_date, cached.photos, True, [], from_cache=True)
+            if self.search_cache.is_fresh(cached):
+                return
+            self.status_var.set(f"Found {len(cached.photos)} photos for {search_date}, refreshing...")
+        
+        # Sources answer independently, each answer refreshes the merged grid. While
+        # revalidating, only the complete result replaces what the cache showed.
+        def search_worker():
+            try:
+                result = None
+                first = not cached
+                for result in self.photoprism_client.iter_search(search_date, filters=filters):
+                    if not cached:
+                        self.root.after(0, lambda r=result, f=first: self.show_search_results(
+                            generation, search_date, r.photos, f, r.failed_sources))
+                        first = False
+                
+                if result is not None:
+                    if not result.failed_sources:
+                        self.search_cache.store(search_date, filters, result.photos)
+                    if cached:
+                        self.root.after(0, lambda: self.show_search_results(
+                            generation, search_date, result.photos, False, result.failed_sources))
+            except Exception as e:
+                if cached:
+                    # The cached photos stay on screen, a failed refresh only needs a note
+                    self.root.after(0, lambda error=str(e): self.show_refresh_error(generation, search_date, error))
+                else:
+                    self.root.after(0, lambda error=str(e): messagebox.showerror("Error", error))
+        
+        threading.Thread(target=search_worker, daemon=True).start()
+    
+    def get_search_filters(self) -> PhotoFilters:
+        try:
+            quality = int(self.quality_var.get())
+        except (tk.TclError, ValueError):
+            quality = 1
+        
+        return PhotoFilters(
+            favorite=self.favorite_var.get(),
+            label=self.label_var.get().strip(),
+            type=self.type_var.get(),
+            camera=self.camera_var.get().strip(),
+            quality=quality,
+            public=self.public_var.get()
+        )
+    
+    def show_search_results(self, generation: int, search_date: str, photos: List[Dict[str, Any]], first: bool,
+                            failed_sources: List[str], from_cache: bool = False):
+        # Drop results from a search the user already moved away from
+        if generation != self.search_generation:
+            return
+        
+        if first:
+            # A cached result was most likely shown before, its thumbnails can still be used
+            self.photo_grid.set_photos(photos, keep_thumbnails=from_cache)
+        else:
+            self.photo_grid.update_photos(photos)
+        self.photo_grid.load_thumbnails_async(self.photoprism_client.get_thumbnail)
+        
+        status = f"Found {len(photos)} photos for {search_date}"
+        if failed_sources:
+            status += f" ({len(failed_sources)} source(s) failed)"
+        self.status_var.set(status)
+    
+    def show_refresh_error(self, generation: int, search_date: str, error: str):
+        if generation == self.search_generation:
+            self.status_var.set(f"Showing cached photos for {search_date}, refresh failed: {error}")
     
     def on_photo_select(self, photo: Dict[str, Any], index: int):
         self.selected_photo = photo
@@ -209,20 +375,25 @@ class PhotoSyncApp:
             return
         
         try:
-            self.status_var.set("Downloading photo from PhotoPrism...")
-            self.root.update()
-            
-            photo_data, filename = self.photoprism_client.download_photo(self.selected_photo)
-            
-            self.status_var.set("Uploading photo to Lychee...")
-            self.root.update()
-            
             album_id = self.get_selected_album_id()
-            success = self.lychee_client.upload_photo(photo_data, filename, album_id)
+            extra_targets = [UploadTarget(client, client.config.album_id)
+                             for client in self.extra_lychee_clients if client.session]
+            if extra_targets:
+                self.fan_out_upload(album_id, extra_targets)
+                return
             
-            if success:
-                photo_title = self.selected_photo.get('Title', 'Untitled')
-                album_name = self.album_var.get()
+            result = self.create_photo_transfer().transfer(
+                self.selected_photo, album_id, on_progress=self.show_progress
+            )
+            
+            photo_title = self.selected_photo.get('Title', 'Untitled')
+            album_name = self.album_picker.get_selected_title()
+            if result.verified is False:
+                self.status_var.set(f"Uploaded '{photo_title}' but checksums differ, queued for retry")
+                messagebox.showwarning("Integrity Check Failed",
+                                       f"Lychee's checksum for '{photo_title}' doesn't match PhotoPrism's original. "
+                                       f"Use \"Retry Failed\" to upload it again.")
+            else:
                 self.status_var.set(f"Successfully uploaded '{photo_title}' to {album_name}!")
                 messagebox.showinfo("Success", f"Photo '{photo_title}' uploaded successfully to {album_name}!")
             
@@ -231,27 +402,98 @@ class PhotoSyncApp:
             self.status_var.set(f"Upload failed: {error_msg}")
             messagebox.showerror("Upload Failed", error_msg)
     
+    def fan_out_upload(self, album_id: str, extra_targets: List[UploadTarget]):
+        assert self.selected_photo is not None
+        targets = [UploadTarget(self.lychee_client, album_id)] + extra_targets
+        results = self.create_photo_transfer().fan_out(self.selected_photo, targets, on_progress=self.show_progress)
+        
+        photo_title = self.selected_photo.get('Title', 'Untitled')
+        problems = []
+        for result in results:
+            if result.error:
+                problems.append(f"{result.target}: {result.error}")
+            elif result.verified is False:
+                problems.append(f"{result.target}: checksum mismatch, queued for retry")
+        
+        uploaded = len(results) - sum(1 for result in results if result.error)
+        self.status_var.set(f"Uploaded '{photo_title}' to {uploaded} of {len(results)} Lychee targets")
+        if problems:
+            messagebox.showwarning("Upload Incomplete", f"Problems uploading '{photo_title}':\n" + "\n".join(problems))
+        else:
+            messagebox.showinfo("Success", f"Photo '{photo_title}' uploaded successfully to {len(results)} Lychee targets!")
+    
+    def upload_all_to_lychee(self):
+        photos = list(self.photo_grid.photos)
+        if not photos:
+            messagebox.showerror("Error", "Search for photos first")
+            return
+        
+        if not self.lychee_client.session or not self.photoprism_client.tokens:
+            messagebox.showerror("Error", "Please connect to PhotoPrism and Lychee first")
+            return
+        
+        try:
+            album_name = self.album_picker.get_selected_title()
+            # Like "Upload Selected", every connected Lychee target gets the photos
+            extra_targets = [UploadTarget(client, client.config.album_id)
+                             for client in self.extra_lychee_clients if client.session]
+            if extra_targets:
+                album_name = f"{len(extra_targets) + 1} Lychee targets"
+            results = self.create_photo_transfer().transfer_batch(
+                photos, self.get_selected_album_id(), on_progress=self.show_progress, extra_targets=extra_targets
+            )
+            
+            failed = [result for result in results if result.error]
+            mismatched = sum(1 for result in results if result.verified is False)
+            self.status_var.set(f"Uploaded {len(results) - len(failed)} of {len(results)} photos to {album_name}")
+            if failed or mismatched:
+                details = "\n".join(
+                    f"{result.target + ': ' if result.target else ''}{result.photo.get('Title', 'Untitled')}: "
+                    f"{result.error}" for result in failed[:10]
+                )
+                messagebox.showwarning("Upload Incomplete",
+                                       f"{len(failed)} uploads failed and {mismatched} were queued for retry.\n{details}")
+            else:
+                messagebox.showinfo("Success", f"Uploaded {len(photos)} photos to {album_name}!")
+            
+        except Exception as e:
+            error_msg = str(e)
+            self.status_var.set(f"Upload failed: {error_msg}")
+            messagebox.showerror("Upload Failed", error_msg)
+    
+    def retry_failed_uploads(self):
+        if not len(self.integrity_retry_queue):
+            messagebox.showinfo("Retry Failed", "No uploads are waiting for a retry")
+            return
+        
+        if not self.lychee_client.session or not self.photoprism_client.tokens:
+            messagebox.showerror("Error", "Please connect to PhotoPrism and Lychee first")
+            return
+        
+        self.status_var.set("Retrying uploads that failed verification...")
+        self.root.update()
+        
+        results = self.create_photo_transfer().retry_failed()
+        verified = sum(1 for result in results if result.verified is True and not result.error)
+        self.status_var.set(f"Retried {len(results)} uploads, {verified} succeeded, "
+                            f"{len(self.integrity_retry_queue)} still queued")
+    
+    def create_photo_transfer(self) -> PhotoTransfer:
+        return PhotoTransfer(self.photoprism_client, self.lychee_client, self.integrity_retry_queue,
+                             server_side=self.config.transfer.server_side_import)
+    
+    def show_progress(self, message: str):
+        self.status_var.set(message)
+        self.root.update()
+    
     def load_lychee_albums(self):
         try:
             if not self.lychee_client.session:
                 messagebox.showerror("Error", "Please connect to Lychee first")
                 return
             
-            self.albums = self.lychee_client.get_albums()
-            
-            # Update dropdown
-            album_options = ["Root Album (No specific album)"]
-            for album in self.albums:
-                indent_str = "  " * album.indent
-                option_text = f"{indent_str}{album.title} (ID: {album.id})"
-                album_options.append(option_text)
-            
-            self.album_dropdown['values'] = album_options
-            
-            # Keep current selection if it still exists
-            current_selection = self.album_var.get()
-            if current_selection not in album_options:
-                self.album_dropdown.set("Root Album (No specific album)")
+            # An explicit click asks Lychee again instead of serving the cached list
+            self.update_album_picker(self.lychee_client.get_albums(force_refresh=True))
             
             self.status_var.set(f"Loaded {len(self.albums)} albums from Lychee")
             messagebox.showinfo("Success", f"Loaded {len(self.albums)} albums from Lychee")
@@ -259,17 +501,48 @@ class PhotoSyncApp:
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
+    def load_cached_albums_async(self):
+        def load_worker():
+            albums = self.lychee_client.get_cached_albums()
+            if len(albums):
+                self.root.after(0, lambda: self.update_album_picker(albums))
+        
+        threading.Thread(target=load_worker, daemon=True).start()
+    
+    def update_album_picker(self, albums: AlbumIndex):
+        self.albums = albums
+        self.album_picker.set_index(albums)
+    
+    def load_album_children(self, album: LycheeAlbum) -> List[LycheeAlbum]:
+        return self.lychee_client.get_album_children(album)
+    
     def get_selected_album_id(self) -> str:
-        selected_album = self.album_var.get()
-        if selected_album == "Root Album (No specific album)" or not selected_album:
-            return ""
+        return self.album_picker.get_selected_album_id()
+    
+    def show_calendar(self):
+        if not self.photoprism_client.tokens:
+            messagebox.showerror("Error", "Please connect to PhotoPrism first")
+            return
         
-        # Extract album ID from the selected option
-        for album in self.albums:
-            if selected_album == f"{'  ' * album.indent}{album.title} (ID: {album.id})":
-                return album.id
+        try:
+            year = datetime.strptime(self.date_var.get(), "%Y-%m-%d").year
+        except ValueError:
+            year = datetime.now().year
+        
+        # Counts follow the filters in effect when the calendar was opened
+        filters = self.get_search_filters()
+        sources = self.photoprism_client
+        
+        def load_counts(start: str, end: str) -> Dict[str, int]:
+            if self.photo_index and self.photo_index.is_synced(sources):
+                return self.photo_index.count_by_day(sources, start, end, filters)
+            return sources.count_by_day(start, end, filters)
         
-        return ""
+        self.calendar_view.show(year, load_counts)
+    
+    def select_date(self, date: str):
+        self.date_var.set(date)
+        self.search_photos()
     
     def previous_day(self):
         current_date = datetime.strptime(self.date_var.get(), "%Y-%m-%d")
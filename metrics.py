@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+    
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        
+        # Upper bound of the bucket holding the q-th observation
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts))
+        }
+
+
+class OperationStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+        self.bytes = 0
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.to_dict(),
+            "ttfb": self.ttfb.to_dict(),
+            "bytes": self.bytes,
+            "throughput_bps": self.bytes / self.latency.sum if self.latency.sum else 0.0,
+            "errors": self.errors,
+            "status_codes": dict(self.status_codes)
+        }
+
+
+class Measurement:
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.start = time.perf_counter()
+        self.status: Optional[int] = None
+        self.ttfb: Optional[float] = None
+        self.bytes = 0
+        self.failed = False
+    
+    def record_response(self, response: requests.Response, count_body: bool = True):
+        self.status = response.status_code
+        self.ttfb = response.elapsed.total_seconds()
+        if count_body:
+            self.bytes += len(response.content)
+    
+    def add_bytes(self, amount: int):
+        self.bytes += amount
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._operations: Dict[str, OperationStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def track(self, operation: str) -> Iterator[Measurement]:
+        measurement = Measurement(operation)
+        try:
+            yield measurement
+        except Exception:
+            measurement.failed = True
+            raise
+        finally:
+            self.observe(measurement, time.perf_counter() - measurement.start)
+    
+    def observe(self, measurement: Measurement, elapsed: float):
+        with self._lock:
+            stats = self._operations.setdefault(measurement.operation, OperationStats())
+            stats.latency.observe(elapsed)
+            if measurement.ttfb is not None:
+                stats.ttfb.observe(measurement.ttfb)
+            stats.bytes += measurement.bytes
+            if measurement.failed or (measurement.status is not None and measurement.status >= 400):
+                stats.errors += 1
+            if measurement.status is not None:
+                status = str(measurement.status)
+                stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+    
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+    
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self._counters.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "operations": {name: stats.to_dict() for name, stats in sorted(self._operations.items())},
+                "counters": dict(sorted(self._counters.items()))
+            }
+    
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+    
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        
+        for metric, key in (("photosync_request_duration_seconds", "latency"),
+                            ("photosync_request_ttfb_seconds", "ttfb")):
+            lines.append(f"# TYPE {metric} histogram")
+            for operation, stats in snapshot["operations"].items():
+                histogram = stats[key]
+                cumulative = 0
+                for bound, bucket_count in histogram["buckets"].items():
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{operation="{operation}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{operation="{operation}"}} {histogram["sum"]}')
+                lines.append(f'{metric}_count{{operation="{operation}"}} {histogram["count"]}')
+        
+        lines.append("# TYPE photosync_request_bytes_total counter")
+        for operation, stats in snapshot["operations"].items():
+            lines.append(f'photosync_request_bytes_total{{operation="{operation}"}} {stats["bytes"]}')
+        
+        lines.append("# TYPE photosync_request_errors_total counter")
+        for operation, stats in snapshot["operations"].items():
+            lines.append(f'photosync_request_errors_total{{operation="{operation}"}} {stats["errors"]}')
+        
+        lines.append("# TYPE photosync_responses_total counter")
+        for operation, stats in snapshot["operations"].items():
+            for status, status_count in stats["status_codes"].items():
+                lines.append(f'photosync_responses_total{{operation="{operation}",status="{status}"}} {status_count}')
+        
+        lines.append("# TYPE photosync_events_total counter")
+        for counter, value in snapshot["counters"].items():
+            lines.append(f'photosync_events_total{{event="{counter}"}} {value}')
+        
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,83 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from typing import Optional
+
+from metrics import MetricsRegistry
+
+
+class MetricsPanel:
+    def __init__(self, parent: tk.Misc, registry: MetricsRegistry, refresh_ms: int = 1000):
+        self.parent = parent
+        self.registry = registry
+        self.refresh_ms = refresh_ms
+        self.window: Optional[tk.Toplevel] = None
+    
+    def show(self):
+        if self.window and self.window.winfo_exists():
+            self.window.lift()
+            return
+        
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Metrics")
+        self.window.geometry("900x500")
+        
+        self.text = tk.Text(self.window, font=("Courier", 9), wrap="none")
+        scrollbar = ttk.Scrollbar(self.window, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        
+        button_frame = ttk.Frame(self.window, padding="5")
+        button_frame.grid(row=1, column=0, columnspan=2, sticky="we")
+        ttk.Button(button_frame, text="Export JSON", command=self.export_json).grid(row=0, column=0, padx=(0, 5))
+        ttk.Button(button_frame, text="Export Prometheus", command=self.export_prometheus).grid(row=0, column=1, padx=(0, 5))
+        ttk.Button(button_frame, text="Reset", command=self.registry.reset).grid(row=0, column=2)
+        
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        self.refresh()
+    
+    def refresh(self):
+        if not self.window or not self.window.winfo_exists():
+            return
+        
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, self.format_snapshot())
+        self.window.after(self.refresh_ms, self.refresh)
+    
+    def format_snapshot(self) -> str:
+        snapshot = self.registry.snapshot()
+        lines = [f"{'Operation':<28}{'Count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'TTFB p50':>10}{'KiB/s':>10}{'Errors':>8}  Status"]
+        
+        for operation, stats in snapshot["operations"].items():
+            latency = stats["latency"]
+            statuses = ", ".join(f"{code}x{count}" for code, count in sorted(stats["status_codes"].items()))
+            lines.append(
+                f"{operation:<28}{latency['count']:>7}{latency['p50']:>9.3f}{latency['p95']:>9.3f}"
+                f"{latency['p99']:>9.3f}{stats['ttfb']['p50']:>10.3f}{stats['throughput_bps'] / 1024:>10.1f}"
+                f"{stats['errors']:>8}  {statuses}"
+            )
+        
+        if snapshot["counters"]:
+            lines.append("")
+            for counter, value in snapshot["counters"].items():
+                lines.append(f"{counter:<28}{value:>7}")
+        
+        return "\n".join(lines)
+    
+    def export_json(self):
+        self.export(self.registry.to_json(), ".json")
+    
+    def export_prometheus(self):
+        self.export(self.registry.to_prometheus(), ".prom")
+    
+    def export(self, content: str, extension: str):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=extension)
+        if not path:
+            return
+        
+        try:
+            with open(path, "w") as f:
+                f.write(content)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export metrics: {str(e)}", parent=self.window)
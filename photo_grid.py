@@ -2,10 +2,43 @@ import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import io
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future
 from typing import List, Dict, Any, Optional, Callable
 
+from fetch_pool import AdaptiveFetchPool
+from metrics import metrics
+from photoprism_client import primary_file_hash
+
+
+# PhotoPrism's indexed color palette, see the "Colors" file field
+PHOTOPRISM_PALETTE = [
+    "#212121", "#9E9E9E", "#795548", "#FFC107",
+    "#FFFFFF", "#9C27B0", "#2196F3", "#00BCD4",
+    "#009688", "#4CAF50", "#CDDC39", "#FFEB3B",
+    "#E91E63", "#FF9800", "#F44336", "#F06292",
+]
+
+THUMBNAIL_SIZE = 500
+# Thumbnails of earlier lists kept by set_photos(keep_thumbnails=True) before old ones are dropped
+MAX_KEPT_THUMBNAILS = 300
+
+
+def _hex_to_rgb(color: str) -> tuple:
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def _get_preview_colors(photo: Dict[str, Any]) -> Optional[str]:
+    files = photo.get("Files") or []
+    colors = files[0].get("Colors", "") if files else ""
+    if len(colors) == 9 and all(c in "0123456789abcdefABCDEF" for c in colors):
+        return colors.upper()
+    
+    color_index = photo.get("Color")
+    if isinstance(color_index, int) and 0 <= color_index < len(PHOTOPRISM_PALETTE):
+        return format(color_index, "X") * 9
+    
+    return None
+
 
 class PhotoGrid:
     def __init__(self, parent: tk.Widget, on_photo_select: Callable[[Dict[str, Any], int], None]):
@@ -13,9 +46,15 @@ class PhotoGrid:
         self.on_photo_select = on_photo_select
         self.photos: List[Dict[str, Any]] = []
         self.thumbnail_cache: Dict[str, ImageTk.PhotoImage] = {}
+        self.preview_cache: Dict[str, ImageTk.PhotoImage] = {}
         self.current_columns = 1
         self.selected_index: Optional[int] = None
         self.photo_frames: List[ttk.Frame] = []
+        self.fetch_pool = AdaptiveFetchPool()
+        self.pending_thumbnails: Dict[str, Future] = {}
+        # Bumped whenever pending thumbnails are cancelled, fetches started for
+        # an older generation neither touch the tiles nor fill the cache
+        self.thumbnail_generation = 0
         
         self.setup_ui()
     
@@ -44,13 +83,80 @@ class PhotoGrid:
         self.parent.columnconfigure(0, weight=1)
         self.parent.rowconfigure(0, weight=1)
     
-    def set_photos(self, photos: List[Dict[str, Any]]):
+    def set_photos(self, photos: List[Dict[str, Any]], keep_thumbnails: bool = False):
+        self.cancel_pending_thumbnails()
         self.photos = photos
-        self.thumbnail_cache.clear()
+        # Keeping the caches lets a list that grew (e.g. another source answered) reuse loaded tiles
+        if not keep_thumbnails:
+            self.thumbnail_cache.clear()
+            self.preview_cache.clear()
+        elif len(self.thumbnail_cache) > MAX_KEPT_THUMBNAILS:
+            uids = {photo.get("UID", "") for photo in photos}
+            for photo_uid in [photo_uid for photo_uid in self.thumbnail_cache if photo_uid not in uids]:
+                del self.thumbnail_cache[photo_uid]
         self.selected_index = None
         self.photo_frames.clear()
         self.display_photos()
     
+    def update_photos(self, photos: List[Dict[str, Any]]):
+        # Diffs by UID: unchanged tiles are only moved, changed ones get new info
+        # text, and only added photos get new widgets and thumbnail requests
+        if not self.photo_frames:
+            self.set_photos(photos, keep_thumbnails=True)
+            return
+        
+        selected_photo = self.get_selected_photo()
+        selected_uid = selected_photo.get("UID", "") if selected_photo else ""
+        frames_by_uid = {getattr(frame, "photo_uid", ""): frame for frame in self.photo_frames}
+        
+        self.photos = photos
+        self.photo_frames = []
+        self.selected_index = None
+        row, col = 0, 0
+        
+        for index, photo in enumerate(photos):
+            photo_uid = photo.get("UID", "")
+            photo_frame = frames_by_uid.pop(photo_uid, None) if photo_uid else None
+            if photo_frame is None:
+                photo_frame = self.create_photo_thumbnail(photo, row, col, index)
+            else:
+                self.reuse_photo_thumbnail(photo_frame, photo, row, col, index)
+            self.photo_frames.append(photo_frame)
+            
+            if photo_uid and photo_uid == selected_uid:
+                self.selected_index = index
+            
+            col += 1
+            if col >= self.current_columns:
+                col = 0
+                row += 1
+        
+        for photo_uid, photo_frame in frames_by_uid.items():
+            future = self.pending_thumbnails.pop(photo_uid, None)
+            if future:
+                future.cancel()
+            photo_frame.destroy()
+        
+        if not photos:
+            ttk.Label(self.scrollable_frame, text="No photos found for this date").pack(pady=20)
+    
+    def reuse_photo_thumbnail(self, photo_frame: ttk.Frame, photo: Dict[str, Any], row: int, col: int, index: int):
+        old_photo = photo_frame.photo # type: ignore
+        photo_frame.photo = photo # type: ignore
+        photo_frame.photo_index = index # type: ignore
+        photo_frame.grid(row=row, column=col, padx=5, pady=5)
+        
+        info_text = self.format_photo_info(photo)
+        if photo_frame.info_label.cget("text") != info_text: # type: ignore
+            photo_frame.info_label.configure(text=info_text) # type: ignore
+        
+        placeholder = photo_frame.placeholder # type: ignore
+        placeholder.photo_data = photo
+        placeholder.photo_uid = photo.get("UID", "")
+        if primary_file_hash(old_photo) != primary_file_hash(photo):
+            # The file behind the tile changed, fetch its thumbnail again
+            self.thumbnail_cache.pop(photo.get("UID", ""), None)
+    
     def display_photos(self):
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
@@ -94,8 +200,9 @@ class PhotoGrid:
                              bg="white", cursor="hand2", font=("Arial", 8))
         info_label.pack(pady=(5, 5), padx=2)
         
+        # Handlers read the photo and position from the frame, which a reused tile updates
         def on_click(event=None):
-            self.select_photo(photo, index)
+            self.select_photo(photo_frame.photo, photo_frame.photo_index) # type: ignore
         
         clickable_frame.bind("<Button-1>", on_click)
         placeholder.bind("<Button-1>", on_click)
@@ -114,12 +221,12 @@ class PhotoGrid:
         
         # Add hover effects
         def on_enter(event=None):
-            if self.selected_index != index:
+            if self.selected_index != photo_frame.photo_index: # type: ignore
                 clickable_frame.configure(bg="#f0f0f0")
                 info_label.configure(bg="#f0f0f0")
         
         def on_leave(event=None):
-            if self.selected_index != index:
+            if self.selected_index != photo_frame.photo_index: # type: ignore
                 clickable_frame.configure(bg="white")
                 info_label.configure(bg="white")
         
@@ -135,14 +242,22 @@ class PhotoGrid:
         photo_frame.info_label = info_label # type: ignore
         photo_frame.placeholder = placeholder # type: ignore
         photo_frame.photo_index = index # type: ignore
+        photo_frame.photo = photo # type: ignore
         
         # Load thumbnail asynchronously
         photo_uid = photo.get('UID', '')
+        photo_frame.photo_uid = photo_uid # type: ignore
         if photo_uid in self.thumbnail_cache:
             cached_image = self.thumbnail_cache[photo_uid]
             placeholder.configure(image=cached_image, text="")
             setattr(placeholder, 'image', cached_image)
         else:
+            # Paint the low-res color preview until the real tile arrives
+            preview_image = self.get_color_preview(photo)
+            if preview_image:
+                placeholder.configure(image=preview_image, text="")
+                setattr(placeholder, 'image', preview_image)
+            
             # Store placeholder reference for async loading
             placeholder.photo_data = photo # type: ignore
             placeholder.photo_uid = photo_uid # type: ignore
@@ -172,16 +287,37 @@ class PhotoGrid:
         if self.selected_index is not None and self.selected_index < len(self.photos):
             return self.photos[self.selected_index]
         return None
-    def load_thumbnail(self, photo: Dict[str, Any], thumbnail_data: Optional[bytes], placeholder_widget: tk.Label):
+    
+    def get_color_preview(self, photo: Dict[str, Any]) -> Optional[ImageTk.PhotoImage]:
+        colors = _get_preview_colors(photo)
+        if not colors:
+            return None
+        
+        if colors not in self.preview_cache:
+            # Upscale the 3x3 color grid PhotoPrism computes at indexing time
+            image = Image.new("RGB", (3, 3))
+            image.putdata([_hex_to_rgb(PHOTOPRISM_PALETTE[int(c, 16)]) for c in colors])
+            image = image.resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.BILINEAR)
+            self.preview_cache[colors] = ImageTk.PhotoImage(image)
+        
+        return self.preview_cache[colors]
+    
+    def load_thumbnail(self, photo: Dict[str, Any], thumbnail_data: Optional[bytes], placeholder_widget: tk.Label,
+                       generation: Optional[int] = None):
+        if generation is not None and not self.is_current_thumbnail(generation, placeholder_widget):
+            return
+        
         try:
             if not thumbnail_data:
-                placeholder_widget.configure(text="No Preview", bg="lightgray")
+                placeholder_widget.configure(image="", text="No Preview", bg="lightgray")
                 return
             
             # Create image from thumbnail data
-            image = Image.open(io.BytesIO(thumbnail_data))
-            image.thumbnail((500, 500), Image.Resampling.LANCZOS)
-            photo_image = ImageTk.PhotoImage(image)
+            with metrics.track("grid.decode") as measurement:
+                image = Image.open(io.BytesIO(thumbnail_data))
+                image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+                photo_image = ImageTk.PhotoImage(image)
+                measurement.add_bytes(len(thumbnail_data))
             
             # Cache the image
             photo_uid = photo.get('UID', '')
@@ -193,49 +329,63 @@ class PhotoGrid:
             setattr(placeholder_widget, 'image', photo_image)
             
         except Exception:
-            placeholder_widget.configure(text="Error", bg="lightcoral")
+            placeholder_widget.configure(image="", text="Error", bg="lightcoral")
     
     def load_thumbnails_async(self, thumbnail_loader: Callable[[Dict[str, Any]], Optional[bytes]]):
-        def load_worker():
-            # Create a list of photos that need thumbnails
-            photos_to_load = []
-            for photo_frame in self.photo_frames:
-                if hasattr(photo_frame, 'placeholder'):
-                    placeholder = photo_frame.placeholder # type: ignore
-                    if hasattr(placeholder, 'photo_data'):
-                        photo = placeholder.photo_data
-                        photo_uid = placeholder.photo_uid
-                        
-                        if photo_uid not in self.thumbnail_cache:
-                            photos_to_load.append((photo, photo_uid, placeholder))
+        # Tiles already loaded or still being fetched are left alone, so calling
+        # this again after update_photos only requests the new tiles
+        generation = self.thumbnail_generation
+        for photo_frame in self.photo_frames:
+            if not hasattr(photo_frame, 'placeholder'):
+                continue
             
-            if not photos_to_load:
-                return
-            
-            # Load thumbnails in parallel using ThreadPoolExecutor
-            max_workers = min(8, len(photos_to_load))  # Limit to 8 concurrent downloads
-            
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all thumbnail loading tasks
-                future_to_photo = {
-                    executor.submit(thumbnail_loader, photo): (photo, photo_uid, placeholder)
-                    for photo, photo_uid, placeholder in photos_to_load
-                }
-                
-                # Process completed downloads as they finish
-                for future in as_completed(future_to_photo):
-                    photo, photo_uid, placeholder = future_to_photo[future]
-                    try:
-                        thumbnail_data = future.result()
-                        # Schedule UI update on main thread
-                        self.parent.after(0, lambda p=photo, td=thumbnail_data, ph=placeholder: 
-                                        self.load_thumbnail(p, td, ph))
-                    except Exception as e:
-                        # Handle individual thumbnail loading errors
-                        self.parent.after(0, lambda ph=placeholder: 
-                                        ph.configure(text="Error", bg="lightcoral"))
-        
-        threading.Thread(target=load_worker, daemon=True).start()
+            placeholder = photo_frame.placeholder # type: ignore
+            if (hasattr(placeholder, 'photo_data') and placeholder.photo_uid not in self.thumbnail_cache
+                    and placeholder.photo_uid not in self.pending_thumbnails):
+                future = self.fetch_pool.submit(self.fetch_thumbnail, thumbnail_loader, placeholder.photo_data,
+                                                generation)
+                self.pending_thumbnails[placeholder.photo_uid] = future
+                future.add_done_callback(
+                    lambda f, p=placeholder.photo_data, ph=placeholder: self.on_thumbnail_fetched(f, p, ph, generation)
+                )
+    
+    def fetch_thumbnail(self, thumbnail_loader: Callable[[Dict[str, Any]], Optional[bytes]], photo: Dict[str, Any],
+                        generation: int) -> Optional[bytes]:
+        # Runs on a pool thread. A fetch that only started after its grid was cleared is skipped.
+        if generation != self.thumbnail_generation:
+            return None
+        return thumbnail_loader(photo)
+    
+    def on_thumbnail_fetched(self, future: Future, photo: Dict[str, Any], placeholder: tk.Label, generation: int):
+        if future.cancelled() or generation != self.thumbnail_generation:
+            return
+        
+        self.parent.after(0, lambda: self.forget_pending_thumbnail(photo.get('UID', ''), future))
+        
+        # Runs on a pool thread, so schedule UI updates on the main thread
+        try:
+            thumbnail_data = future.result()
+            self.parent.after(0, lambda: self.load_thumbnail(photo, thumbnail_data, placeholder, generation))
+        except Exception:
+            self.parent.after(0, lambda: self.show_thumbnail_error(placeholder, generation))
+    
+    def show_thumbnail_error(self, placeholder: tk.Label, generation: int):
+        if self.is_current_thumbnail(generation, placeholder):
+            placeholder.configure(image="", text="Error", bg="lightcoral")
+    
+    def is_current_thumbnail(self, generation: int, placeholder: tk.Label) -> bool:
+        # The grid may have been cleared, or the tile removed, while the fetch ran
+        return generation == self.thumbnail_generation and bool(placeholder.winfo_exists())
+    
+    def forget_pending_thumbnail(self, photo_uid: str, future: Future):
+        if self.pending_thumbnails.get(photo_uid) is future:
+            del self.pending_thumbnails[photo_uid]
+    
+    def cancel_pending_thumbnails(self):
+        self.thumbnail_generation += 1
+        for future in self.pending_thumbnails.values():
+            future.cancel()
+        self.pending_thumbnails.clear()
     
     def calculate_grid_columns(self, canvas_width: int) -> int:
         thumbnail_width = 520  # 500px image + 20px padding
@@ -256,12 +406,9 @@ class PhotoGrid:
         
         if self.current_columns != new_columns:
             self.current_columns = new_columns
-            # Store currently selected photo before redisplaying
-            selected_photo = self.get_selected_photo()
-            self.display_photos()
-            # Re-select the photo if it was selected before
-            if selected_photo and self.selected_index is not None:
-                self.select_photo(selected_photo, self.selected_index)
+            # Existing tiles only move, so thumbnails and the selection stay as they are
+            for index, photo_frame in enumerate(self.photo_frames):
+                photo_frame.grid(row=index // new_columns, column=index % new_columns, padx=5, pady=5)
     
     def on_mouse_wheel(self, event):
         if event.num == 4 or event.delta > 0:
@@ -0,0 +1,308 @@
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import ConfigManager
+from photo_record import PhotoRecord, parse_photo_record
+from photoprism_client import PhotoFilters, PhotoPrismClient, primary_file_hash
+from photoprism_sources import PhotoPrismSources
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    source TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    taken_date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    favorite INTEGER NOT NULL,
+    private INTEGER NOT NULL,
+    quality INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, uid)
+);
+CREATE INDEX IF NOT EXISTS photos_taken ON photos (taken_date, taken_at);
+CREATE INDEX IF NOT EXISTS photos_type ON photos (type, taken_date);
+CREATE INDEX IF NOT EXISTS photos_hash ON photos (hash);
+CREATE TABLE IF NOT EXISTS photo_labels (
+    source TEXT NOT NULL,
+    label TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    PRIMARY KEY (source, label, uid)
+);
+CREATE INDEX IF NOT EXISTS photo_labels_uid ON photo_labels (source, uid);
+CREATE TABLE IF NOT EXISTS labels (
+    source TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    photo_count INTEGER NOT NULL,
+    PRIMARY KEY (source, slug)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT PRIMARY KEY,
+    updated_since TEXT NOT NULL
+);
+"""
+
+# Start of time for the first sync of a source
+EPOCH = "1970-01-01T00:00:00Z"
+
+
+def label_slugs(label: str) -> List[str]:
+    # PhotoPrism turns the label filter into slugs before matching, "|" separates alternatives
+    slugs = []
+    for name in label.split("|"):
+        ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+        slug = re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+        if slug:
+            slugs.append(slug)
+    return slugs
+
+
+def _photo_row(source: str, photo: Dict[str, Any]) -> Tuple:
+    taken_at = photo.get("TakenAtLocal", "")
+    camera = f"{photo.get('CameraMake', '')} {photo.get('CameraModel', '')}".strip()
+    return (
+        source,
+        photo.get("UID", ""),
+        taken_at,
+        taken_at[:10],
+        photo.get("Type", ""),
+        int(bool(photo.get("Favorite", False))),
+        int(bool(photo.get("Private", False))),
+        int(photo.get("Quality", 0) or 0),
+        camera,
+        primary_file_hash(photo),
+        json.dumps(photo, separators=(",", ":"))
+    )
+
+
+class PhotoIndex:
+    def __init__(self, path: str = "photo_index.sqlite3", page_size: int = 500):
+        self.path = path
+        self.page_size = page_size
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        # Searches from the UI thread and a background sync share the connection
+        self._lock = threading.Lock()
+    
+    def close(self):
+        with self._lock:
+            self._connection.close()
+    
+    def is_synced(self, sources: PhotoPrismSources) -> bool:
+        urls = [client.config.url for client in sources.clients if client.tokens]
+        if not urls:
+            return False
+        with self._lock:
+            synced = {row[0] for row in self._connection.execute("SELECT source FROM sync_state")}
+        return all(url in synced for url in urls)
+    
+    def sync(self, sources: PhotoPrismSources, on_progress: Optional[Callable[[str], None]] = None) -> int:
+        changed = 0
+        for client in sources.clients:
+            if client.tokens:
+                changed += self.sync_source(client, on_progress)
+        return changed
+    
+    def sync_source(self, client: PhotoPrismClient, on_progress: Optional[Callable[[str], None]] = None) -> int:
+        source = client.config.url
+        sync_started = datetime.now(timezone.utc)
+        
+        with self._lock:
+            row = self._connection.execute("SELECT updated_since FROM sync_state WHERE source = ?", (source,)).fetchone()
+        if row:
+            # Overlap the previous sync a little so edits made while it ran aren't missed
+            since = datetime.strptime(row[0], "%Y-%m-%dT%H:%M:%SZ") - timedelta(minutes=1)
+            since_value = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+        else:
+            since_value = EPOCH
+        
+        changed = 0
+        updated_uids: Dict[str, None] = {}
+        for photos in client.iter_updated_since(since_value, self.page_size):
+            self._store_photos(source, photos)
+            changed += len(photos)
+            updated_uids.update((photo.get("UID", ""), None) for photo in photos)
+            if on_progress:
+                on_progress(f"Indexed {changed} photos from {client.config.display_name}")
+        updated_uids.pop("", None)
+        
+        # The first sync and large changes list every label, smaller ones refresh the changed photos
+        self._sync_labels(client, list(updated_uids), relist_all=not row or len(updated_uids) > self.page_size)
+        
+        # Only a pass that reached the last page marks the source as synced
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sync_state (source, updated_since) VALUES (?, ?)",
+                (source, sync_started.strftime("%Y-%m-%dT%H:%M:%SZ"))
+            )
+        return changed
+    
+    def rebuild(self, sources: PhotoPrismSources, on_progress: Optional[Callable[[str], None]] = None) -> int:
+        # Incremental syncs never see deleted or archived photos, a rebuild drops them
+        with self._lock, self._connection:
+            for table in ("photos", "photo_labels", "labels", "sync_state"):
+                self._connection.execute(f"DELETE FROM {table}")
+        return self.sync(sources, on_progress)
+    
+    def _store_photos(self, source: str, photos: List[Dict[str, Any]]):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [_photo_row(source, photo) for photo in photos if photo.get("UID")]
+            )
+    
+    def _sync_labels(self, client: PhotoPrismClient, updated_uids: List[str], relist_all: bool):
+        # Search results don't carry labels, so photos are listed per label. Labels whose
+        # photo count changed are listed again, and as an equal number of additions and
+        # removals keeps the count, updated photos also get their labels from the details.
+        source = client.config.url
+        labels: Dict[str, int] = {}
+        while True:
+            page = client.list_labels(offset=len(labels))
+            for label in page:
+                labels[label.get("Slug", "")] = int(label.get("PhotoCount", 0) or 0)
+            if len(page) < 1000:
+                break
+        labels.pop("", None)
+        
+        with self._lock:
+            known = dict(self._connection.execute("SELECT slug, photo_count FROM labels WHERE source = ?", (source,)))
+        
+        removed = [slug for slug in known if slug not in labels]
+        with self._lock, self._connection:
+            for slug in removed:
+                self._connection.execute("DELETE FROM photo_labels WHERE source = ? AND label = ?", (source, slug))
+                self._connection.execute("DELETE FROM labels WHERE source = ? AND slug = ?", (source, slug))
+        
+        if not relist_all:
+            for uid in updated_uids:
+                self._sync_photo_labels(client, uid)
+        
+        for slug, photo_count in labels.items():
+            if not relist_all and known.get(slug) == photo_count:
+                continue
+            uids = [photo.get("UID", "") for photo in client.iter_label_photos(slug, self.page_size)]
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM photo_labels WHERE source = ? AND label = ?", (source, slug))
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO photo_labels (source, label, uid) VALUES (?, ?, ?)",
+                    [(source, slug, uid) for uid in uids if uid]
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO labels (source, slug, photo_count) VALUES (?, ?, ?)",
+                    (source, slug, photo_count)
+                )
+    
+    def _sync_photo_labels(self, client: PhotoPrismClient, uid: str):
+        # Label searches leave out labels PhotoPrism is unsure about, so do these rows
+        source = client.config.url
+        photo_labels = client.get_photo(uid).get("Labels") or []
+        slugs = {
+            (label.get("Label") or {}).get("Slug", "")
+            for label in photo_labels if int(label.get("Uncertainty", 0) or 0) < 100
+        }
+        slugs.discard("")
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM photo_labels WHERE source = ? AND uid = ?", (source, uid))
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO photo_labels (source, label, uid) VALUES (?, ?, ?)",
+                [(source, slug, uid) for slug in slugs]
+            )
+    
+    def search(self, sources: PhotoPrismSources, date: str,
+               filters: Optional[PhotoFilters] = None) -> List[PhotoRecord]:
+        source_indexes = {client.config.url: index for index, client in enumerate(sources.clients)}
+        where, params = self._where(source_indexes, filters or PhotoFilters(), "p.taken_date = ?", [date])
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT p.source, p.hash, p.data FROM photos p WHERE {where} ORDER BY p.taken_at", params
+            ).fetchall()
+        
+        # Same rule as a live search: photos sharing a file hash are shown once, earlier sources win
+        photos = []
+        seen = set()
+        for source, file_hash, data in sorted(rows, key=lambda row: source_indexes[row[0]]):
+            if file_hash:
+                if file_hash in seen:
+                    continue
+                seen.add(file_hash)
+            photo = parse_photo_record(data)
+            photo.source = source_indexes[source]
+            photos.append(photo)
+        return sorted(photos, key=lambda photo: photo.taken_at_local)
+    
+    def count_by_day(self, sources: PhotoPrismSources, start: str, end: str,
+                     filters: Optional[PhotoFilters] = None) -> Dict[str, int]:
+        source_indexes = {client.config.url: index for index, client in enumerate(sources.clients)}
+        where, params = self._where(source_indexes, filters or PhotoFilters(),
+                                    "p.taken_date BETWEEN ? AND ?", [start, end])
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT p.taken_date, COUNT(DISTINCT CASE WHEN p.hash = '' THEN p.source || p.uid ELSE p.hash END) "
+                f"FROM photos p WHERE {where} GROUP BY p.taken_date",
+                params
+            ).fetchall()
+        return dict(rows)
+    
+    def _where(self, source_indexes: Dict[str, int], filters: PhotoFilters, date_clause: str,
+               date_params: List[Any]) -> Tuple[str, List[Any]]:
+        clauses = [date_clause, f"p.source IN ({', '.join('?' * len(source_indexes))})"]
+        params: List[Any] = list(date_params) + list(source_indexes)
+        
+        # Mirrors the server side meaning of each filter in PhotoFilters.to_params
+        clauses.append("p.quality >= ?")
+        params.append(filters.quality)
+        if filters.favorite:
+            clauses.append("p.favorite = 1")
+        if filters.public:
+            clauses.append("p.private = 0")
+        if filters.type:
+            clauses.append("p.type = ?")
+            params.append(filters.type)
+        if filters.camera:
+            clauses.append("p.camera LIKE ?")
+            params.append(f"%{filters.camera}%")
+        if filters.label:
+            slugs = label_slugs(filters.label) or [filters.label]
+            clauses.append(
+                "EXISTS (SELECT 1 FROM photo_labels l WHERE l.source = p.source "
+                f"AND l.label IN ({', '.join('?' * len(slugs))}) AND l.uid = p.uid)"
+            )
+            params.extend(slugs)
+        return " AND ".join(clauses), params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local index of PhotoPrism metadata")
+    parser.add_argument("--config", default="photo_sync_config.json", help="Configuration file")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Index everything again, dropping deleted and archived photos")
+    args = parser.parse_args()
+    
+    config = ConfigManager(args.config).load_config()
+    sources = PhotoPrismSources.from_configs([config.photoprism] + config.photoprism_sources)
+    for failure in sources.connect():
+        print(f"Skipping source {failure}")
+    
+    photo_index = PhotoIndex(config.local_index_path)
+    try:
+        if args.rebuild:
+            changed = photo_index.rebuild(sources, on_progress=print)
+        else:
+            changed = photo_index.sync(sources, on_progress=print)
+    finally:
+        photo_index.close()
+    print(f"Local index up to date, {changed} photos updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+# Index of the source a search result came from, used to route thumbnails and downloads
+SOURCE_KEY = "_source"
+
+
+def _primary_file(files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    for file_info in files:
+        if file_info.get("Primary", False):
+            return file_info
+    return files[0] if files else {}
+
+
+class PhotoRecord:
+    # Only the fields the app reads, a full PhotoPrism search result carries dozens more
+    __slots__ = ("uid", "title", "taken_at_local", "type", "file_hash", "file_size", "file_name", "colors", "color",
+                 "source")
+    
+    # PhotoPrism field names served by get() and [], so records can stand in for result dicts
+    FIELDS = {
+        "UID": "uid",
+        "Title": "title",
+        "TakenAtLocal": "taken_at_local",
+        "Type": "type",
+        "Color": "color",
+        SOURCE_KEY: "source"
+    }
+    
+    def __init__(self, uid: str, title: str = "", taken_at_local: str = "", type: str = "", file_hash: str = "",
+                 file_size: int = 0, file_name: str = "", colors: str = "", color: Optional[int] = None,
+                 source: Optional[int] = None):
+        self.uid = uid
+        self.title = title
+        self.taken_at_local = taken_at_local
+        self.type = type
+        self.file_hash = file_hash
+        self.file_size = file_size
+        self.file_name = file_name
+        self.colors = colors
+        # Main color index of the photo, the preview falls back to it without a file palette
+        self.color = color
+        self.source = source
+    
+    @classmethod
+    def from_json(cls, photo: Dict[str, Any]) -> 'PhotoRecord':
+        primary = _primary_file(photo.get("Files") or [])
+        # Types and palettes repeat across photos, interning stores each value once
+        return cls(
+            uid=photo.get("UID", ""),
+            title=photo.get("Title", ""),
+            taken_at_local=photo.get("TakenAtLocal", ""),
+            type=sys.intern(photo.get("Type", "")),
+            file_hash=primary.get("Hash", ""),
+            file_size=primary.get("Size", 0),
+            file_name=primary.get("Name", ""),
+            colors=sys.intern(primary.get("Colors", "")),
+            color=photo.get("Color"),
+            source=photo.get(SOURCE_KEY)
+        )
+    
+    def primary_file(self) -> Dict[str, Any]:
+        return {
+            "Hash": self.file_hash,
+            "Size": self.file_size,
+            "Name": self.file_name,
+            "Colors": self.colors,
+            "Primary": True
+        }
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "Files":
+            return [self.primary_file()] if self.file_hash else []
+        
+        attribute = self.FIELDS.get(key)
+        if attribute is None:
+            return default
+        value = getattr(self, attribute)
+        return default if value is None else value
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any):
+        attribute = self.FIELDS.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        setattr(self, attribute, value)
+    
+    def __repr__(self) -> str:
+        return f"PhotoRecord(uid={self.uid!r}, title={self.title!r}, taken_at_local={self.taken_at_local!r})"
+
+
+def parse_photo_record(content: Union[bytes, str]) -> PhotoRecord:
+    return PhotoRecord.from_json(_loads(content))
+
+
+def parse_photo_records(content: Union[bytes, str]) -> List[PhotoRecord]:
+    # Records are built straight from the decoded page, so the full dicts are
+    # dropped as soon as the list comprehension finishes
+    return [PhotoRecord.from_json(photo) for photo in _loads(content)]
@@ -1,8 +1,91 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
 import requests
-from typing import List, Dict, Any, Tuple, Optional, Mapping
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Callable, Iterator, Tuple, Optional, Mapping
 from dataclasses import dataclass
 
+from requests.adapters import HTTPAdapter
+
 from config import PhotoPrismConfig
+from metrics import metrics
+from photo_record import PhotoRecord, parse_photo_records
+from range_download import RangedDownload, RangeNotSupported
+from transfer_scheduler import DOWNLOAD, TransferPriority, TransferScheduler
+
+
+# Originals at least this large are fetched as parallel byte ranges
+RANGE_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+RANGE_DOWNLOAD_SEGMENTS = 4
+
+
+@dataclass
+class DownloadedPhoto:
+    data: bytes
+    filename: str
+    sha1: str
+    # Large originals stay in this temporary file instead of data until discard()
+    path: str = ""
+    
+    def discard(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class OriginalFile:
+    file_hash: str
+    filename: str
+    size: int
+
+
+def primary_file_hash(photo: Dict[str, Any]) -> str:
+    if isinstance(photo, PhotoRecord):
+        return photo.file_hash
+    files = photo.get("Files") or []
+    for file_info in files:
+        if file_info.get("Primary", False):
+            return file_info.get("Hash", "")
+    return files[0].get("Hash", "") if files else ""
+
+
+# Media types PhotoPrism accepts in the type filter
+PHOTO_TYPES = ("image", "video", "live", "raw", "animated", "vector")
+
+
+@dataclass(frozen=True)
+class PhotoFilters:
+    favorite: bool = False
+    label: str = ""
+    type: str = ""
+    camera: str = ""
+    quality: int = 1
+    public: bool = False  # Hide photos marked private
+    
+    def to_params(self, date: str = "") -> Dict[str, Any]:
+        # Terms that PhotoPrism only understands inside q go there, the rest
+        # are sent as their own query parameters
+        terms = [f"taken:{date}"] if date else []
+        if self.camera:
+            terms.append(f'camera:"{self.camera}"')
+        
+        params: Dict[str, Any] = {"quality": self.quality}
+        if terms:
+            params["q"] = " ".join(terms)
+        if self.favorite:
+            params["favorite"] = True
+        if self.label:
+            params["label"] = self.label
+        if self.type:
+            params["type"] = self.type
+        if self.public:
+            params["public"] = True
+        return params
 
 
 @dataclass
@@ -12,166 +95,546 @@ class PhotoPrismTokens:
     download_token: str
 
 
+class PhotoPrismTokenManager:
+    def __init__(self, login: Callable[[], Tuple[PhotoPrismTokens, Optional[float]]], refresh_margin: float = 300):
+        self.login = login
+        self.refresh_margin = refresh_margin
+        self.tokens: Optional[PhotoPrismTokens] = None
+        self.expires_at: Optional[float] = None
+        self._margin = refresh_margin
+        self._lock = threading.Lock()
+    
+    def start(self) -> PhotoPrismTokens:
+        with self._lock:
+            return self._login()
+    
+    def get_tokens(self) -> PhotoPrismTokens:
+        tokens = self.tokens
+        if tokens is None:
+            raise Exception("Not connected to PhotoPrism")
+        
+        # Renew ahead of expiry so long batches never hit a dead session
+        if self.expires_at is not None and time.time() >= self.expires_at - self._margin:
+            return self.refresh(tokens)
+        
+        return tokens
+    
+    def refresh(self, stale: PhotoPrismTokens) -> PhotoPrismTokens:
+        with self._lock:
+            # Another thread already replaced the tokens this caller saw fail
+            if self.tokens is not stale and self.tokens is not None:
+                return self.tokens
+            return self._login()
+    
+    def update_download_token(self, download_token: str):
+        tokens = self.tokens
+        if tokens and download_token and tokens.download_token != download_token:
+            tokens.download_token = download_token
+            metrics.increment("photoprism.download_token_refresh")
+    
+    def _login(self) -> PhotoPrismTokens:
+        tokens, expires_in = self.login()
+        self.tokens = tokens
+        self.expires_at = time.time() + expires_in if expires_in else None
+        # Sessions shorter than the margin would otherwise be renewed on every request
+        self._margin = min(self.refresh_margin, expires_in / 2) if expires_in else self.refresh_margin
+        metrics.increment("photoprism.session_login")
+        return tokens
+
+
 class PhotoPrismClient:
     
-    def __init__(self, config: PhotoPrismConfig):
+    def __init__(self, config: PhotoPrismConfig, scheduler: Optional[TransferScheduler] = None):
         self.config = config
-        self.tokens: Optional[PhotoPrismTokens] = None
+        self.scheduler = scheduler or TransferScheduler()
+        self.token_manager = PhotoPrismTokenManager(self._login)
+        self.range_threshold = RANGE_DOWNLOAD_THRESHOLD
+        self.range_segments = RANGE_DOWNLOAD_SEGMENTS
+        
+        # Keep-alive connections shared by thumbnail, search and range requests
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+    
+    @property
+    def tokens(self) -> Optional[PhotoPrismTokens]:
+        return self.token_manager.tokens
     
     def connect(self) -> bool:
         if not self.config.is_complete():
             raise ValueError("PhotoPrism configuration is incomplete")
         
         try:
-            login_data = {
-                "username": self.config.username,
-                "password": self.config.password
-            }
+            self.token_manager.start()
+            return True
             
+        except Exception as e:
+            raise Exception(f"PhotoPrism connection error: {str(e)}")
+    
+    def _login(self) -> Tuple[PhotoPrismTokens, Optional[float]]:
+        login_data = {
+            "username": self.config.username,
+            "password": self.config.password
+        }
+        
+        with metrics.track("photoprism.session") as measurement:
             response = requests.post(
                 f"{self.config.url.rstrip('/')}/api/v1/session",
                 json=login_data,
                 headers={"Content-Type": "application/json"}
             )
-            
-            if response.status_code != 200:
-                raise Exception(f"Authentication failed: {response.status_code}")
-            
-            session_data = response.json()
-            access_token = (
-                session_data.get("access_token") or 
-                session_data.get("session_id") or 
-                session_data.get("id")
-            )
-            
-            config_data = session_data.get("config", {})
-            preview_token = config_data.get("previewToken", "")
-            download_token = (
-                session_data.get("download_token") or 
-                session_data.get("downloadToken") or 
-                config_data.get("downloadToken", "")
-            )
-
-            for header_name, header_value in response.headers.items():
-                if "download" in header_name.lower() and "token" in header_name.lower():
-                    download_token = header_value
-                    break
-            
-            self.tokens = PhotoPrismTokens(
-                access_token=access_token,
-                preview_token=preview_token,
-                download_token=download_token
-            )
-            
-            return True
-            
-        except Exception as e:
-            raise Exception(f"PhotoPrism connection error: {str(e)}")
+            measurement.record_response(response)
+        
+        if response.status_code != 200:
+            raise Exception(f"Authentication failed: {response.status_code}")
+        
+        session_data = response.json()
+        access_token = (
+            session_data.get("access_token") or 
+            session_data.get("session_id") or 
+            session_data.get("id")
+        )
+        
+        config_data = session_data.get("config", {})
+        preview_token = config_data.get("previewToken", "")
+        download_token = (
+            session_data.get("download_token") or 
+            session_data.get("downloadToken") or 
+            config_data.get("downloadToken", "")
+        )
+        
+        header_token = self._find_download_token_header(response.headers)
+        if header_token:
+            download_token = header_token
+        
+        tokens = PhotoPrismTokens(
+            access_token=access_token,
+            preview_token=preview_token,
+            download_token=download_token
+        )
+        
+        expires_in = session_data.get("expires_in")
+        return tokens, float(expires_in) if isinstance(expires_in, (int, float)) and expires_in > 0 else None
     
-    def search_photos(self, date: str, count: int = 100) -> List[Dict[str, Any]]:
+    def _request(self, method: str, build_url: Callable[[PhotoPrismTokens], str], **kwargs) -> requests.Response:
+        extra_headers = kwargs.pop("headers", {})
+        
+        def send(tokens: PhotoPrismTokens) -> requests.Response:
+            headers = {"Authorization": f"Bearer {tokens.access_token}", **extra_headers}
+            return self.http.request(method, build_url(tokens), headers=headers, **kwargs)
+        
+        tokens = self.token_manager.get_tokens()
+        response = send(tokens)
+        
+        # Expired session: log in again (once across threads) and replay the request
+        if response.status_code == 401:
+            response.close()
+            metrics.increment("photoprism.unauthorized_retry")
+            response = send(self.token_manager.refresh(tokens))
+        
+        self._update_download_token_from_headers(response.headers)
+        return response
+    
+    def search_photos(self, date: str, count: int = 100,
+                      filters: Optional[PhotoFilters] = None) -> List[PhotoRecord]:
         if not self.tokens:
             raise Exception("Not connected to PhotoPrism")
         
         try:
             params = {
                 "count": count,
-                "quality": 1,
-                "q": f"taken:{date}",
-                "merged": True
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.tokens.access_token}",
-                "Content-Type": "application/json"
+                "merged": True,
+                **(filters or PhotoFilters()).to_params(date)
             }
             
-            response = requests.get(
-                f"{self.config.url.rstrip('/')}/api/v1/photos",
-                params=params,
-                headers=headers
-            )
+            with metrics.track("photoprism.search") as measurement:
+                response = self._request(
+                    "GET",
+                    lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/photos",
+                    params=params,
+                    headers={"Content-Type": "application/json"}
+                )
+                measurement.record_response(response)
             
             if response.status_code != 200:
                 raise Exception(f"Photo search failed: {response.status_code}")
             
-            return response.json()
+            return parse_photo_records(response.content)
             
         except Exception as e:
             raise Exception(f"Search error: {str(e)}")
     
-    def get_thumbnail(self, photo: Dict[str, Any]) -> Optional[bytes]:
+    def iter_added_since(self, since: str, page_size: int = 100) -> Iterator[List[PhotoRecord]]:
+        return self._iter_search_pages({"added": since, "order": "added", "quality": 1}, "photoprism.search",
+                                       "recently added photos", page_size, parse_photo_records)
+    
+    def iter_updated_since(self, since: str, page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        # Catches new photos as well as edits such as favorites, titles or privacy,
+        # low quality photos included so callers can apply the quality filter themselves.
+        # Pages stay full result dicts, the local index stores more fields than PhotoRecord has.
+        return self._iter_search_pages({"updated": since, "order": "added", "quality": 0}, "photoprism.search",
+                                       "updated photos", page_size, json.loads)
+    
+    def iter_album_photos(self, album_uid: str, page_size: int = 500) -> Iterator[PhotoRecord]:
+        return self._iter_photo_pages({"s": album_uid}, "photoprism.album_photos", f"album {album_uid}", page_size)
+    
+    def iter_label_photos(self, label: str, page_size: int = 500) -> Iterator[PhotoRecord]:
+        return self._iter_photo_pages({"label": label, "quality": 0}, "photoprism.label_photos", f"label {label}",
+                                      page_size)
+    
+    def _iter_photo_pages(self, filters: Dict[str, Any], operation: str, description: str,
+                          page_size: int) -> Iterator[PhotoRecord]:
+        for page in self._iter_search_pages(filters, operation, description, page_size, parse_photo_records):
+            yield from page
+    
+    def _iter_search_pages(self, filters: Dict[str, Any], operation: str, description: str, page_size: int,
+                           parse: Callable[[bytes], List[Any]]) -> Iterator[List[Any]]:
         if not self.tokens:
             raise Exception("Not connected to PhotoPrism")
         
-        try:
-            files = photo.get("Files", [])
-            if not files:
-                return None
-            
-            first_file = files[0]
-            if first_file.get("Missing", False):
-                return None
+        # With merged results count and offset apply to file rows, not photos. A photo
+        # with several files can come back short or span two pages, so the offset moves
+        # by the row count PhotoPrism reports and only an empty page ends the listing.
+        offset = 0
+        last_uid = None
+        while True:
+            params = {
+                "count": page_size,
+                "offset": offset,
+                "merged": True,
+                **filters
+            }
             
-            file_hash = first_file.get("Hash", "")
-            if not file_hash:
-                return None
+            with metrics.track(operation) as measurement:
+                response = self._request(
+                    "GET",
+                    lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/photos",
+                    params=params,
+                    headers={"Content-Type": "application/json"}
+                )
+                measurement.record_response(response)
             
-            thumb_url = f"{self.config.url.rstrip('/')}/api/v1/t/{file_hash}/{self.tokens.preview_token}/tile_500"
-            response = requests.get(thumb_url)
+            if response.status_code != 200:
+                raise Exception(f"Failed to list {description}: {response.status_code}")
             
-            if response.status_code == 200:
-                content_type = response.headers.get('content-type', '')
-                if 'svg' in content_type.lower() or len(response.content) < 1000:
-                    return None
-                return response.content
+            photos = parse(response.content)
+            if not photos:
+                return
+            offset += int(response.headers.get("X-Count") or len(photos))
             
+            # The primary file is listed first, the part of a split photo seen first is kept
+            page = [photo for photo in photos if photo.get("UID") != last_uid]
+            last_uid = photos[-1].get("UID")
+            if page:
+                yield page
+    
+    def iter_taken_dates(self, start: str, end: str, filters: Optional[PhotoFilters] = None,
+                         page_size: int = 1000) -> Iterator[Tuple[str, str]]:
+        # Yields (local date, primary file hash) per photo taken between start and end.
+        # The API can't select fields, so pages are reduced to those two values as they
+        # arrive. after/before compare UTC times, the range is widened by a day to cover
+        # every local date and trimmed again here.
+        after = (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        before = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=2)).strftime("%Y-%m-%d")
+        params = {"after": after, "before": before, "order": "oldest", **(filters or PhotoFilters()).to_params()}
+        
+        for photo in self._iter_photo_pages(params, "photoprism.day_counts", "photos by date", page_size):
+            taken_date = photo.get("TakenAtLocal", "")[:10]
+            if start <= taken_date <= end:
+                yield taken_date, primary_file_hash(photo)
+    
+    def list_labels(self, count: int = 1000, offset: int = 0) -> List[Dict[str, Any]]:
+        if not self.tokens:
+            raise Exception("Not connected to PhotoPrism")
+        
+        with metrics.track("photoprism.labels") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/labels",
+                params={"count": count, "offset": offset, "all": True},
+                headers={"Content-Type": "application/json"}
+            )
+            measurement.record_response(response)
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to list labels: {response.status_code}")
+        return response.json()
+    
+    def get_photo(self, photo_uid: str) -> Dict[str, Any]:
+        if not self.tokens:
+            raise Exception("Not connected to PhotoPrism")
+        return self._get_photo_details(photo_uid)
+    
+    def get_websocket_url(self) -> str:
+        url = self.config.url.rstrip('/')
+        scheme = "wss" if url.startswith("https://") else "ws"
+        return f"{scheme}://{url.split('://', 1)[-1]}/api/v1/ws"
+    
+    def get_thumbnail(self, photo: Dict[str, Any]) -> Optional[bytes]:
+        if not self.tokens:
+            raise Exception("Not connected to PhotoPrism")
+        
+        files = photo.get("Files", [])
+        if not files:
             return None
-            
-        except Exception:
+        
+        first_file = files[0]
+        if first_file.get("Missing", False):
+            return None
+        
+        file_hash = first_file.get("Hash", "")
+        if not file_hash:
             return None
+        
+        with self.scheduler.transfer(DOWNLOAD, TransferPriority.VISIBLE_THUMBNAIL) as transfer, \
+                metrics.track("photoprism.thumbnail") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/t/{file_hash}/{tokens.preview_token}/tile_500"
+            )
+            measurement.record_response(response)
+            transfer.throttle(len(response.content))
+        
+        # Surface overload and server errors so the fetch pool can back off
+        if response.status_code == 429 or response.status_code >= 500:
+            raise Exception(f"Thumbnail request failed: {response.status_code}")
+        
+        if response.status_code == 200:
+            content_type = response.headers.get('content-type', '')
+            if 'svg' in content_type.lower() or len(response.content) < 1000:
+                return None
+            return response.content
+        
+        return None
+    
+    def download_photo(self, photo: Dict[str, Any],
+                       priority: TransferPriority = TransferPriority.USER_TRANSFER) -> Tuple[bytes, str]:
+        downloaded = self.download_original(photo, priority)
+        if downloaded.path:
+            try:
+                with open(downloaded.path, "rb") as f:
+                    return f.read(), downloaded.filename
+            finally:
+                downloaded.discard()
+        return downloaded.data, downloaded.filename
     
-    def download_photo(self, photo: Dict[str, Any]) -> Tuple[bytes, str]:
+    def download_original(self, photo: Dict[str, Any],
+                          priority: TransferPriority = TransferPriority.USER_TRANSFER) -> DownloadedPhoto:
         if not self.tokens:
             raise Exception("Not connected to PhotoPrism")
         
         try:
-            photo_uid = photo.get('UID', '')
-            if not photo_uid:
-                raise Exception("No photo UID found")
-
-            photo_details = self._get_photo_details(photo_uid)
-
-            files = photo_details.get("Files", [])
-            if not files:
-                raise Exception("No files found in photo details")
-            
-            primary_file = self._get_primary_file(files)
-            file_hash = primary_file.get("Hash", "")
-            filename = primary_file.get("Name", "photo.jpg")
+            original = self.get_original_file(photo)
             
-            if not file_hash:
-                raise Exception("No file hash found")
+            if original.size >= self.range_threshold:
+                path = self._download_large_original(original, priority)
+                if path is not None:
+                    return DownloadedPhoto(data=b"", filename=original.filename, sha1=original.file_hash.lower(),
+                                           path=path)
             
-            expected_size = primary_file.get('Size', 0)
-
-            photo_data = self._try_download_with_token(file_hash, self.tokens.download_token, expected_size)
+            # The SHA1 is verified against file_hash while streaming
+            photo_data = self._try_download_with_token(original.file_hash, original.size, priority)
             if photo_data:
-                return photo_data, filename
+                return DownloadedPhoto(data=photo_data, filename=original.filename, sha1=original.file_hash.lower())
             raise Exception("All download methods failed")
 
         except Exception as e:
             raise Exception(f"Download error: {str(e)}")
     
-    def _get_photo_details(self, photo_uid: str) -> Dict[str, Any]:
-        assert self.tokens is not None
-        photo_detail_url = f"{self.config.url.rstrip('/')}/api/v1/photos/{photo_uid}"
-        headers = {
-            "Authorization": f"Bearer {self.tokens.access_token}",
-            "Content-Type": "application/json"
-        }
+    def get_original_file(self, photo: Dict[str, Any]) -> OriginalFile:
+        photo_uid = photo.get('UID', '')
+        if not photo_uid:
+            raise Exception("No photo UID found")
+
+        photo_details = self._get_photo_details(photo_uid)
+
+        files = photo_details.get("Files", [])
+        if not files:
+            raise Exception("No files found in photo details")
         
-        response = requests.get(photo_detail_url, headers=headers)
-        self._update_download_token_from_headers(response.headers)
+        primary_file = self._get_primary_file(files)
+        file_hash = primary_file.get("Hash", "")
+        if not file_hash:
+            raise Exception("No file hash found")
+        
+        return OriginalFile(
+            file_hash=file_hash,
+            filename=primary_file.get("Name", "photo.jpg"),
+            size=primary_file.get('Size', 0)
+        )
+    
+    def get_original_url(self, photo: Dict[str, Any]) -> Tuple[OriginalFile, str]:
+        if not self.tokens:
+            raise Exception("Not connected to PhotoPrism")
+        
+        original = self.get_original_file(photo)
+        
+        # The download token authorizes the URL on its own, so another server can fetch it
+        tokens = self.token_manager.get_tokens()
+        return original, f"{self.config.url.rstrip('/')}/api/v1/dl/{original.file_hash}?t={tokens.download_token}"
+    
+    def download_original_to_file(self, original: OriginalFile, path: str,
+                                  priority: TransferPriority = TransferPriority.USER_TRANSFER):
+        # Ranges already on disk from an interrupted attempt are not fetched again
+        download = RangedDownload(
+            path,
+            original.size,
+            lambda start, end, write: self._fetch_range(original.file_hash, start, end, write, priority),
+            segments=self.range_segments
+        )
+        download.run()
+        
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha1.update(chunk)
+        
+        if sha1.hexdigest() != original.file_hash.lower():
+            os.remove(path)
+            raise Exception("Downloaded file doesn't match its SHA1")
+    
+    def _download_large_original(self, original: OriginalFile, priority: TransferPriority) -> Optional[str]:
+        # A stable path per file lets a retry resume where the last attempt stopped.
+        # The file is handed to the caller as is, so the original never has to fit in memory.
+        path = os.path.join(tempfile.gettempdir(), f"photosync-{original.file_hash.lower()}.part")
+        try:
+            self.download_original_to_file(original, path, priority)
+        except RangeNotSupported:
+            return None
+        return path
+    
+    def _fetch_range(self, file_hash: str, start: int, end: int, write: Callable[[int, bytes], None],
+                     priority: TransferPriority):
+        with self.scheduler.transfer(DOWNLOAD, priority) as transfer, \
+                metrics.track("photoprism.download_range") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/dl/{file_hash}?t={tokens.download_token}",
+                headers={"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"},
+                stream=True
+            )
+            measurement.record_response(response, count_body=False)
+            
+            try:
+                if response.status_code == 200:
+                    raise RangeNotSupported("PhotoPrism ignored the Range header")
+                if response.status_code != 206:
+                    raise Exception(f"Range download failed: {response.status_code}")
+                if not response.headers.get("content-range", "").startswith(f"bytes {start}-"):
+                    raise Exception(f"Unexpected Content-Range: {response.headers.get('content-range')}")
+                
+                offset = start
+                for chunk in response.iter_content(chunk_size=256 * 1024):
+                    write(offset, chunk)
+                    offset += len(chunk)
+                    measurement.add_bytes(len(chunk))
+                    transfer.throttle(len(chunk))
+            finally:
+                response.close()
+    
+    def iter_zip_originals(self, photos: List[Dict[str, Any]],
+                           priority: TransferPriority = TransferPriority.BATCH_SYNC
+                           ) -> Iterator[Tuple[Dict[str, Any], DownloadedPhoto]]:
+        # One zip export replaces a details and a download request per photo.
+        # Photos missing from the archive are simply not yielded.
+        if not self.tokens:
+            raise Exception("Not connected to PhotoPrism")
+        
+        by_hash = {primary_file_hash(photo).lower(): photo for photo in photos if primary_file_hash(photo)}
+        if not by_hash:
+            return
+        
+        with tempfile.TemporaryFile() as archive:
+            self._download_zip([photo.get('UID', '') for photo in by_hash.values()], archive, priority)
+            
+            with zipfile.ZipFile(archive) as zip_file:
+                for entry in zip_file.infolist():
+                    if entry.is_dir():
+                        continue
+                    
+                    # Entries are read one at a time, the archive itself stays on disk
+                    downloaded = self._read_zip_entry(zip_file, entry)
+                    
+                    # Matching on content hash also skips sidecar files and verifies the entry
+                    photo = by_hash.pop(downloaded.sha1, None)
+                    if photo is None:
+                        downloaded.discard()
+                        continue
+                    
+                    yield photo, downloaded
+    
+    def _read_zip_entry(self, zip_file: zipfile.ZipFile, entry: zipfile.ZipInfo) -> DownloadedPhoto:
+        filename = entry.filename.rsplit('/', 1)[-1]
+        sha1 = hashlib.sha1()
+        
+        if entry.file_size < self.range_threshold:
+            data = bytearray()
+            with zip_file.open(entry) as member:
+                for chunk in iter(lambda: member.read(64 * 1024), b""):
+                    sha1.update(chunk)
+                    data += chunk
+            return DownloadedPhoto(data=data, filename=filename, sha1=sha1.hexdigest())
+        
+        # Large entries go to their own file like ranged downloads, so the entries
+        # waiting for an upload never have to fit in memory together
+        fd, path = tempfile.mkstemp(prefix="photosync-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as spool, zip_file.open(entry) as member:
+                for chunk in iter(lambda: member.read(1024 * 1024), b""):
+                    sha1.update(chunk)
+                    spool.write(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return DownloadedPhoto(data=b"", filename=filename, sha1=sha1.hexdigest(), path=path)
+    
+    def _download_zip(self, photo_uids: List[str], archive, priority: TransferPriority):
+        with metrics.track("photoprism.zip_create") as measurement:
+            response = self._request(
+                "POST",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/zip",
+                json={"photos": photo_uids}
+            )
+            measurement.record_response(response)
+        
+        if response.status_code != 200:
+            raise Exception(f"Zip export failed: {response.status_code}")
+        
+        zip_name = response.json().get("filename", "")
+        if not zip_name:
+            raise Exception("Zip export returned no file name")
+        
+        with self.scheduler.transfer(DOWNLOAD, priority) as transfer, \
+                metrics.track("photoprism.zip_download") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/zip/{zip_name}?t={tokens.download_token}",
+                stream=True
+            )
+            measurement.record_response(response, count_body=False)
+            
+            try:
+                if response.status_code != 200:
+                    raise Exception(f"Zip download failed: {response.status_code}")
+                
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    archive.write(chunk)
+                    measurement.add_bytes(len(chunk))
+                    transfer.throttle(len(chunk))
+            finally:
+                response.close()
+        
+        archive.seek(0)
+    
+    def _get_photo_details(self, photo_uid: str) -> Dict[str, Any]:
+        with metrics.track("photoprism.details") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/photos/{photo_uid}",
+                headers={"Content-Type": "application/json"}
+            )
+            measurement.record_response(response)
         
         if response.status_code != 200:
             raise Exception(f"Failed to get photo details: {response.status_code}")
@@ -184,15 +647,46 @@ class PhotoPrismClient:
                 return file_info
         raise Exception("No primary file found")
     
-    def _try_download_with_token(self, file_hash: str, token: str, expected_size: int) -> Optional[bytes]:
-        download_url = f"{self.config.url.rstrip('/')}/api/v1/dl/{file_hash}?t={token}"
-        response = requests.get(download_url)
-        self._update_download_token_from_headers(response.headers)
+    def _try_download_with_token(self, file_hash: str, expected_size: int,
+                                 priority: TransferPriority) -> Optional[bytes]:
+        with self.scheduler.transfer(DOWNLOAD, priority) as transfer, \
+                metrics.track("photoprism.download") as measurement:
+            response = self._request(
+                "GET",
+                lambda tokens: f"{self.config.url.rstrip('/')}/api/v1/dl/{file_hash}?t={tokens.download_token}",
+                stream=True
+            )
+            measurement.record_response(response, count_body=False)
+            
+            try:
+                # Reject from headers alone before any of the body is read
+                if not self._is_valid_download_response(response, expected_size):
+                    return None
+                
+                photo_data = bytearray(expected_size) if expected_size > 0 else bytearray()
+                sha1 = hashlib.sha1()
+                received = 0
+                
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    end = received + len(chunk)
+                    if expected_size > 0 and end > expected_size:
+                        return None
+                    
+                    photo_data[received:end] = chunk
+                    sha1.update(chunk)
+                    received = end
+                    measurement.add_bytes(len(chunk))
+                    transfer.throttle(len(chunk))
+            finally:
+                response.close()
         
-        if self._is_valid_download_response(response, expected_size):
-            return response.content
+        if not received or (expected_size > 0 and received != expected_size):
+            return None
         
-        return None
+        if sha1.hexdigest() != file_hash.lower():
+            return None
+        
+        return photo_data
     
     def _is_valid_download_response(self, response: requests.Response, expected_size: int) -> bool:
         if response.status_code != 200:
@@ -204,22 +698,21 @@ class PhotoPrismClient:
         if not any(t in content_type for t in valid_types) or 'svg' in content_type:
             return False
         
-        actual_size = len(response.content)
-
-        if expected_size > 0 and actual_size >= (expected_size * 0.8):
-            return True
+        # A compressed body has a different length than the original file
+        content_length = response.headers.get('content-length', '')
+        if (expected_size > 0 and content_length.isdigit() and int(content_length) != expected_size
+                and not response.headers.get('content-encoding')):
+            return False
         
-        return actual_size > 1000000  # At least 1MB
+        return True
     
     def _update_download_token_from_headers(self, headers: Mapping[str, str]):
-        if not self.tokens:
-            return
-        
+        download_token = self._find_download_token_header(headers)
+        if download_token:
+            self.token_manager.update_download_token(download_token)
+    
+    def _find_download_token_header(self, headers: Mapping[str, str]) -> str:
         for header_name, header_value in headers.items():
             if "download" in header_name.lower() and "token" in header_name.lower():
-                self.tokens = PhotoPrismTokens(
-                    access_token=self.tokens.access_token,
-                    preview_token=self.tokens.preview_token,
-                    download_token=header_value
-                )
-                break
\ No newline at end of file
+                return header_value
+        return ""
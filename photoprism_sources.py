@@ -0,0 +1,160 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from config import PhotoPrismConfig
+from photoprism_client import (
+    DownloadedPhoto, OriginalFile, PhotoFilters, PhotoPrismClient, PhotoPrismTokens, primary_file_hash
+)
+from photo_record import SOURCE_KEY, PhotoRecord
+from transfer_scheduler import TransferPriority, TransferScheduler
+
+
+def _taken_at(photo: Dict[str, Any]) -> str:
+    return photo.get("TakenAtLocal", "")
+
+
+@dataclass
+class SourcesSearch:
+    photos: List[PhotoRecord]
+    # "source: error" for every source that failed so far in this search
+    failed_sources: List[str] = field(default_factory=list)
+
+
+class PhotoPrismSources:
+    
+    def __init__(self, clients: List[PhotoPrismClient]):
+        if not clients:
+            raise ValueError("At least one PhotoPrism source is required")
+        self.clients = clients
+    
+    @classmethod
+    def from_configs(cls, configs: List[PhotoPrismConfig],
+                     scheduler: Optional[TransferScheduler] = None) -> 'PhotoPrismSources':
+        return cls([PhotoPrismClient(config, scheduler) for config in configs])
+    
+    @property
+    def primary(self) -> PhotoPrismClient:
+        return self.clients[0]
+    
+    @property
+    def tokens(self) -> Optional[PhotoPrismTokens]:
+        return self.primary.tokens
+    
+    def connect(self) -> List[str]:
+        # The primary source must connect, additional sources are best effort
+        self.primary.connect()
+        
+        failed = []
+        for client in self.clients[1:]:
+            try:
+                client.connect()
+            except Exception as e:
+                failed.append(f"{client.config.display_name}: {str(e)}")
+        return failed
+    
+    def search_photos(self, date: str, count: int = 100,
+                      filters: Optional[PhotoFilters] = None) -> List[PhotoRecord]:
+        result = SourcesSearch([])
+        for result in self.iter_search(date, count, filters):
+            pass
+        return result.photos
+    
+    def iter_search(self, date: str, count: int = 100,
+                    filters: Optional[PhotoFilters] = None) -> Iterator[SourcesSearch]:
+        # Yields the merged list each time another source answers, so the
+        # grid can show the fastest source without waiting for the slowest.
+        # Failures travel with each result, concurrent searches don't share them.
+        sources = [(index, client) for index, client in enumerate(self.clients) if client.tokens]
+        if not sources:
+            raise Exception("Not connected to PhotoPrism")
+        
+        results: Dict[int, List[PhotoRecord]] = {}
+        errors: List[Tuple[int, Exception]] = []
+        failed_sources: List[str] = []
+        
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = {executor.submit(client.search_photos, date, count, filters): index for index, client in sources}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    photos = future.result()
+                except Exception as e:
+                    errors.append((index, e))
+                    failed_sources.append(f"{self.clients[index].config.display_name}: {str(e)}")
+                    continue
+                
+                for photo in photos:
+                    photo[SOURCE_KEY] = index
+                results[index] = sorted(photos, key=_taken_at)
+                yield SourcesSearch(self._merge(results), list(failed_sources))
+        
+        if not results and errors:
+            raise errors[0][1]
+    
+    def count_by_day(self, start: str, end: str, filters: Optional[PhotoFilters] = None) -> Dict[str, int]:
+        clients = [client for client in self.clients if client.tokens]
+        if not clients:
+            raise Exception("Not connected to PhotoPrism")
+        
+        def taken_dates(client: PhotoPrismClient) -> List[Tuple[str, str]]:
+            return list(client.iter_taken_dates(start, end, filters))
+        
+        # A photo stored in several sources is counted once, like in merged searches
+        counts: Dict[str, int] = {}
+        seen = set()
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            for dates in executor.map(taken_dates, clients):
+                for taken_date, file_hash in dates:
+                    if file_hash:
+                        if (taken_date, file_hash) in seen:
+                            continue
+                        seen.add((taken_date, file_hash))
+                    counts[taken_date] = counts.get(taken_date, 0) + 1
+        return counts
+    
+    def _merge(self, results: Dict[int, List[PhotoRecord]]) -> List[PhotoRecord]:
+        # heapq.merge is stable, so on equal timestamps earlier sources win the dedup
+        merged = []
+        seen = set()
+        for photo in heapq.merge(*(results[index] for index in sorted(results)), key=_taken_at):
+            file_hash = primary_file_hash(photo)
+            if file_hash:
+                if file_hash in seen:
+                    continue
+                seen.add(file_hash)
+            merged.append(photo)
+        return merged
+    
+    def client_for(self, photo: Dict[str, Any]) -> PhotoPrismClient:
+        index = photo.get(SOURCE_KEY, 0)
+        return self.clients[index] if 0 <= index < len(self.clients) else self.primary
+    
+    def get_thumbnail(self, photo: Dict[str, Any]) -> Optional[bytes]:
+        return self.client_for(photo).get_thumbnail(photo)
+    
+    def download_photo(self, photo: Dict[str, Any],
+                       priority: TransferPriority = TransferPriority.USER_TRANSFER) -> Tuple[bytes, str]:
+        return self.client_for(photo).download_photo(photo, priority)
+    
+    def download_original(self, photo: Dict[str, Any],
+                          priority: TransferPriority = TransferPriority.USER_TRANSFER) -> DownloadedPhoto:
+        return self.client_for(photo).download_original(photo, priority)
+    
+    def get_original_file(self, photo: Dict[str, Any]) -> OriginalFile:
+        return self.client_for(photo).get_original_file(photo)
+    
+    def get_original_url(self, photo: Dict[str, Any]) -> Tuple[OriginalFile, str]:
+        return self.client_for(photo).get_original_url(photo)
+    
+    def iter_zip_originals(self, photos: List[Dict[str, Any]],
+                           priority: TransferPriority = TransferPriority.BATCH_SYNC
+                           ) -> Iterator[Tuple[Dict[str, Any], DownloadedPhoto]]:
+        # One archive per source, each holding only that source's photos
+        by_source: Dict[int, List[Dict[str, Any]]] = {}
+        for photo in photos:
+            by_source.setdefault(photo.get(SOURCE_KEY, 0), []).append(photo)
+        
+        for _, source_photos in sorted(by_source.items()):
+            yield from self.client_for(source_photos[0]).iter_zip_originals(source_photos, priority)
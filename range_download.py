@@ -0,0 +1,121 @@
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+@dataclass
+class ByteRange:
+    start: int
+    end: int       # Inclusive, as in the Range header
+    done: int = 0  # Bytes already written from start
+    
+    @property
+    def next_offset(self) -> int:
+        return self.start + self.done
+    
+    @property
+    def complete(self) -> bool:
+        return self.next_offset > self.end
+
+
+# fetch_range(start, end, write) requests bytes start..end and calls
+# write(offset, chunk) for every chunk received
+RangeFetcher = Callable[[int, int, Callable[[int, bytes], None]], None]
+
+
+class RangedDownload:
+    def __init__(self, path: str, size: int, fetch_range: RangeFetcher, segments: int = 4,
+                 min_segment_size: int = 8 * 1024 * 1024):
+        self.path = path
+        self.state_path = path + ".ranges"
+        self.size = size
+        self.fetch_range = fetch_range
+        self.segments = max(1, min(segments, size // min_segment_size or 1))
+        self.ranges: List[ByteRange] = []
+        self._lock = threading.Lock()
+    
+    def run(self):
+        self.ranges = self._load_state() or self._plan()
+        
+        # Preallocate so every segment can write at its own offset
+        mode = "r+b" if os.path.exists(self.path) else "w+b"
+        with open(self.path, mode) as f:
+            f.truncate(self.size)
+            with mmap.mmap(f.fileno(), self.size) as mapped:
+                pending = [byte_range for byte_range in self.ranges if not byte_range.complete]
+                with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                    futures = [executor.submit(self._fetch, mapped, byte_range) for byte_range in pending]
+                    errors = [future.exception() for future in futures]
+                mapped.flush()
+        
+        failures = [error for error in errors if error is not None]
+        if any(isinstance(error, RangeNotSupported) for error in failures):
+            # Nothing usable was written, leave no partial file behind
+            self.discard()
+            raise RangeNotSupported("Server doesn't support range requests")
+        if failures:
+            raise failures[0]
+        
+        self.discard_state()
+    
+    def discard_state(self):
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+    
+    def discard(self):
+        self.discard_state()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def _fetch(self, mapped: mmap.mmap, byte_range: ByteRange):
+        def write(offset: int, chunk: bytes):
+            end = offset + len(chunk)
+            if offset != byte_range.next_offset or end > byte_range.end + 1:
+                raise Exception(f"Unexpected bytes {offset}-{end - 1} for range {byte_range.start}-{byte_range.end}")
+            mapped[offset:end] = chunk
+            byte_range.done += len(chunk)
+        
+        try:
+            self.fetch_range(byte_range.next_offset, byte_range.end, write)
+            if not byte_range.complete:
+                raise Exception(f"Range {byte_range.start}-{byte_range.end} ended early")
+        finally:
+            self._save_state(mapped)
+    
+    def _plan(self) -> List[ByteRange]:
+        segment_size = -(-self.size // self.segments)
+        return [
+            ByteRange(start, min(start + segment_size, self.size) - 1)
+            for start in range(0, self.size, segment_size)
+        ]
+    
+    def _load_state(self) -> List[ByteRange]:
+        try:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) != self.size:
+                return []
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            if state.get("size") != self.size:
+                return []
+            return [ByteRange(*values) for values in state["ranges"]]
+        except Exception:
+            return []
+    
+    def _save_state(self, mapped: mmap.mmap):
+        with self._lock:
+            state = {
+                "size": self.size,
+                "ranges": [[byte_range.start, byte_range.end, byte_range.done] for byte_range in self.ranges]
+            }
+            # Progress is snapshotted before flushing, so a resume never skips unwritten bytes
+            mapped.flush()
+            with open(self.state_path, "w") as f:
+                json.dump(state, f)
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from photoprism_client import PhotoFilters
+
+SearchKey = Tuple[str, PhotoFilters]
+
+
+@dataclass
+class CachedSearch:
+    photos: List[Dict[str, Any]]
+    fetched_at: float
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = 50, fresh_for: float = 60):
+        self.max_entries = max_entries
+        # Entries younger than this are shown without asking PhotoPrism again
+        self.fresh_for = fresh_for
+        self._entries: "OrderedDict[SearchKey, CachedSearch]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, date: str, filters: PhotoFilters) -> Optional[CachedSearch]:
+        with self._lock:
+            entry = self._entries.get((date, filters))
+            if entry:
+                self._entries.move_to_end((date, filters))
+            return entry
+    
+    def is_fresh(self, entry: CachedSearch) -> bool:
+        return time.monotonic() - entry.fetched_at < self.fresh_for
+    
+    def store(self, date: str, filters: PhotoFilters, photos: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[(date, filters)] = CachedSearch(photos, time.monotonic())
+            self._entries.move_to_end((date, filters))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_servers import MockLychee, MockPhotoPrism
+from config import LycheeConfig, PhotoPrismConfig
+from lychee_client import AlbumCache, LycheeClient
+from photoprism_client import PhotoPrismClient
+
+
+@pytest.fixture
+def photoprism():
+    # Every 4th photo has a second file, so merged pages don't line up with photos
+    with MockPhotoPrism(photos_per_day=30, days=2, file_size=2000, stacked_every=4) as server:
+        yield server
+
+
+@pytest.fixture
+def photoprism_client(photoprism):
+    client = PhotoPrismClient(PhotoPrismConfig(photoprism.url, "admin", "secret"))
+    client.connect()
+    return client
+
+
+@pytest.fixture
+def lychee():
+    with MockLychee(albums=3, depth=1, fanout=2) as server:
+        yield server
+
+
+@pytest.fixture
+def make_lychee_client(tmp_path):
+    def make(server: MockLychee) -> LycheeClient:
+        client = LycheeClient(LycheeConfig(server.url, "admin", "secret"),
+                              album_cache=AlbumCache(str(tmp_path / "albums.json")))
+        client.connect()
+        return client
+    
+    return make
@@ -0,0 +1,45 @@
+from lychee_client import AlbumIndex, LycheeAlbum
+
+
+def _index() -> AlbumIndex:
+    return AlbumIndex([
+        LycheeAlbum("1", "Summer Holidays 2023", "admin"),
+        LycheeAlbum("2", "Winter Holidays", "admin", has_children=True),
+        LycheeAlbum("3", "Family", "admin"),
+    ])
+
+
+def test_search_matches_word_prefixes_in_order():
+    index = _index()
+    
+    assert [album.id for album in index.search("hol")] == ["1", "2"]
+    assert [album.id for album in index.search("HOL win")] == ["2"]
+    assert index.search("olidays") == []
+    assert len(index.search("  ")) == 3
+
+
+def test_search_within_narrows_earlier_results():
+    index = _index()
+    earlier = index.search("holidays")
+    
+    assert [album.id for album in index.search("holidays summer", earlier)] == ["1"]
+
+
+def test_children_are_searchable_once_added():
+    index = _index()
+    assert not index.is_loaded("2")
+    
+    index.add_children("2", [LycheeAlbum("2-1", "Skiing", "admin", indent=1, parent_id="2")])
+    
+    assert index.is_loaded("2")
+    assert [album.id for album in index.get_children("2")] == ["2-1"]
+    assert [album.id for album in index.search("ski")] == ["2-1"]
+
+
+def test_added_children_dont_grow_the_given_list():
+    albums = [LycheeAlbum("2", "Winter Holidays", "admin", has_children=True)]
+    index = AlbumIndex(albums)
+    
+    index.add_children("2", [LycheeAlbum("2-1", "Skiing", "admin", indent=1, parent_id="2")])
+    
+    assert len(index) == 2 and len(albums) == 1
@@ -0,0 +1,22 @@
+from album_mirror import plan_mirror
+
+
+def _photo(file_hash: str) -> dict:
+    return {"UID": f"p-{file_hash}", "Files": [{"Hash": file_hash.upper(), "Primary": True}]}
+
+
+def test_plan_compares_by_primary_file_hash():
+    photos = [_photo("aa"), _photo("bb"), _photo("cc")]
+    
+    plan = plan_mirror(photos, {"bb", "zz"})
+    
+    assert plan.present == 1
+    assert [photo["UID"] for photo in plan.missing] == ["p-aa", "p-cc"]
+    assert plan.extra == {"zz"}
+
+
+def test_plan_counts_duplicate_files_once():
+    plan = plan_mirror([_photo("aa"), _photo("aa"), {"UID": "no-files", "Files": []}], set())
+    
+    assert [photo["UID"] for photo in plan.missing] == ["p-aa"]
+    assert plan.present == 0
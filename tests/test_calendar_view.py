@@ -0,0 +1,22 @@
+import pytest
+
+from calendar_view import HEAT_COLORS, heat_level
+
+
+@pytest.mark.parametrize("count, max_count, level", [
+    (0, 0, 0),
+    (0, 10, 0),
+    (1, 10, 1),
+    (3, 12, 1),
+    (4, 12, 2),
+    (9, 12, 3),
+    (10, 12, 4),
+    (12, 12, 4),
+    (1, 1, 4),
+])
+def test_heat_level(count, max_count, level):
+    assert heat_level(count, max_count) == level
+
+
+def test_heat_level_stays_in_palette():
+    assert {heat_level(count, 100) for count in range(101)} == set(range(len(HEAT_COLORS)))
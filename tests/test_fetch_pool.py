@@ -0,0 +1,60 @@
+import pytest
+
+from fetch_pool import AdaptiveFetchPool
+
+
+@pytest.fixture
+def pool():
+    fetch_pool = AdaptiveFetchPool(min_workers=2, max_workers=16, initial_workers=8)
+    yield fetch_pool
+    fetch_pool.shutdown()
+
+
+def test_errors_halve_the_limit(pool):
+    pool._release(0.1, failed=True)
+    assert pool.limit == 4
+    
+    for _ in range(5):
+        pool._release(0.1, failed=True)
+    assert pool.limit == pool.min_workers
+
+
+def test_steady_latency_grows_the_limit_additively(pool):
+    # About one slot per window of limit-many successes
+    for _ in range(8):
+        pool._release(0.1, failed=False)
+    assert pool.limit == 8
+    pool._release(0.1, failed=False)
+    assert pool.limit == 9
+    
+    for _ in range(1000):
+        pool._release(0.1, failed=False)
+    assert pool.limit == pool.max_workers
+
+
+def test_slow_responses_shrink_the_limit(pool):
+    for _ in range(50):
+        pool._release(0.1, failed=False)
+    limit = pool._limit
+    
+    for _ in range(20):
+        pool._release(1.0, failed=False)
+    
+    assert pool._limit < limit
+
+
+def test_fast_cached_responses_dont_look_like_congestion(pool):
+    # Every tenth response comes from a cache, the rest take their usual time
+    for number in range(500):
+        pool._release(0.005 if number % 10 == 0 else 0.05, failed=False)
+    
+    assert pool.limit == pool.max_workers
+
+
+def test_submitted_work_runs_and_errors_propagate(pool):
+    assert pool.submit(lambda value: value * 2, 21).result() == 42
+    
+    future = pool.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result()
+    assert pool.in_flight == 0
@@ -0,0 +1,25 @@
+from lychee_client import AlbumCache, CachedAlbums, LycheeAlbum
+
+
+def test_expanded_sub_albums_stay_out_of_the_album_cache(lychee, make_lychee_client, tmp_path):
+    client = make_lychee_client(lychee)
+    index = client.get_albums(force_refresh=True)
+    for album in list(index):
+        index.add_children(album.id, client.get_album_children(album))
+    
+    # A 304 stores the cached entry again, it must still hold only the top level
+    refreshed = client.get_albums(force_refresh=True)
+    
+    assert len(refreshed) == len(lychee.albums)
+    assert not refreshed.is_loaded("a0")
+    assert len(AlbumCache(str(tmp_path / "albums.json")).get(client._album_cache_key()).albums) == len(lychee.albums)
+
+
+def test_cached_sub_albums_are_dropped_on_load(tmp_path):
+    cache_file = str(tmp_path / "albums.json")
+    AlbumCache(cache_file)._save_entries({"key": CachedAlbums(albums=[
+        LycheeAlbum("a0", "Album a0", "admin", has_children=True),
+        LycheeAlbum("a0-0", "Album a0-0", "admin", indent=1, parent_id="a0"),
+    ])})
+    
+    assert [album.id for album in AlbumCache(cache_file).get("key").albums] == ["a0"]
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.mock_servers import MockPhotoPrism
+from config import PhotoPrismConfig
+from photo_index import PhotoIndex, label_slugs
+from photoprism_client import PhotoFilters, PhotoPrismClient
+from photoprism_sources import PhotoPrismSources
+
+DAY = "2024-06-01"
+
+
+def _connect(*servers: MockPhotoPrism) -> PhotoPrismSources:
+    sources = PhotoPrismSources([PhotoPrismClient(PhotoPrismConfig(server.url, "admin", "secret"))
+                                 for server in servers])
+    sources.connect()
+    return sources
+
+
+def _touch(photo):
+    # Marks a photo as edited after the last sync
+    photo["UpdatedAt"] = (datetime.utcnow() + timedelta(minutes=5)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@pytest.fixture
+def library(photoprism):
+    # Old edit times, so only photos touched by a test show up in later syncs
+    for number, photo in enumerate(photoprism.photos):
+        photo["UpdatedAt"] = "2020-01-01T00:00:00Z"
+        photo["Type"] = "video" if number % 6 == 0 else "image"
+        photo["Private"] = number % 4 == 0
+        photo["Quality"] = 1 if number % 3 == 0 else 3
+        photo["CameraMake"], photo["CameraModel"] = ("Apple", "iPhone 13") if number % 2 else ("Canon", "EOS R6")
+    return photoprism
+
+
+@pytest.fixture
+def index(tmp_path):
+    photo_index = PhotoIndex(str(tmp_path / "index.sqlite3"), page_size=7)
+    yield photo_index
+    photo_index.close()
+
+
+def _expected(server: MockPhotoPrism, predicate) -> list:
+    return [photo["UID"] for photo in server.photos if photo["TakenAtLocal"].startswith(DAY) and predicate(photo)]
+
+
+@pytest.mark.parametrize("filters, predicate", [
+    (PhotoFilters(quality=0), lambda photo: True),
+    (PhotoFilters(), lambda photo: photo["Quality"] >= 1),
+    (PhotoFilters(quality=3), lambda photo: photo["Quality"] >= 3),
+    (PhotoFilters(quality=0, favorite=True), lambda photo: photo["Favorite"]),
+    (PhotoFilters(quality=0, public=True), lambda photo: not photo["Private"]),
+    (PhotoFilters(quality=0, type="video"), lambda photo: photo["Type"] == "video"),
+    (PhotoFilters(quality=0, camera="iphone"), lambda photo: photo["CameraModel"] == "iPhone 13"),
+    (PhotoFilters(quality=3, favorite=True, type="image"),
+     lambda photo: photo["Quality"] >= 3 and photo["Favorite"] and photo["Type"] == "image"),
+])
+def test_filters(library, index, filters, predicate):
+    sources = _connect(library)
+    index.sync(sources)
+    
+    photos = index.search(sources, DAY, filters)
+    
+    assert [photo.uid for photo in photos] == _expected(library, predicate)
+
+
+def test_label_filter(library, index):
+    sources = _connect(library)
+    index.sync(sources)
+    
+    photos = index.search(sources, DAY, PhotoFilters(quality=0, label="cat"))
+    
+    cats = set(library.label_photos["cat"])
+    assert [photo.uid for photo in photos] == _expected(library, lambda photo: photo["UID"] in cats)
+
+
+@pytest.mark.parametrize("label, slugs", [
+    ("cat", ["cat"]),
+    ("Golden Retriever", ["golden-retriever"]),
+    ("  Café & Bar ", ["cafe-bar"]),
+    ("Cat|dog", ["cat", "dog"]),
+])
+def test_label_slugs(label, slugs):
+    assert label_slugs(label) == slugs
+
+
+def test_label_filter_matches_names_like_a_live_search(library, index):
+    sources = _connect(library)
+    index.sync(sources)
+    
+    uids = [photo.uid for photo in index.search(sources, DAY, PhotoFilters(quality=0, label=" Cat "))]
+    
+    assert uids and uids == [photo.uid for photo in index.search(sources, DAY, PhotoFilters(quality=0, label="cat"))]
+
+
+def test_rebuild_drops_deleted_photos(library, index):
+    sources = _connect(library)
+    index.sync(sources)
+    library.photos.pop(0)
+    
+    assert index.rebuild(sources) == len(library.photos)
+    assert index.count_by_day(sources, DAY, DAY, PhotoFilters(quality=0)) == {DAY: 29}
+
+
+def test_search_dedups_by_file_hash_across_sources(index):
+    # Both mocks generate the same photos, so every file is stored twice
+    with MockPhotoPrism(photos_per_day=5, days=1, file_size=2000) as first, \
+            MockPhotoPrism(photos_per_day=8, days=1, file_size=2000) as second:
+        sources = _connect(first, second)
+        index.sync(sources)
+        
+        photos = index.search(sources, DAY)
+        counts = index.count_by_day(sources, DAY, DAY)
+    
+    assert [photo.uid for photo in photos] == [photo["UID"] for photo in second.photos]
+    # Earlier sources win, the extra photos only exist in the second one
+    assert [photo.source for photo in photos] == [0] * 5 + [1] * 3
+    assert counts == {DAY: 8}
+
+
+def test_sync_pages_through_stacked_photos(library, index):
+    sources = _connect(library)
+    
+    assert not index.is_synced(sources)
+    assert index.sync(sources) == len(library.photos)
+    assert index.is_synced(sources)
+    assert index.count_by_day(sources, "2024-06-01", "2024-06-30", PhotoFilters(quality=0)) == {
+        "2024-06-01": 30, "2024-06-02": 30
+    }
+
+
+def test_interrupted_sync_leaves_source_unsynced(library, index):
+    sources = _connect(library)
+    client = sources.primary
+    iter_updated_since = client.iter_updated_since
+    
+    def failing_pages(since, page_size):
+        pages = iter_updated_since(since, page_size)
+        yield next(pages)
+        raise Exception("connection reset")
+    
+    client.iter_updated_since = failing_pages
+    with pytest.raises(Exception):
+        index.sync(sources)
+    
+    assert not index.is_synced(sources)
+
+
+def test_incremental_sync_refreshes_labels_of_updated_photos(library, index):
+    sources = _connect(library)
+    index.sync(sources)
+    
+    # One photo loses the label and another gains it, so the label's photo count stays the same
+    removed = library.label_photos["cat"][0]
+    added = library.photos[1]["UID"]
+    library.label_photos["cat"][0] = added
+    _touch(library.by_uid[removed])
+    _touch(library.by_uid[added])
+    library.requests.clear()
+    
+    assert index.sync(sources) == 2
+    
+    cats = {photo.uid for photo in index.search(sources, DAY, PhotoFilters(quality=0, label="cat"))}
+    assert removed not in cats and added in cats
+    assert library.requests["details"] == 2
+
+
+def test_incremental_sync_picks_up_edits(library, index):
+    sources = _connect(library)
+    index.sync(sources)
+    
+    photo = library.photos[1]
+    photo["Favorite"] = True
+    _touch(photo)
+    index.sync(sources)
+    
+    favorites = index.search(sources, DAY, PhotoFilters(quality=0, favorite=True))
+    assert photo["UID"] in {favorite.uid for favorite in favorites}
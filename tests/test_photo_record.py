@@ -0,0 +1,46 @@
+import pytest
+
+from photo_record import SOURCE_KEY, PhotoRecord, parse_photo_records
+
+
+def test_parse_keeps_fields_the_app_reads():
+    content = b'''[{
+        "UID": "p1", "Title": "Beach", "TakenAtLocal": "2024-06-01T10:00:00Z", "Type": "image", "Color": 3,
+        "Quality": 3, "Files": [
+            {"Hash": "raw", "Size": 20, "Name": "a.dng", "Primary": false},
+            {"Hash": "jpg", "Size": 10, "Name": "a.jpg", "Primary": true, "Colors": "012345678"}
+        ]
+    }]'''
+    
+    record = parse_photo_records(content)[0]
+    
+    assert (record.uid, record.title, record.type, record.color) == ("p1", "Beach", "image", 3)
+    assert record.primary_file() == {"Hash": "jpg", "Size": 10, "Name": "a.jpg", "Colors": "012345678",
+                                     "Primary": True}
+
+
+def test_get_serves_photoprism_field_names():
+    record = PhotoRecord("p1", title="Beach", file_hash="abc", file_size=10, source=1)
+    
+    assert record.get("UID") == "p1"
+    assert record.get("Title") == "Beach"
+    assert record.get(SOURCE_KEY) == 1
+    assert record.get("Files")[0]["Hash"] == "abc"
+    assert record.get("Quality", 0) == 0
+    assert record.get("Color", -1) == -1
+
+
+def test_get_without_file_has_no_files():
+    assert PhotoRecord("p1").get("Files") == []
+
+
+def test_item_access():
+    record = PhotoRecord("p1")
+    record[SOURCE_KEY] = 2
+    
+    assert record["UID"] == "p1"
+    assert record.source == 2
+    with pytest.raises(KeyError):
+        record["Color"]
+    with pytest.raises(KeyError):
+        record["Quality"] = 1
@@ -0,0 +1,85 @@
+import hashlib
+import os
+from datetime import datetime
+
+import pytest
+
+import photoprism_client
+from photoprism_client import PhotoPrismTokenManager, PhotoPrismTokens
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 7, 500])
+def test_album_listing_pages_by_file_rows(photoprism, photoprism_client, page_size):
+    photoprism.album_photos["album"] = [photo["UID"] for photo in photoprism.photos]
+    
+    photos = list(photoprism_client.iter_album_photos("album", page_size=page_size))
+    
+    assert [photo.uid for photo in photos] == [photo["UID"] for photo in photoprism.photos]
+    # A photo split across two pages keeps the part with its primary file
+    assert all(photo.file_hash == photoprism.by_uid[photo.uid]["Files"][0]["Hash"] for photo in photos)
+
+
+def test_label_listing_covers_every_photo(photoprism, photoprism_client):
+    uids = [photo.uid for photo in photoprism_client.iter_label_photos("cat", page_size=4)]
+    
+    assert uids == photoprism.label_photos["cat"]
+
+
+def test_listing_stops_on_empty_page(photoprism, photoprism_client):
+    photoprism.album_photos["album"] = [photo["UID"] for photo in photoprism.photos[:10]]
+    
+    list(photoprism_client.iter_album_photos("album", page_size=5))
+    
+    # Ten photos hold twelve file rows: three full pages and an empty one
+    assert photoprism.requests["search"] == 4
+
+
+def test_added_since_yields_record_pages(photoprism, photoprism_client):
+    since = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    for photo in photoprism.photos:
+        photo["CreatedAt"] = "2020-01-01T00:00:00Z"
+    added = [photoprism.add_photo(datetime(2024, 7, 1, 10, minute))["UID"] for minute in range(5)]
+    
+    pages = list(photoprism_client.iter_added_since(since, page_size=2))
+    
+    assert [photo.uid for page in pages for photo in page] == added
+
+
+def test_taken_dates_are_trimmed_to_range(photoprism, photoprism_client):
+    dates = list(photoprism_client.iter_taken_dates("2024-06-02", "2024-06-02", page_size=8))
+    
+    assert len(dates) == 30
+    assert {taken_date for taken_date, _ in dates} == {"2024-06-02"}
+
+
+def test_large_zip_entries_are_spooled_to_disk(photoprism, photoprism_client):
+    photos = photoprism_client.search_photos("2024-06-01")[:4]
+    photoprism_client.range_threshold = 1000
+    
+    for photo, downloaded in photoprism_client.iter_zip_originals(photos):
+        assert downloaded.data == b"" and os.path.exists(downloaded.path)
+        with open(downloaded.path, "rb") as f:
+            assert hashlib.sha1(f.read()).hexdigest() == downloaded.sha1 == photo.file_hash.lower()
+        downloaded.discard()
+        assert not os.path.exists(downloaded.path)
+
+
+@pytest.mark.parametrize("expires_in, renewed_after", [(3600, 3300), (120, 60)])
+def test_tokens_are_renewed_ahead_of_expiry(monkeypatch, expires_in, renewed_after):
+    now = [1000.0]
+    monkeypatch.setattr(photoprism_client.time, "time", lambda: now[0])
+    logins = []
+    
+    def login():
+        logins.append(now[0])
+        return PhotoPrismTokens(f"session{len(logins)}", "preview", "download"), expires_in
+    
+    manager = PhotoPrismTokenManager(login, refresh_margin=300)
+    manager.start()
+    
+    # Short sessions are renewed halfway instead of on every request
+    now[0] += renewed_after - 1
+    assert manager.get_tokens().access_token == "session1"
+    now[0] += 1
+    assert manager.get_tokens().access_token == "session2"
+    assert len(logins) == 2
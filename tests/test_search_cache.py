@@ -0,0 +1,42 @@
+from photoprism_client import PhotoFilters
+from search_cache import SearchCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchCache(max_entries=2)
+    cache.store("2024-06-01", PhotoFilters(), [{"UID": "a"}])
+    cache.store("2024-06-02", PhotoFilters(), [{"UID": "b"}])
+    
+    # Reading an entry makes it the most recently used one
+    cache.get("2024-06-01", PhotoFilters())
+    cache.store("2024-06-03", PhotoFilters(), [{"UID": "c"}])
+    
+    assert cache.get("2024-06-02", PhotoFilters()) is None
+    assert cache.get("2024-06-01", PhotoFilters()).photos == [{"UID": "a"}]
+    assert cache.get("2024-06-03", PhotoFilters()).photos == [{"UID": "c"}]
+
+
+def test_filters_are_part_of_the_key():
+    cache = SearchCache()
+    cache.store("2024-06-01", PhotoFilters(favorite=True), [{"UID": "a"}])
+    
+    assert cache.get("2024-06-01", PhotoFilters()) is None
+    assert cache.get("2024-06-01", PhotoFilters(favorite=True)) is not None
+
+
+def test_freshness():
+    cache = SearchCache(fresh_for=60)
+    cache.store("2024-06-01", PhotoFilters(), [])
+    entry = cache.get("2024-06-01", PhotoFilters())
+    
+    assert cache.is_fresh(entry)
+    entry.fetched_at -= 61
+    assert not cache.is_fresh(entry)
+
+
+def test_clear():
+    cache = SearchCache()
+    cache.store("2024-06-01", PhotoFilters(), [])
+    cache.clear()
+    
+    assert cache.get("2024-06-01", PhotoFilters()) is None
@@ -0,0 +1,131 @@
+import pytest
+
+from benchmarks.mock_servers import MockLychee
+from transfer import PhotoTransfer, UploadTarget
+
+DAY = "2024-06-01"
+
+
+@pytest.fixture
+def photos(photoprism_client):
+    return photoprism_client.search_photos(DAY)
+
+
+def test_checksum_mismatch_deletes_copy_and_retries(photoprism_client, lychee, make_lychee_client, photos):
+    lychee_client = make_lychee_client(lychee)
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client)
+    lychee.corrupt_uploads = 1
+    
+    result = photo_transfer.transfer(photos[0], "a0")
+    
+    assert result.verified is False
+    assert lychee.deleted == {result.upload.photo_id}
+    assert len(photo_transfer.retry_queue) == 1
+    
+    retried = photo_transfer.retry_failed()
+    
+    assert [result.verified for result in retried] == [True]
+    assert len(photo_transfer.retry_queue) == 0
+    assert len(lychee_client.get_album_checksums("a0")) == 1
+
+
+def test_uploads_are_verified_against_the_album(photoprism_client, lychee, make_lychee_client, photos):
+    # The mock answers uploads with upload metadata only, like Lychee's chunked upload
+    lychee_client = make_lychee_client(lychee)
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client)
+    
+    results = photo_transfer.transfer_batch(photos[:6], "a0", workers=4)
+    unsorted = photo_transfer.transfer(photos[6])
+    
+    assert [result.verified for result in results + [unsorted]] == [True] * 7
+    assert {result.upload.photo_id for result in results + [unsorted]} == {f"photo{i}" for i in range(7)}
+    assert not lychee_client.upload_reports_photo
+
+
+def test_retry_with_upload_error_is_queued_again(photoprism_client, lychee, make_lychee_client, photos):
+    lychee_client = make_lychee_client(lychee)
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client)
+    lychee.corrupt_uploads = 1
+    photo_transfer.fan_out(photos[0], [UploadTarget(lychee_client, "a0")])
+    
+    upload_photo = lychee_client.upload_photo
+    
+    def failing_upload(*args, **kwargs):
+        raise Exception("Upload error: 503")
+    
+    lychee_client.upload_photo = failing_upload
+    retried = photo_transfer.retry_failed()
+    
+    assert retried[0].error
+    assert len(photo_transfer.retry_queue) == 1
+    assert photo_transfer.retry_queue.take_all()[0].attempts == 2
+    
+    # The last allowed attempt isn't queued again
+    lychee_client.upload_photo = upload_photo
+    lychee.corrupt_uploads = 1
+    photo_transfer.fan_out(photos[1], [UploadTarget(lychee_client, "a0")], attempts=photo_transfer.max_attempts)
+    assert len(photo_transfer.retry_queue) == 0
+
+
+def test_stale_copy_blocks_retry_until_deleted(photoprism_client, lychee, make_lychee_client, photos):
+    lychee_client = make_lychee_client(lychee)
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client)
+    delete_photo = lychee_client.delete_photo
+    
+    def failing_delete(*args, **kwargs):
+        raise Exception("Delete error: 500")
+    
+    lychee_client.delete_photo = failing_delete
+    lychee.corrupt_uploads = 1
+    photo_transfer.transfer(photos[0], "a0")
+    
+    assert photo_transfer.retry_failed() == []
+    assert len(photo_transfer.retry_queue) == 1
+    
+    lychee_client.delete_photo = delete_photo
+    retried = photo_transfer.retry_failed()
+    
+    assert [result.verified for result in retried] == [True]
+    assert len(lychee_client.get_album_checksums("a0")) == 1
+
+
+def test_fan_out_resolves_import_url_once(photoprism, photoprism_client, lychee, make_lychee_client, photos):
+    with MockLychee(albums=1, depth=0) as second:
+        targets = [UploadTarget(make_lychee_client(lychee), "a0"), UploadTarget(make_lychee_client(second), "a0")]
+        photo_transfer = PhotoTransfer(photoprism_client, targets[0].client, server_side=True)
+        photoprism.requests.clear()
+        
+        results = photo_transfer.fan_out(photos[0], targets)
+    
+    assert [(result.server_side, result.verified) for result in results] == [(True, True), (True, True)]
+    assert photoprism.requests["details"] == 1
+
+
+def test_rejected_url_falls_back_to_relay_for_that_photo(photoprism_client, make_lychee_client, photos):
+    class RejectingLychee(MockLychee):
+        def handle(self, handler, method, path, query, body):
+            if path == "/api/v2/Photo::fromUrl":
+                handler.send_json({"message": "unsupported file"}, 422)
+                return
+            super().handle(handler, method, path, query, body)
+    
+    with RejectingLychee(albums=1, depth=0) as lychee:
+        lychee_client = make_lychee_client(lychee)
+        photo_transfer = PhotoTransfer(photoprism_client, lychee_client, server_side=True)
+        
+        result = photo_transfer.transfer(photos[0], "a0")
+    
+    assert result.verified is True and not result.server_side
+    assert lychee_client.url_import_supported
+
+
+def test_batch_uploads_to_every_target(photoprism_client, lychee, make_lychee_client, photos):
+    photoprism_client.range_threshold = 1000
+    with MockLychee(albums=1, depth=0) as second:
+        photo_transfer = PhotoTransfer(photoprism_client, make_lychee_client(lychee))
+        second_client = make_lychee_client(second)
+        
+        results = photo_transfer.transfer_batch(photos[:3], "a0", extra_targets=[UploadTarget(second_client, "a0")])
+        
+        assert len(results) == 6 and all(result.verified for result in results)
+        assert len(second_client.get_album_checksums("a0")) == 3
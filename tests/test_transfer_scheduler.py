@@ -0,0 +1,40 @@
+import io
+
+import transfer_scheduler
+from transfer_scheduler import UPLOAD, ThrottledReader, TokenBucket, TransferPriority, TransferScheduler
+
+
+def test_token_bucket_goes_into_debt(monkeypatch):
+    sleeps = []
+    now = [100.0]
+    monkeypatch.setattr(transfer_scheduler.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(transfer_scheduler.time, "sleep", sleeps.append)
+    
+    bucket = TokenBucket(1000)
+    bucket.consume(600)
+    assert sleeps == []
+    
+    # A large chunk isn't split, the caller waits off the debt instead
+    bucket.consume(900)
+    assert sleeps == [0.5]
+    
+    # Refilled tokens pay off the debt first
+    now[0] += 0.25
+    bucket.consume(100)
+    assert sleeps == [0.5, 0.35]
+
+
+def test_throttled_reader_reads_bytes_and_streams():
+    scheduler = TransferScheduler()
+    
+    class Stream(io.BytesIO):
+        len = 6
+    
+    with scheduler.transfer(UPLOAD, TransferPriority.USER_TRANSFER) as transfer:
+        for data in (b"abcdef", Stream(b"abcdef")):
+            reader = ThrottledReader(data, transfer)
+            assert len(reader) == 6
+            assert reader.read(4) == b"abcd"
+            assert reader.tell() == 4
+            assert reader.read() == b"ef"
+            assert reader.read() == b""
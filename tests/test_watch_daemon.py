@@ -0,0 +1,79 @@
+import threading
+import time
+
+from watch_daemon import PhotoWatcher
+
+
+def _watcher(photoprism_client, on_batch, **kwargs) -> PhotoWatcher:
+    return PhotoWatcher(photoprism_client, on_batch, debounce=0.01, use_websocket=False, retry_delay=0.01, **kwargs)
+
+
+def test_failed_photos_are_queued_again(photoprism, photoprism_client):
+    uids = [photo["UID"] for photo in photoprism.photos[:3]]
+    batches = []
+    
+    def on_batch(photos):
+        batches.append([photo["UID"] for photo in photos])
+        # The last photo's upload fails once
+        return [uids[2]] if len(batches) == 1 else []
+    
+    watcher = _watcher(photoprism_client, on_batch)
+    get_photo = photoprism_client.get_photo
+    
+    def flaky_get_photo(uid):
+        if uid == uids[1] and not watcher.attempts.get(uid):
+            raise Exception("Photo details failed: 502")
+        return get_photo(uid)
+    
+    photoprism_client.get_photo = flaky_get_photo
+    watcher._add(uids)
+    watcher._transfer(watcher.batches.get(timeout=5))
+    
+    assert batches == [[uids[0], uids[2]]]
+    assert watcher.attempts == {uids[1]: 1, uids[2]: 1}
+    
+    # Polls don't queue the photos again while their retry waits
+    watcher._add(uids)
+    watcher._transfer(watcher.batches.get(timeout=5))
+    
+    assert sorted(batches[1]) == sorted(uids[1:])
+    assert watcher.attempts == {}
+    assert watcher.batches.empty()
+
+
+def test_photos_are_given_up_after_max_attempts(photoprism, photoprism_client):
+    uid = photoprism.photos[0]["UID"]
+    watcher = _watcher(photoprism_client, lambda photos: [uid], max_attempts=2)
+    
+    watcher._add([uid])
+    watcher._transfer(watcher.batches.get(timeout=5))
+    watcher._transfer(watcher.batches.get(timeout=5))
+    
+    assert watcher.attempts == {}
+    time.sleep(0.2)
+    assert watcher.batches.empty()
+
+
+def test_seen_photos_expire(photoprism_client):
+    watcher = _watcher(photoprism_client, lambda photos: [])
+    watcher.seen_ttl = 0.05
+    watcher._add(["a", "b"])
+    watcher._add(["a"])
+    assert set(watcher.seen) == {"a", "b"}
+    
+    time.sleep(0.1)
+    watcher._add(["c"])
+    
+    assert set(watcher.seen) == {"c"}
+
+
+def test_retry_queue_is_drained_on_a_timer(photoprism_client):
+    retries = threading.Event()
+    watcher = _watcher(photoprism_client, lambda photos: [], on_retry=retries.set, retry_interval=0.05)
+    worker = threading.Thread(target=watcher._process_batches)
+    worker.start()
+    
+    assert retries.wait(5)
+    watcher.batches.put([])
+    worker.join(5)
+    assert not worker.is_alive()
@@ -0,0 +1,310 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from lychee_client import LycheeClient, UploadResult
+from metrics import metrics
+from photoprism_client import DownloadedPhoto, OriginalFile, PhotoPrismClient
+from photoprism_sources import PhotoPrismSources
+from transfer_scheduler import TransferPriority
+
+
+@dataclass
+class UploadTarget:
+    client: LycheeClient
+    album_id: str = ""
+    
+    @property
+    def name(self) -> str:
+        return self.client.config.display_name
+
+
+@dataclass
+class TransferResult:
+    photo: Dict[str, Any]
+    filename: str
+    sha1: str
+    upload: UploadResult
+    # None when the stored photo or its checksum couldn't be found to compare against
+    verified: Optional[bool] = None
+    target: str = ""
+    error: str = ""
+    # True when Lychee imported the original straight from PhotoPrism
+    server_side: bool = False
+
+
+@dataclass
+class IntegrityFailure:
+    photo: Dict[str, Any]
+    album_id: str
+    expected_sha1: str
+    actual_sha1: str
+    attempts: int = 1
+    # Set for fan-out uploads so the retry goes back to the same instance
+    target: Optional[UploadTarget] = None
+    # Corrupt copy Lychee couldn't delete yet, the retry tries again first
+    stale_photo_id: str = ""
+
+
+class IntegrityRetryQueue:
+    def __init__(self):
+        self._failures: Deque[IntegrityFailure] = deque()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._failures)
+    
+    def add(self, failure: IntegrityFailure):
+        with self._lock:
+            self._failures.append(failure)
+    
+    def take_all(self) -> List[IntegrityFailure]:
+        with self._lock:
+            failures = list(self._failures)
+            self._failures.clear()
+        return failures
+
+
+class PhotoTransfer:
+    def __init__(self, photoprism_client: Union[PhotoPrismClient, PhotoPrismSources], lychee_client: LycheeClient,
+                 retry_queue: Optional[IntegrityRetryQueue] = None, max_attempts: int = 3,
+                 server_side: bool = False):
+        self.photoprism_client = photoprism_client
+        self.lychee_client = lychee_client
+        self.retry_queue = retry_queue if retry_queue is not None else IntegrityRetryQueue()
+        self.max_attempts = max_attempts
+        # Let Lychee pull originals from PhotoPrism directly, relaying only when that fails
+        self.server_side = server_side
+    
+    def transfer(self, photo: Dict[str, Any], album_id: str = "",
+                 priority: TransferPriority = TransferPriority.USER_TRANSFER,
+                 on_progress: Optional[Callable[[str], None]] = None, attempts: int = 1) -> TransferResult:
+        target = UploadTarget(self.lychee_client, album_id)
+        if self.server_side and self.lychee_client.url_import_supported:
+            if on_progress:
+                on_progress("Importing photo into Lychee from PhotoPrism...")
+            result = self._import(photo, target, attempts, record_target=False)
+            if not result.error:
+                return result
+        
+        if on_progress:
+            on_progress("Downloading photo from PhotoPrism...")
+        downloaded = self.photoprism_client.download_original(photo, priority)
+        
+        if on_progress:
+            on_progress("Uploading photo to Lychee...")
+        try:
+            upload = self._upload(self.lychee_client, downloaded, album_id, priority)
+        finally:
+            downloaded.discard()
+        
+        return self._verify(photo, downloaded.filename, downloaded.sha1, upload, album_id, attempts)
+    
+    def fan_out(self, photo: Dict[str, Any], targets: List[UploadTarget],
+                priority: TransferPriority = TransferPriority.USER_TRANSFER,
+                on_progress: Optional[Callable[[str], None]] = None, attempts: int = 1) -> List[TransferResult]:
+        results: Dict[int, TransferResult] = {}
+        
+        if self.server_side:
+            importable = [i for i, target in enumerate(targets) if target.client.url_import_supported]
+            original_url = None
+            if importable:
+                # One details request resolves the URL every target imports from
+                try:
+                    original_url = self.photoprism_client.get_original_url(photo)
+                except Exception:
+                    metrics.increment("transfer.relay_fallback")
+            if original_url:
+                if on_progress:
+                    on_progress(f"Importing photo into {len(importable)} Lychee targets from PhotoPrism...")
+                with ThreadPoolExecutor(max_workers=len(importable)) as executor:
+                    imported = list(executor.map(
+                        lambda i: self._import(photo, targets[i], attempts, original_url=original_url), importable
+                    ))
+                for i, result in zip(importable, imported):
+                    if not result.error:
+                        results[i] = result
+        
+        relay = [i for i in range(len(targets)) if i not in results]
+        if relay:
+            # Download the original once and push it to every remaining target concurrently
+            if on_progress:
+                on_progress("Downloading photo from PhotoPrism...")
+            downloaded = self.photoprism_client.download_original(photo, priority)
+            
+            if on_progress:
+                on_progress(f"Uploading photo to {len(relay)} Lychee targets...")
+            
+            try:
+                with ThreadPoolExecutor(max_workers=len(relay)) as executor:
+                    uploaded = executor.map(
+                        lambda i: self._upload_to(photo, downloaded, targets[i], priority, attempts), relay
+                    )
+                    for i, result in zip(relay, uploaded):
+                        results[i] = result
+            finally:
+                downloaded.discard()
+        
+        return [results[i] for i in range(len(targets))]
+    
+    def transfer_batch(self, photos: List[Dict[str, Any]], album_id: str = "",
+                       priority: TransferPriority = TransferPriority.BATCH_SYNC,
+                       on_progress: Optional[Callable[[str], None]] = None, workers: int = 4,
+                       extra_targets: Optional[List[UploadTarget]] = None) -> List[TransferResult]:
+        # Originals come from a single zip export instead of two requests per photo.
+        # With extra targets every original is uploaded to each of them, one result per upload.
+        targets = [UploadTarget(self.lychee_client, album_id)] + (extra_targets or [])
+        results: List[TransferResult] = []
+        remaining = {id(photo): photo for photo in photos}
+        done = 0
+        
+        # Server-side imports already keep originals off this machine
+        use_zip = not (self.server_side and all(target.client.url_import_supported for target in targets))
+        
+        def upload(photo: Dict[str, Any], downloaded: DownloadedPhoto) -> List[TransferResult]:
+            try:
+                # A single target retries through transfer(), several through fan_out()
+                return [self._upload_to(photo, downloaded, target, priority, 1, record_target=len(targets) > 1)
+                        for target in targets]
+            finally:
+                downloaded.discard()
+        
+        if use_zip:
+            if on_progress:
+                on_progress(f"Exporting {len(photos)} photos from PhotoPrism...")
+            
+            # At most `workers` entries wait for their uploads, large ones on disk
+            pending: Deque[Future] = deque()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                try:
+                    for photo, downloaded in self.photoprism_client.iter_zip_originals(photos, priority):
+                        remaining.pop(id(photo), None)
+                        if len(pending) >= workers:
+                            results.extend(pending.popleft().result())
+                        done += 1
+                        if on_progress:
+                            on_progress(f"Uploading {downloaded.filename} to Lychee ({done}/{len(photos)})...")
+                        pending.append(executor.submit(upload, photo, downloaded))
+                except Exception:
+                    # Zip export unavailable or broken, the per-photo path below picks up the rest
+                    metrics.increment("transfer.zip_fallback")
+                for future in pending:
+                    results.extend(future.result())
+        
+        for photo in remaining.values():
+            done += 1
+            if on_progress:
+                on_progress(f"Transferring {photo.get('Title', 'Untitled')} ({done}/{len(photos)})...")
+            try:
+                if len(targets) > 1:
+                    results.extend(self.fan_out(photo, targets, priority))
+                else:
+                    results.append(self.transfer(photo, album_id, priority))
+            except Exception as e:
+                results.extend(TransferResult(photo=photo, filename="", sha1="", upload=UploadResult(),
+                                              target=target.name if len(targets) > 1 else "", error=str(e))
+                               for target in targets)
+        
+        return results
+    
+    def _upload(self, client: LycheeClient, downloaded: DownloadedPhoto, album_id: str,
+                priority: TransferPriority) -> UploadResult:
+        if not downloaded.path:
+            return client.upload_photo(downloaded.data, downloaded.filename, album_id, priority, downloaded.sha1)
+        # Every target reads the original from disk through its own handle
+        with open(downloaded.path, "rb") as photo_file:
+            return client.upload_photo(photo_file, downloaded.filename, album_id, priority, downloaded.sha1)
+    
+    def _upload_to(self, photo: Dict[str, Any], downloaded: DownloadedPhoto, target: UploadTarget,
+                   priority: TransferPriority, attempts: int, record_target: bool = True) -> TransferResult:
+        # Upload errors are reported in the result so the other targets still get the photo
+        try:
+            upload = self._upload(target.client, downloaded, target.album_id, priority)
+        except Exception as e:
+            return TransferResult(photo=photo, filename=downloaded.filename, sha1=downloaded.sha1,
+                                  upload=UploadResult(), target=target.name if record_target else "", error=str(e))
+        return self._verify(photo, downloaded.filename, downloaded.sha1, upload, target.album_id, attempts,
+                            target if record_target else None)
+    
+    def _import(self, photo: Dict[str, Any], target: UploadTarget, attempts: int, record_target: bool = True,
+                original_url: Optional[Tuple[OriginalFile, str]] = None) -> TransferResult:
+        try:
+            original, url = original_url or self.photoprism_client.get_original_url(photo)
+            upload = target.client.import_from_url(url, target.album_id)
+        except Exception as e:
+            metrics.increment("transfer.relay_fallback")
+            return TransferResult(photo=photo, filename="", sha1="", upload=UploadResult(),
+                                  target=target.name, error=str(e))
+        
+        result = self._verify(photo, original.filename, original.file_hash.lower(), upload, target.album_id,
+                              attempts, target if record_target else None)
+        result.server_side = True
+        return result
+    
+    def _verify(self, photo: Dict[str, Any], filename: str, sha1: str, upload: UploadResult, album_id: str,
+                attempts: int, target: Optional[UploadTarget] = None) -> TransferResult:
+        result = TransferResult(photo=photo, filename=filename, sha1=sha1, upload=upload,
+                                target=target.name if target else "")
+        if upload.checksum:
+            result.verified = upload.checksum == sha1
+        
+        if result.verified is False and attempts < self.max_attempts:
+            # The retry uploads a new copy, the corrupt one would otherwise stay next to it
+            client = target.client if target else self.lychee_client
+            self.retry_queue.add(IntegrityFailure(
+                photo=photo,
+                album_id=album_id,
+                expected_sha1=sha1,
+                actual_sha1=upload.checksum,
+                attempts=attempts,
+                target=target,
+                stale_photo_id=self._delete_upload(client, upload.photo_id, album_id)
+            ))
+        
+        return result
+    
+    def retry_failed(self, priority: TransferPriority = TransferPriority.BATCH_SYNC) -> List[TransferResult]:
+        results = []
+        for failure in self.retry_queue.take_all():
+            if failure.stale_photo_id:
+                client = failure.target.client if failure.target else self.lychee_client
+                failure.stale_photo_id = self._delete_upload(client, failure.stale_photo_id, failure.album_id)
+                if failure.stale_photo_id:
+                    # Uploading again now would leave two copies in Lychee
+                    self._requeue(failure)
+                    continue
+            
+            try:
+                if failure.target:
+                    # fan_out reports upload errors in the result instead of raising
+                    retried = self.fan_out(failure.photo, [failure.target], priority,
+                                           attempts=failure.attempts + 1)
+                else:
+                    retried = [self.transfer(failure.photo, failure.album_id, priority,
+                                             attempts=failure.attempts + 1)]
+            except Exception:
+                self._requeue(failure)
+                continue
+            
+            results.extend(retried)
+            if any(result.error for result in retried):
+                self._requeue(failure)
+        return results
+    
+    def _delete_upload(self, client: LycheeClient, photo_id: str, album_id: str) -> str:
+        # Returns the ID that is still left to delete
+        if not photo_id:
+            return ""
+        try:
+            client.delete_photo(photo_id, album_id)
+        except Exception:
+            metrics.increment("transfer.delete_failed")
+            return photo_id
+        return ""
+    
+    def _requeue(self, failure: IntegrityFailure):
+        failure.attempts += 1
+        if failure.attempts < self.max_attempts:
+            self.retry_queue.add(failure)
@@ -0,0 +1,127 @@
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Iterator, Optional, Union
+
+from config import TransferConfig
+
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+
+
+class TransferPriority(IntEnum):
+    VISIBLE_THUMBNAIL = 0
+    USER_TRANSFER = 1
+    BATCH_SYNC = 2
+    PREFETCH = 3
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate
+        self._tokens = rate
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+
+            # Go into debt rather than splitting large chunks, later callers pay it off
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Transfer:
+    def __init__(self, scheduler: 'TransferScheduler', direction: str, priority: TransferPriority):
+        self.scheduler = scheduler
+        self.direction = direction
+        self.priority = priority
+
+    def throttle(self, amount: int):
+        self.scheduler.throttle(self.direction, amount, self.priority)
+
+
+class TransferScheduler:
+    def __init__(self, download_limit: int = 0, upload_limit: int = 0):
+        self._buckets: Dict[str, TokenBucket] = {}
+        if download_limit > 0:
+            self._buckets[DOWNLOAD] = TokenBucket(download_limit)
+        if upload_limit > 0:
+            self._buckets[UPLOAD] = TokenBucket(upload_limit)
+
+        self._active = {priority: 0 for priority in TransferPriority}
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config: TransferConfig) -> 'TransferScheduler':
+        return cls(
+            download_limit=config.download_limit_kbps * 1024,
+            upload_limit=config.upload_limit_kbps * 1024
+        )
+
+    @contextmanager
+    def transfer(self, direction: str, priority: TransferPriority) -> Iterator[Transfer]:
+        with self._condition:
+            self._active[priority] += 1
+
+        try:
+            yield Transfer(self, direction, priority)
+        finally:
+            with self._condition:
+                self._active[priority] -= 1
+                self._condition.notify_all()
+
+    def throttle(self, direction: str, amount: int, priority: TransferPriority):
+        # Lower priority transfers pause between chunks while anything more
+        # important is in flight, then pay for their bytes in the direction's bucket
+        with self._condition:
+            while self._has_higher_priority_active(priority):
+                self._condition.wait()
+
+        bucket = self._buckets.get(direction)
+        if bucket and amount > 0:
+            bucket.consume(amount)
+
+    def _has_higher_priority_active(self, priority: TransferPriority) -> bool:
+        return any(self._active[p] for p in TransferPriority if p < priority)
+
+
+class ThrottledReader:
+    def __init__(self, data: Union[bytes, Any], transfer: Transfer, chunk_size: int = 64 * 1024):
+        # data is bytes, or a stream with a len attribute such as a MultipartEncoder
+        self.data = data
+        self.transfer = transfer
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    def __len__(self) -> int:
+        if isinstance(self.data, (bytes, bytearray)):
+            return len(self.data)
+        return self.data.len
+
+    def tell(self) -> int:
+        return self.position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self) - self.position
+
+        if isinstance(self.data, (bytes, bytearray)):
+            chunk = self.data[self.position:self.position + size]
+        else:
+            chunk = self.data.read(size)
+        self.position += len(chunk)
+
+        for offset in range(0, len(chunk), self.chunk_size):
+            self.transfer.throttle(min(self.chunk_size, len(chunk) - offset))
+
+        return chunk
@@ -0,0 +1,323 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import ConfigManager
+from lychee_client import AlbumCache, LycheeClient
+from photoprism_client import PhotoPrismClient
+from transfer import PhotoTransfer
+from transfer_scheduler import TransferPriority, TransferScheduler
+
+
+# Published by PhotoPrism when indexing or importing adds pictures
+PHOTO_CREATED_EVENTS = ("photos.created",)
+
+
+def _log(message: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+
+class EventBatcher:
+    def __init__(self, flush: Callable[[List[str]], None], debounce: float = 2.0, max_batch: int = 50,
+                 max_delay: float = 30.0):
+        self.flush = flush
+        self.debounce = debounce
+        self.max_batch = max_batch
+        # Caps how long a steady trickle of events can keep postponing a batch
+        self.max_delay = max_delay
+        self.pending: List[str] = []
+        self.first_pending_at = 0.0
+        self.timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+    
+    def add(self, uids: Iterable[str]):
+        batch = None
+        with self._lock:
+            for uid in uids:
+                if uid not in self.pending:
+                    if not self.pending:
+                        self.first_pending_at = time.monotonic()
+                    self.pending.append(uid)
+            
+            if not self.pending:
+                return
+            
+            if len(self.pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                delay = min(self.debounce, self.first_pending_at + self.max_delay - time.monotonic())
+                self._schedule(max(0.0, delay))
+        
+        if batch:
+            self.flush(batch)
+    
+    def close(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self.flush(batch)
+    
+    def _schedule(self, delay: float):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(delay, self._on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+    
+    def _on_timer(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self.flush(batch)
+    
+    def _take(self) -> List[str]:
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        return batch
+
+
+class PhotoWatcher:
+    # on_batch returns the UIDs that failed, they are queued again with backoff
+    def __init__(self, photoprism_client: PhotoPrismClient, on_batch: Callable[[List[Dict[str, Any]]], Iterable[str]],
+                 debounce: float = 2.0, max_batch: int = 50, poll_interval: float = 60.0,
+                 use_websocket: bool = True, on_retry: Optional[Callable[[], None]] = None,
+                 retry_interval: float = 300.0, retry_delay: float = 30.0, max_attempts: int = 5):
+        self.photoprism_client = photoprism_client
+        self.on_batch = on_batch
+        self.poll_interval = poll_interval
+        self.use_websocket = use_websocket
+        # Called every retry_interval seconds, e.g. to upload checksum mismatches again
+        self.on_retry = on_retry
+        self.retry_interval = retry_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.batcher = EventBatcher(self.batches_put, debounce, max_batch)
+        self.batches: "queue.Queue[List[str]]" = queue.Queue()
+        # UID -> monotonic time until which it's ignored. A poll only overlaps the one
+        # before it, so a UID can't show up again once two poll intervals have passed.
+        self.seen: Dict[str, float] = {}
+        self.seen_ttl = 2 * poll_interval + 120
+        self.attempts: Dict[str, int] = {}
+        self.since = datetime.now(timezone.utc)
+        self.polled = False
+        self.stopped = threading.Event()
+        self._seen_lock = threading.Lock()
+    
+    def batches_put(self, uids: List[str]):
+        self.batches.put(uids)
+    
+    def run(self):
+        worker = threading.Thread(target=self._process_batches, daemon=True)
+        worker.start()
+        
+        try:
+            while not self.stopped.is_set():
+                if self.use_websocket:
+                    try:
+                        self._watch_websocket()
+                    except ImportError:
+                        _log("websocket-client is not installed, falling back to polling")
+                        self.use_websocket = False
+                        continue
+                    except Exception as e:
+                        _log(f"Websocket disconnected: {str(e)}")
+                    
+                    # Catch up on anything added while disconnected, then reconnect
+                    self._poll()
+                    self.stopped.wait(min(self.poll_interval, 10.0))
+                else:
+                    self._poll()
+                    self.stopped.wait(self.poll_interval)
+        finally:
+            self.stopped.set()
+            self.batcher.close()
+            self.batches.put([])
+            worker.join()
+    
+    def stop(self):
+        self.stopped.set()
+    
+    def _watch_websocket(self):
+        import websocket
+        
+        tokens = self.photoprism_client.token_manager.get_tokens()
+        connection = websocket.create_connection(self.photoprism_client.get_websocket_url(), timeout=5)
+        try:
+            connection.send(json.dumps({"session": tokens.access_token}))
+            _log("Watching PhotoPrism events")
+            
+            while not self.stopped.is_set():
+                try:
+                    message = connection.recv()
+                except websocket.WebSocketTimeoutException:
+                    continue
+                
+                if not message:
+                    raise Exception("connection closed by PhotoPrism")
+                self._handle_event(message)
+        finally:
+            connection.close()
+    
+    def _handle_event(self, message: str):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        
+        if not isinstance(event, dict) or event.get("event") not in PHOTO_CREATED_EVENTS:
+            return
+        
+        entities = (event.get("data") or {}).get("entities") or []
+        self._add([entity.get("UID", "") for entity in entities if isinstance(entity, dict)])
+    
+    def _poll(self, page_size: int = 100):
+        # Later polls overlap the window a little, already seen photos are dropped in _add
+        poll_started = datetime.now(timezone.utc)
+        overlap = timedelta(minutes=1) if self.polled else timedelta(0)
+        since = (self.since - overlap).strftime("%Y-%m-%dT%H:%M:%SZ")
+        
+        uids: List[str] = []
+        try:
+            for photos in self.photoprism_client.iter_added_since(since, page_size):
+                uids.extend(photo.uid for photo in photos)
+        except Exception as e:
+            _log(f"Polling failed: {str(e)}")
+            return
+        
+        self.since = poll_started
+        self.polled = True
+        self._add(uids)
+    
+    def _add(self, uids: List[str]):
+        now = time.monotonic()
+        with self._seen_lock:
+            self.seen = {uid: until for uid, until in self.seen.items() if until > now}
+            new_uids = [uid for uid in uids if uid and uid not in self.seen]
+            for uid in new_uids:
+                self.seen[uid] = now + self.seen_ttl
+        if new_uids:
+            self.batcher.add(new_uids)
+    
+    def _process_batches(self):
+        # A single worker keeps batches and retries from overlapping
+        next_retry = time.monotonic() + self.retry_interval
+        while True:
+            try:
+                uids: Optional[List[str]] = self.batches.get(timeout=max(0.0, next_retry - time.monotonic()))
+            except queue.Empty:
+                uids = None
+            
+            if uids is not None:
+                if not uids:
+                    return
+                self._transfer(uids)
+            
+            if self.on_retry and time.monotonic() >= next_retry:
+                try:
+                    self.on_retry()
+                except Exception as e:
+                    _log(f"Retrying failed uploads failed: {str(e)}")
+                next_retry = time.monotonic() + self.retry_interval
+    
+    def _transfer(self, uids: List[str]):
+        failed: List[str] = []
+        photos = []
+        for uid in uids:
+            try:
+                photos.append(self.photoprism_client.get_photo(uid))
+            except Exception as e:
+                _log(f"Skipping {uid} for now: {str(e)}")
+                failed.append(uid)
+        
+        if photos:
+            try:
+                failed.extend(self.on_batch(photos))
+            except Exception as e:
+                _log(f"Batch of {len(photos)} photos failed: {str(e)}")
+                failed.extend(photo.get("UID", "") for photo in photos)
+        
+        for uid in set(uids) - set(failed):
+            self.attempts.pop(uid, None)
+        if failed:
+            self._retry_later(failed)
+    
+    def _retry_later(self, uids: List[str]):
+        retry = []
+        for uid in uids:
+            attempts = self.attempts.get(uid, 0) + 1
+            if attempts >= self.max_attempts:
+                _log(f"Giving up on {uid} after {attempts} attempts")
+                self.attempts.pop(uid, None)
+                continue
+            self.attempts[uid] = attempts
+            retry.append(uid)
+        if not retry:
+            return
+        
+        # Exponential backoff, so a server that is down isn't asked again every few seconds
+        delay = min(self.retry_delay * 2 ** (max(self.attempts[uid] for uid in retry) - 1), 3600.0)
+        until = time.monotonic() + delay + self.seen_ttl
+        with self._seen_lock:
+            # Keeps polls from queueing the same photo while its retry waits
+            for uid in retry:
+                self.seen[uid] = until
+        
+        timer = threading.Timer(delay, self.batcher.add, args=(retry,))
+        timer.daemon = True
+        timer.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push photos newly added to PhotoPrism into a Lychee album")
+    parser.add_argument("--album", default="", help="Lychee album ID, empty for unsorted")
+    parser.add_argument("--config", default="photo_sync_config.json", help="Configuration file")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds without new events before a batch is sent")
+    parser.add_argument("--max-batch", type=int, default=50, help="Photos per batch at most")
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="Seconds between polls without a websocket")
+    parser.add_argument("--no-websocket", action="store_true", help="Poll instead of listening for events")
+    parser.add_argument("--retry-interval", type=float, default=300.0,
+                        help="Seconds between retries of uploads that failed verification")
+    args = parser.parse_args()
+    
+    config = ConfigManager(args.config).load_config()
+    scheduler = TransferScheduler.from_config(config.transfer)
+    photoprism_client = PhotoPrismClient(config.photoprism, scheduler)
+    photoprism_client.connect()
+    lychee_client = LycheeClient(config.lychee, scheduler, AlbumCache())
+    lychee_client.connect()
+    photo_transfer = PhotoTransfer(photoprism_client, lychee_client, server_side=config.transfer.server_side_import)
+    
+    def on_batch(photos: List[Dict[str, Any]]) -> List[str]:
+        _log(f"Transferring {len(photos)} new photos")
+        results = photo_transfer.transfer_batch(photos, args.album, TransferPriority.BATCH_SYNC)
+        failed = [result for result in results if result.error]
+        for result in failed:
+            _log(f"Failed {result.photo.get('UID', '')}: {result.error}")
+        _log(f"Transferred {len(results) - len(failed)} of {len(photos)} photos")
+        return [result.photo.get('UID', '') for result in failed]
+    
+    def on_retry():
+        # Checksum mismatches wait in the transfer's retry queue
+        if not len(photo_transfer.retry_queue):
+            return
+        results = photo_transfer.retry_failed()
+        verified = sum(1 for result in results if result.verified is True and not result.error)
+        _log(f"Retried {len(results)} uploads that failed verification, {verified} succeeded")
+    
+    watcher = PhotoWatcher(photoprism_client, on_batch, args.debounce, args.max_batch, args.poll_interval,
+                           use_websocket=not args.no_websocket, on_retry=on_retry,
+                           retry_interval=args.retry_interval)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()